@@ -1,14 +1,37 @@
 import json
 import re
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Optional, Union
 from PIL import Image, PngImagePlugin, JpegImagePlugin
 from lib.eagle_api import EagleAPI
+from lib.folder_cache import FolderCache
+from lib.folder_index import FolderIndex
+from lib.library_index import LibraryIndex
+from lib.library_reader import EagleLibraryReader
+from lib.update_queue import UpdateQueue
+
+LIBRARY_INDEX_PATH = "library_index.db"  # 本地资料库镜像
 
 class ImageMetadataProcessor:
-    def __init__(self):
-        self.eagle = EagleAPI()
-        self.eagle_folder = Path("/mnt/d/AI Image.library/images/")
+    def __init__(
+        self,
+        dry_run: bool = False,
+        eagle: Optional[EagleAPI] = None,
+        library_path: str = "/mnt/d/AI Image.library",
+        index_path: str = LIBRARY_INDEX_PATH,
+    ):
+        """
+        :param dry_run: 只输出将要提交的文件夹差异，不实际更新，也不创建文件夹
+        :param eagle: Eagle 客户端，默认连接本机 Eagle
+        :param library_path: Eagle 资料库根目录
+        :param index_path: 本地镜像数据库路径
+        """
+        self.dry_run = dry_run
+        self.eagle = eagle or EagleAPI()
+        self.library_index = LibraryIndex(index_path, self.eagle)
+        self.folder_cache = FolderCache(self.eagle, dry_run=dry_run)
+        self.eagle_folder = Path(library_path) / "images"
+        self.library_reader = EagleLibraryReader(self.eagle_folder.parent)
         self.artist_prefix = "artist:"
         
         # 支持的图像格式
@@ -25,22 +48,23 @@ class ImageMetadataProcessor:
         # 已知模型哈希
         self.novelai_model_hashes = {"c1e1de52", "8ba2af87", "7bccaa2c", "bc59c602", "79f47848", "7abffa2a", "37442fca"}
 
-    def _get_folder_mappings(self) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
-        """获取文件夹映射关系"""
-        return self.eagle.get_folder_list_recursive()
+    def _get_folder_mappings(self) -> FolderIndex:
+        """获取文件夹索引(来自进程内缓存，不重复拉取)"""
+        return self.folder_cache.index
 
-    def create_folder_if_valid(self, category: str, folder_type: str, 
-                             folder_name_to_id: Dict[str, str]) -> None:
+    def create_folder_if_valid(self, category: str, folder_type: str) -> Optional[str]:
         """
-        创建文件夹的辅助函数
+        创建文件夹的辅助函数(经由文件夹缓存，未命中时才刷新)
         :param category: 文件夹名称
         :param folder_type: 父文件夹类型名称
-        :param folder_name_to_id: 文件夹名称到ID的映射
+        :return: 文件夹ID，父文件夹不存在时返回 None
         """
-        if category and category not in folder_name_to_id:
-            parent_id = folder_name_to_id.get(folder_type)
-            if parent_id:
-                self.eagle.create_folder(category, parent_id)
+        if not category:
+            return None
+        parent_id = self.folder_cache.get_by_name(folder_type)
+        if parent_id:
+            return self.folder_cache.ensure(category, parent_id)
+        return None
 
     def _extract_model_info(self, metadata: dict) -> Union[str, int]:
         """
@@ -162,18 +186,15 @@ class ImageMetadataProcessor:
             return -1
 
     def process_ai_images(self) -> None:
-        """处理所有AI生成的图片"""
-        items_data = self.eagle.get_items()
-        if not items_data:
-            print("No items data found!")
-            return
-            
-        folder_id_to_name, folder_name_to_id, _ = self._get_folder_mappings()
-        print(f"Total items: {len(items_data)}")
+        """
+        处理所有AI生成的图片
+        先扫描全部元数据，再一次性创建缺失的模型文件夹，最后更新项目
+        """
+        folders = self._get_folder_mappings()
         
         # 获取目标文件夹ID
         target_folder_ids = {
-            key: folder_name_to_id.get(value) 
+            key: folders.get_id(value) 
             for key, value in self.target_folders.items()
         }
         
@@ -181,7 +202,13 @@ class ImageMetadataProcessor:
             print(f"Target folder '{self.target_folders['new_ai']}' not found!")
             return
             
-        processed_count = 0
+        # 目标文件夹中项目的最新数据: 会读-改-写文件夹，不能用可能过期的镜像
+        items_data = self.library_index.live_items_in_folder(
+            target_folder_ids["new_ai"], reader=self.library_reader
+        )
+
+        # 第一遍: 读取模型信息
+        scanned = []
         for item in items_data:
             item_id = item.get("id")
             name = item.get("name")
@@ -202,14 +229,30 @@ class ImageMetadataProcessor:
             
             # 读取模型信息
             model_info = self.read_image_metadata(source_file)
-            print(f"Current folders: {[folder_id_to_name.get(fid, '?') for fid in folder_ids]}")
+            print(f"Current folders: {[folders.name(fid, '?') for fid in folder_ids]}")
             print(f"Model info: {model_info}")
-            
-            # 更新文件夹
+            scanned.append((item, model_info))
+
+        # 一次性创建所有缺失的模型文件夹
+        model_folder_ids = {}
+        model_names = {info for _, info in scanned if isinstance(info, str)}
+        if model_names and target_folder_ids["ai_generated"]:
+            model_folder_ids = self.folder_cache.ensure_many(
+                model_names, target_folder_ids["ai_generated"])
+
+        # 第二遍: 更新文件夹(写后队列，后台并发提交)
+        update_queue = UpdateQueue(
+            self.eagle,
+            dry_run=self.dry_run,
+            on_success=lambda item_id, fields: self.library_index.record_update(item_id, **fields),
+        )
+        for item, model_info in scanned:
+            item_id = item.get("id")
+            folder_ids = item.get("folders", [])
             new_folder_ids = set(folder_ids)
             
             if model_info == -1:
-                print("No model info found")
+                print(f"No model info found for {item_id}")
             else:
                 # 添加检测到的标记
                 if target_folder_ids["detected"]:
@@ -220,24 +263,21 @@ class ImageMetadataProcessor:
                     if target_folder_ids["nai3"]:
                         new_folder_ids.add(target_folder_ids["nai3"])
                 
-                # 创建模型文件夹并添加
+                # 添加模型文件夹
                 if isinstance(model_info, str):
-                    self.create_folder_if_valid(model_info, self.target_folders["ai_generated"], folder_name_to_id)
-                    # 刷新文件夹映射
-                    _, folder_name_to_id, _ = self._get_folder_mappings()
-                    model_folder_id = folder_name_to_id.get(model_info)
+                    model_folder_id = model_folder_ids.get(model_info)
                     if model_folder_id:
                         new_folder_ids.add(model_folder_id)
             
-            # 更新项目
-            if new_folder_ids != set(folder_ids):
-                self.eagle.update_item(
-                    item_id, 
-                    folders=list(new_folder_ids))
-                processed_count += 1
-                print(f"Updated folders for {item_id}")
+            # 更新项目，无变化时队列会直接跳过
+            update_queue.put(item_id, current=item, folders=list(new_folder_ids))
         
-        print(f"\nProcessing complete. {processed_count} items updated.")
+        report = update_queue.close()
+        if self.dry_run:
+            print(f"\nDry run complete. {report['would_send']} items would be updated.")
+        else:
+            print(f"\nProcessing complete. {report['sent']} items updated.")
+        print(f"Folder cache: {self.folder_cache.get_stats()}")
 
 if __name__ == "__main__":
     processor = ImageMetadataProcessor()
@@ -0,0 +1,62 @@
+"""
+同步客户端与异步客户端的吞吐对比
+在本地替身服务上分别用 EagleAPI 逐个、AsyncEagleAPI 并发执行 update_item。
+用法: python -m benchmarks.bench_async_client --items 2000 --latency 0.002
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+from benchmarks.mock_server import MockServer
+from lib.async_api import AsyncEagleAPI
+from lib.eagle_api import EagleAPI
+
+
+def bench_sync(server: MockServer, item_ids) -> float:
+    eagle = EagleAPI(**server.eagle_urls())
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for item_id in item_ids:
+            eagle.update_item(item_id, tags=["bench"])
+    elapsed = time.perf_counter() - start
+    eagle.close()
+    return elapsed
+
+
+async def _bench_async(server: MockServer, item_ids, concurrency: int) -> float:
+    async with AsyncEagleAPI(concurrency=concurrency, **server.eagle_urls()) as eagle:
+        start = time.perf_counter()
+        results = await eagle.update_items(
+            [{"item_id": item_id, "tags": ["bench"]} for item_id in item_ids]
+        )
+        elapsed = time.perf_counter() - start
+    assert all(results), "async update failed"
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.002, help="模拟服务端延迟(秒)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    with MockServer(latency=args.latency) as server:
+        item_ids = [server.library.add_item()["id"] for _ in range(args.items)]
+
+        sync_time = bench_sync(server, item_ids)
+        async_time = asyncio.run(_bench_async(server, item_ids, args.concurrency))
+
+    print(f"items={args.items} latency={args.latency * 1000:.1f}ms")
+    print(f"sync : {sync_time:.2f}s  {args.items / sync_time:.0f} req/s")
+    print(
+        f"async: {async_time:.2f}s  {args.items / async_time:.0f} req/s "
+        f"(concurrency={args.concurrency}, x{sync_time / async_time:.1f})"
+    )
+
+
+if __name__ == "__main__":
+    main()
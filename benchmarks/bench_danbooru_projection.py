@@ -0,0 +1,100 @@
+"""
+Danbooru 字段投影(only=)的收益
+对替身服务的 /posts.json 分别请求完整帖子与只含 danbooru_api.POST_FIELDS 的帖子，
+比较每 1000 个帖子的响应字节数、json 解析耗时与单页请求耗时。
+用法: python -m benchmarks.bench_danbooru_projection --posts 20000 --limit 200
+"""
+
+import argparse
+import json
+import os
+import time
+
+import requests
+
+from benchmarks.mock_server import MockLibrary, MockServer
+from benchmarks.synthetic import generate_posts
+
+# 与 danbooru_api.POST_FIELDS 保持一致；这里不导入 danbooru_api，避免读取配置文件和创建客户端
+POST_FIELDS = (
+    "id",
+    "md5",
+    "file_url",
+    "created_at",
+    "rating",
+    "tag_string_general",
+    "tag_string_character",
+    "tag_string_copyright",
+    "tag_string_artist",
+    "tag_string_meta",
+)
+
+
+def fetch_pages(url: str, pages: int, limit: int, only=None):
+    """顺序抓取若干页，返回 [(响应体, 请求耗时)]"""
+    session = requests.Session()
+    bodies = []
+    for page in range(1, pages + 1):
+        params = {"page": page, "limit": limit}
+        if only:
+            params["only"] = ",".join(only)
+        start = time.perf_counter()
+        response = session.get(f"{url}/posts.json", params=params)
+        response.raise_for_status()
+        bodies.append((response.content, time.perf_counter() - start))
+    return bodies
+
+
+def measure(label: str, bodies, repeat: int) -> dict:
+    n_posts = sum(len(json.loads(body)) for body, _ in bodies)
+    total_bytes = sum(len(body) for body, _ in bodies)
+    request_s = sum(elapsed for _, elapsed in bodies)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for body, _ in bodies:
+            json.loads(body)
+    parse_s = (time.perf_counter() - start) / repeat
+
+    per_k = 1000 / n_posts
+    result = {
+        "bytes_per_1k": total_bytes * per_k,
+        "parse_ms_per_1k": parse_s * per_k * 1000,
+        "request_ms_per_page": request_s / len(bodies) * 1000,
+    }
+    print(
+        f"{label:<10} {n_posts:>7} {result['bytes_per_1k'] / 1024:>14.1f} "
+        f"{result['parse_ms_per_1k']:>15.2f} {result['request_ms_per_page']:>14.2f}"
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=20_000)
+    parser.add_argument("--limit", type=int, default=200, help="每页帖子数")
+    parser.add_argument("--repeat", type=int, default=5, help="json 解析重复次数")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟服务端延迟(秒)")
+    args = parser.parse_args()
+    os.environ.setdefault("NO_PROXY", "127.0.0.1,localhost")
+
+    library = MockLibrary()
+    library.posts = generate_posts(args.posts)
+    pages = max(1, args.posts // args.limit)
+
+    with MockServer("danbooru", latency=args.latency, library=library) as server:
+        url = server.danbooru_url()
+        full = fetch_pages(url, pages, args.limit)
+        projected = fetch_pages(url, pages, args.limit, only=POST_FIELDS)
+
+    print(f"{'mode':<10} {'posts':>7} {'KiB per 1k':>14} {'parse ms/1k':>15} {'request ms/pg':>14}")
+    full_result = measure("full", full, args.repeat)
+    only_result = measure("only=", projected, args.repeat)
+    print(
+        f"\nonly= payload x{full_result['bytes_per_1k'] / only_result['bytes_per_1k']:.1f} smaller, "
+        f"parse x{full_result['parse_ms_per_1k'] / only_result['parse_ms_per_1k']:.1f} faster"
+    )
+
+
+if __name__ == "__main__":
+    main()
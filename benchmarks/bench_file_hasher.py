@@ -0,0 +1,67 @@
+"""
+文件摘要计算基准
+在临时目录中生成若干随机文件，比较旧的逐文件 4 KiB 单线程 md5、
+FileHasher 首次运行(线程池 + 大块读取，md5 与 md5+sha256)与再次运行(只 stat，命中缓存)的耗时，
+并核对摘要一致。文件刚写入、位于页缓存中，首次运行测的是 CPU 并行度而非磁盘。
+用法: python -m benchmarks.bench_file_hasher --files 200 --size-kb 2048
+"""
+
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from lib.file_hasher import FileHasher
+
+
+def legacy_md5(file_path):
+    """旧的 danbooru_md5.calculate_md5"""
+    md5_hash = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(4096), b""):
+            md5_hash.update(chunk)
+    return md5_hash.hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--size-kb", type=int, default=2048)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        paths = []
+        for i in range(args.files):
+            path = root / f"{i}.bin"
+            path.write_bytes(os.urandom(args.size_kb * 1024))
+            paths.append(str(path))
+        total_mb = args.files * args.size_kb * 1024 / 1e6
+
+        start = time.perf_counter()
+        expected = {os.path.abspath(p): legacy_md5(p) for p in paths}
+        legacy_s = time.perf_counter() - start
+
+        rows = [("legacy 4 KiB, 1 thread", legacy_s)]
+        for algorithms in (("md5",), ("md5", "sha256")):
+            cache_path = root / f"hashes_{'_'.join(algorithms)}.db"
+            for run in ("cold", "warm"):
+                hasher = FileHasher(cache_path, algorithms=algorithms, workers=args.workers)
+                start = time.perf_counter()
+                result = dict(hasher.hash_files(paths))
+                elapsed = time.perf_counter() - start
+                hasher.close()
+                assert {p: d["md5"] for p, d in result.items()} == expected
+                rows.append((f"FileHasher {'+'.join(algorithms)}, {run}", elapsed))
+
+    print(f"{args.files} files, {total_mb:.0f} MB")
+    print(f"{'method':<32} {'time(s)':>8} {'MB/s':>8} {'speedup':>8}")
+    for name, seconds in rows:
+        print(f"{name:<32} {seconds:>8.3f} {total_mb / seconds:>8.0f} {legacy_s / seconds:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
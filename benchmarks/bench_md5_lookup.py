@@ -0,0 +1,73 @@
+"""
+md5 反查基准
+在限速的替身 Danbooru 上比较旧的逐个 md5 串行查询(md5:<hash>，每个文件一个请求)
+与 Md5Resolver 的批量并发查询(md5:a,b,c)，以及带缓存的再次运行。
+用法: python -m benchmarks.bench_md5_lookup --md5s 1000 --rate 8 --latency 0.05
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from pybooru import Danbooru
+
+from benchmarks.mock_server import MockLibrary, MockServer
+from benchmarks.synthetic import generate_posts
+from lib.danbooru_access import throttle_client
+from lib.md5_lookup import Md5LookupCache, Md5Resolver
+from lib.rate_limit import AdaptiveConcurrency, TokenBucket
+
+
+def make_client(server: MockServer, rate: float, concurrency: int):
+    return throttle_client(
+        Danbooru(site_url=server.danbooru_url(), username="bench", api_key="bench"),
+        TokenBucket(rate),
+        AdaptiveConcurrency(initial=concurrency, max_limit=concurrency),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--md5s", type=int, default=1000)
+    parser.add_argument("--found-ratio", type=float, default=0.7)
+    parser.add_argument("--rate", type=float, default=8, help="账户限速(请求/秒)")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--sequential-sample", type=int, default=40, help="串行方式只实测前 N 个再按比例估算")
+    args = parser.parse_args()
+    os.environ.setdefault("NO_PROXY", "127.0.0.1,localhost")
+
+    n_found = int(args.md5s * args.found_ratio)
+    library = MockLibrary()
+    library.posts = generate_posts(n_found)
+    md5s = [p["md5"] for p in library.posts] + [uuid.uuid4().hex for _ in range(args.md5s - n_found)]
+
+    with MockServer("danbooru", latency=args.latency, library=library, rate_limit=args.rate) as server, \
+            tempfile.TemporaryDirectory() as tmp:
+        client = make_client(server, args.rate, 1)
+        sample = md5s[: args.sequential_sample]
+        start = time.perf_counter()
+        for md5 in sample:
+            client.post_list(tags=f"md5:{md5}")
+        sequential_s = (time.perf_counter() - start) * len(md5s) / len(sample)
+
+        rows = [("sequential, 1 per request (est.)", sequential_s, len(md5s))]
+        cache = Md5LookupCache(Path(tmp) / "lookups.db")
+        for run in ("batched, cold", "batched, cached"):
+            resolver = Md5Resolver(make_client(server, args.rate, 4), cache, batch_size=100, workers=4)
+            start = time.perf_counter()
+            found = resolver.resolve(md5s)
+            elapsed = time.perf_counter() - start
+            assert len(found) == n_found
+            rows.append((run, elapsed, resolver.get_stats()["requests"]))
+
+    print(f"{args.md5s} md5s ({n_found} on Danbooru), {args.rate} req/s, {args.latency * 1000:.0f} ms latency")
+    print(f"{'method':<36} {'time(s)':>9} {'requests':>9}")
+    for name, seconds, requests in rows:
+        print(f"{name:<36} {seconds:>9.2f} {requests:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+感知哈希近似重复基准
+1) 聚类: 随机生成 N 个 64 位哈希并植入若干近似重复组(翻转不超过 k 位)，
+   比较 MultiIndexHash 的全部近邻对与暴力两两比较(只实测前若干行再按比例估算)，并核对找到的组
+2) 计算哈希: 在临时目录中生成 JPEG，比较单进程全尺寸解码与 PerceptualIndex.update(进程池 + draft 缩小解码)
+用法: python -m benchmarks.bench_perceptual_index --hashes 200000 --groups 2000 --images 200
+"""
+
+import argparse
+import random
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from lib.perceptual_hash import dhash
+from lib.perceptual_index import MultiIndexHash, PerceptualIndex
+
+
+def planted_hashes(n: int, groups: int, k: int, seed: int = 0):
+    """n 个随机哈希，其中 groups 组各含一个原图与一个距离不超过 k 的副本"""
+    rng = random.Random(seed)
+    hashes = {f"h{i}": rng.getrandbits(64) for i in range(n - groups)}
+    expected = set()
+    for i in range(groups):
+        original = hashes[f"h{i}"]
+        flipped = sum(1 << bit for bit in rng.sample(range(64), rng.randint(0, k)))
+        hashes[f"d{i}"] = original ^ flipped
+        expected.add((f"d{i}", f"h{i}"))
+    return hashes, expected
+
+
+def brute_force_seconds(values: np.ndarray, k: int, sample_rows: int) -> float:
+    """逐行与其后全部哈希比较，实测前 sample_rows 行，按比较次数估算总耗时"""
+    n = len(values)
+    start = time.perf_counter()
+    compared = 0
+    for i in range(min(sample_rows, n)):
+        np.count_nonzero(np.bitwise_count(values[i + 1 :] ^ values[i]) <= k)
+        compared += n - i - 1
+    return (time.perf_counter() - start) * (n * (n - 1) / 2) / compared
+
+
+def make_images(root: Path, count: int, size: int):
+    paths = []
+    for i in range(count):
+        rng = np.random.default_rng(i)
+        small = rng.integers(0, 255, (6, 6, 3), dtype=np.uint8)
+        path = root / f"{i}.jpg"
+        Image.fromarray(small).resize((size, size), Image.Resampling.BICUBIC).save(path, quality=90)
+        paths.append(str(path))
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--hashes", type=int, default=200000)
+    parser.add_argument("--groups", type=int, default=2000)
+    parser.add_argument("--distance", type=int, default=4)
+    parser.add_argument("--brute-sample", type=int, default=2000, help="暴力比较只实测前 N 行再按比例估算")
+    parser.add_argument("--images", type=int, default=200)
+    parser.add_argument("--image-size", type=int, default=2048)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    hashes, expected = planted_hashes(args.hashes, args.groups, args.distance)
+    start = time.perf_counter()
+    index = MultiIndexHash(args.distance)
+    for key, value in hashes.items():
+        index.add(key, value)
+    build_s = time.perf_counter() - start
+    start = time.perf_counter()
+    found = {(a, b) for a, b, _ in index.pairs()}
+    pairs_s = time.perf_counter() - start
+    assert expected <= found, f"missed {len(expected - found)} planted pairs"
+    values = np.fromiter(hashes.values(), dtype=np.uint64, count=len(hashes))
+    brute_s = brute_force_seconds(values, args.distance, args.brute_sample)
+
+    print(f"{args.hashes} hashes, {args.groups} planted pairs, distance <= {args.distance}")
+    print(f"{'method':<34} {'time(s)':>9}")
+    print(f"{'brute force all pairs (est.)':<34} {brute_s:>9.2f}")
+    print(f"{'multi-index build':<34} {build_s:>9.2f}")
+    print(f"{'multi-index all pairs':<34} {pairs_s:>9.2f}  ({len(found)} pairs)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        paths = make_images(root, args.images, args.image_size)
+        start = time.perf_counter()
+        for path in paths:
+            with Image.open(path) as image:
+                image.load()
+                dhash(image)
+        full_s = time.perf_counter() - start
+
+        rows = [("full decode, 1 process", full_s)]
+        for run in ("cold", "warm"):
+            pindex = PerceptualIndex(root / "index.db")
+            start = time.perf_counter()
+            pindex.update([(str(i), p) for i, p in enumerate(paths)], workers=args.workers)
+            rows.append((f"PerceptualIndex.update, {run}", time.perf_counter() - start))
+            pindex.close()
+
+    print(f"\n{args.images} JPEGs, {args.image_size}x{args.image_size}")
+    print(f"{'method':<34} {'time(s)':>9} {'img/s':>9}")
+    for name, seconds in rows:
+        print(f"{name:<34} {seconds:>9.2f} {args.images / seconds:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
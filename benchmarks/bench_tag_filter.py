@@ -0,0 +1,84 @@
+"""
+本地标签筛选的微基准
+在合成帖子上比较逐帖重建标签集合的旧实现与编译后的 TagFilter，
+覆盖 AND/NOT、OR 组与通配标签几类查询，并核对两者结果一致(旧实现不支持的查询除外)。
+用法: python -m benchmarks.bench_tag_filter --posts 100000
+"""
+
+import argparse
+import time
+
+from benchmarks.synthetic import generate_posts
+from lib.tag_filter import TAG_FIELDS, TagFilter
+
+QUERIES = (
+    "1girl tag_1 -tag_2",
+    "solo -tag_3 -tag_4 -tag_5 -tag_6",
+    "tag_7 tag_8 tag_9",
+    "~tag_10 ~tag_11 ~tag_12 -comic",
+    "tag_12* -*_4999",
+    "*girl* ~tag_1* ~tag_2* -artist_1*",
+)
+
+
+def legacy_filter(posts, include_tags, exclude_tags):
+    """旧的 filter_local_posts(去掉调试输出)"""
+    filtered = []
+    for post in posts:
+        tags = set()
+        for key in TAG_FIELDS:
+            tags.update(tag.lower() for tag in post.get(key, "").split())
+        if [t for t in include_tags if t not in tags]:
+            continue
+        if [t for t in exclude_tags if t in tags]:
+            continue
+        filtered.append(post)
+    return filtered
+
+
+def load_posts(n_posts: int, chunk: int = 10_000):
+    """分块生成帖子，只保留标签字段以控制内存"""
+    posts = []
+    for start in range(1, n_posts + 1, chunk):
+        batch = generate_posts(min(chunk, n_posts - start + 1), start_id=start, seed=start)
+        posts.extend({"id": p["id"], **{f: p[f] for f in TAG_FIELDS}} for p in batch)
+    return posts
+
+
+def timed(func, repeat: int):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--posts", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3, help="取最快一次")
+    args = parser.parse_args()
+
+    posts = load_posts(args.posts)
+    print(f"{'query':<40} {'kept':>7} {'legacy(s)':>10} {'compiled(s)':>12} {'speedup':>8}")
+    for query in QUERIES:
+        terms = query.split()
+        include = [t for t in terms if not t.startswith("-")]
+        exclude = [t[1:] for t in terms if t.startswith("-")]
+        tag_filter, compile_s = timed(lambda: TagFilter(include, exclude), 1)
+        kept, compiled_s = timed(lambda: tag_filter.filter(posts), args.repeat)
+
+        if any("*" in t or t.startswith("~") for t in terms):
+            legacy = "n/a"
+        else:
+            expected, legacy_s = timed(lambda: legacy_filter(posts, include, exclude), args.repeat)
+            assert [p["id"] for p in expected] == [p["id"] for p in kept], query
+            legacy = f"{legacy_s:.3f}"
+        speedup = f"x{float(legacy) / compiled_s:.1f}" if legacy != "n/a" else ""
+        print(f"{query:<40} {len(kept):>7} {legacy:>10} {compiled_s + compile_s:>12.3f} {speedup:>8}")
+
+
+if __name__ == "__main__":
+    main()
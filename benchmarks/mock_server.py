@@ -0,0 +1,482 @@
+"""
+Eagle / SynapForest / Danbooru 本地替身服务
+在进程内启动 HTTP 服务，实现 lib/eagle_api.py、lib/synap_forest_api.py
+与 danbooru_api.py(pybooru)用到的端点，以及图片 CDN(静态文件，支持 Range)，
+用于无需真实服务的基准测试与联调。
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+import uuid
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Union
+from urllib.parse import parse_qs, urlparse
+
+from lib.query_planner import is_metatag
+
+
+def _as_list(value) -> List[str]:
+    """查询参数中的逗号分隔字符串或 JSON 数组"""
+    if not value:
+        return []
+    if isinstance(value, list):
+        return value
+    return [v for v in str(value).split(",") if v]
+
+
+class MockLibrary:
+    """替身服务共享的内存资料库"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.items: Dict[str, Dict] = {}
+        self.folders: List[Dict] = []  # 嵌套树，结构同 /api/folder/list
+        self.folder_nodes: Dict[str, Dict] = {}
+        self.posts: List[Dict] = []  # Danbooru 帖子，按 id 降序
+        self.files: Dict[str, bytes] = {}  # 图片 CDN: URL 路径 -> 文件内容
+        self._post_keys = (None, [])
+        self._tag_counts = (None, {})
+        self.request_counts: Dict[str, int] = {}
+
+    def count(self, endpoint: str) -> None:
+        with self.lock:
+            self.request_counts[endpoint] = self.request_counts.get(endpoint, 0) + 1
+
+    def add_folder(self, name: str, parent: Optional[str] = None) -> Dict:
+        """添加文件夹，parent 不存在时作为根文件夹"""
+        node = {"id": uuid.uuid4().hex[:13].upper(), "name": name, "children": []}
+        with self.lock:
+            parent_node = self.folder_nodes.get(parent) if parent else None
+            if parent_node is not None:
+                parent_node["children"].append(node)
+            else:
+                self.folders.append(node)
+            self.folder_nodes[node["id"]] = node
+        return node
+
+    def add_item(self, **fields) -> Dict:
+        """添加项目，未提供的字段使用默认值"""
+        item = {
+            "id": uuid.uuid4().hex[:13].upper(),
+            "name": "image",
+            "ext": "png",
+            "url": "",
+            "annotation": "",
+            "tags": [],
+            "folders": [],
+            "modificationTime": int(time.time() * 1000),
+        }
+        item.update(fields)
+        with self.lock:
+            self.items[item["id"]] = item
+        return item
+
+    def update_item(self, data: Dict) -> bool:
+        with self.lock:
+            item = self.items.get(data.get("id"))
+            if item is None:
+                return False
+            for key in ("tags", "annotation", "url", "star", "name", "folders"):
+                if key in data:
+                    item[key] = data[key]
+            item["modificationTime"] = int(time.time() * 1000)
+        return True
+
+    def list_items(self, query: Dict) -> List[Dict]:
+        """按 limit/offset 与 ext/folders/tags 过滤列出项目(offset 为页序号)"""
+        limit = int(query.get("limit", 200))
+        offset = int(query.get("offset", 0))
+        ext = query.get("ext") or (query.get("exts") or [""])[0]
+        folders = _as_list(query.get("folders"))
+        tags = _as_list(query.get("tags"))
+
+        with self.lock:
+            items = list(self.items.values())
+        if ext:
+            items = [i for i in items if i["ext"] == ext]
+        if folders:
+            items = [i for i in items if set(folders) & set(i["folders"])]
+        if tags:
+            items = [i for i in items if set(tags) <= set(i["tags"])]
+        return items[offset * limit : (offset + 1) * limit]
+
+    def _sorted_post_keys(self, posts: List[Dict]) -> List[int]:
+        """-id 的升序列表(与 posts 的 id 降序对应)，posts 不变时复用"""
+        cached_posts, keys = self._post_keys
+        if cached_posts is not posts or len(keys) != len(posts):
+            keys = [-p["id"] for p in posts]
+            self._post_keys = (posts, keys)
+        return keys
+
+    @staticmethod
+    def _search_terms(tags: str):
+        """搜索字符串中的 (包含标签, 反选标签)，元标签忽略"""
+        terms = [t for t in tags.split() if not is_metatag(t)]
+        return [t for t in terms if not t.startswith("-")], [t[1:] for t in terms if t.startswith("-")]
+
+    @staticmethod
+    def _md5_terms(tags: str) -> Optional[set]:
+        """md5:a,b,c 元标签中的 md5 集合，没有时返回 None"""
+        md5s = [t[4:] for t in tags.split() if t.lower().startswith("md5:")]
+        return {m.lower() for term in md5s for m in term.split(",") if m} if md5s else None
+
+    def search_posts(self, tags: str) -> List[Dict]:
+        """按标签搜索帖子(支持 -tag 反选与 md5:a,b 元标签)，保持 id 降序"""
+        include, exclude = self._search_terms(tags)
+        include, exclude = set(include), set(exclude)
+        md5s = self._md5_terms(tags)
+        with self.lock:
+            posts = self.posts
+        return [
+            p
+            for p in posts
+            if include <= (tag_set := set(p["tag_string"].split()))
+            and not exclude & tag_set
+            and (md5s is None or p["md5"] in md5s)
+        ]
+
+    def tag_counts(self) -> Dict[str, int]:
+        """各标签的帖子数，posts 不变时复用"""
+        with self.lock:
+            posts = self.posts
+            cached_posts, counts = self._tag_counts
+            if cached_posts is not posts:
+                counts = {}
+                for post in posts:
+                    for tag in post["tag_string"].split():
+                        counts[tag] = counts.get(tag, 0) + 1
+                self._tag_counts = (posts, counts)
+        return counts
+
+    def list_posts(self, query: Dict) -> List[Dict]:
+        """
+        Danbooru /posts.json，tags 中的普通标签全部匹配、-tag 全部不匹配
+        page 可以是页码(从 1 开始)，也可以是游标 b<id>(更旧) / a<id>(更新)
+        """
+        limit = min(int(query.get("limit", 20)), 200)
+        page = str(query.get("page", 1))
+        tags = query.get("tags", "")
+        keyset = page[:1] in ("a", "b")
+
+        if self._search_terms(tags) == ([], []) and self._md5_terms(tags) is None:
+            with self.lock:
+                posts = self.posts
+                keys = self._sorted_post_keys(posts) if keyset else None
+        else:
+            posts = self.search_posts(tags)
+            keys = [-p["id"] for p in posts] if keyset else None
+
+        if page.startswith("b"):
+            start = bisect.bisect_right(keys, -int(page[1:]))
+            return posts[start : start + limit]
+        if page.startswith("a"):
+            end = bisect.bisect_left(keys, -int(page[1:]))
+            return posts[max(0, end - limit) : end]
+        page_no = int(page)
+        return posts[(page_no - 1) * limit : page_no * limit]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockEagle/1.0"
+    # 头部与正文合并写出，避免 keep-alive 下 Nagle 与延迟 ACK 叠加的 40ms 停顿
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, payload: Union[Dict, List], status: int = 200, headers: Optional[Dict] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_file(self, path: str) -> None:
+        """静态文件，支持单段 Range(bytes=start- / bytes=start-end)，用于续传"""
+        body = self.server.owner.library.files.get(path)
+        if body is None:
+            self._send({"status": "error", "message": "not found"}, 404)
+            return
+        status, start, end = 200, 0, len(body)
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", self.headers.get("Range") or "")
+        if match:
+            start = int(match.group(1))
+            end = min(int(match.group(2)) + 1, len(body)) if match.group(2) else len(body)
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(body)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            status = 206
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream")
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{len(body)}")
+        self.end_headers()
+        self.wfile.write(body[start:end])
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if not length:
+            return {}
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _handle(self, method: str) -> None:
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        data = self._read_json() if method == "POST" else {}
+        owner = self.server.owner
+        owner.library.count(parsed.path)
+        retry_after = owner.throttle()
+        if retry_after is not None:
+            owner.library.count("429")
+            self._send({"success": False, "message": "rate limited"}, 429,
+                       {"Retry-After": f"{retry_after:.2f}"})
+            return
+        if owner.latency:
+            time.sleep(owner.latency)
+        if owner.flavor == "files":
+            self._send_file(parsed.path)
+            return
+
+        handler = owner.routes.get((method, parsed.path))
+        if handler is None:
+            self._send({"status": "error", "message": "not found"}, 404)
+            return
+        self._send(handler(query, data))
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class MockServer:
+    """
+    进程内替身服务
+    - flavor="eagle": 同时监听项目端口与文件夹端口(同一个资料库)
+    - flavor="synap": 单端口，SynapForest 风格的 POST 端点
+    - flavor="danbooru": 单端口，GET /posts.json(支持 only= 字段投影)、/tags.json、/counts/posts.json
+      (数据来自 library.posts)
+    - flavor="files": 单端口，GET 任意路径返回 library.files 中的文件内容(支持 Range)，充当图片 CDN
+    rate_limit 模拟服务端限速: 超过每秒请求数(允许 rate_limit 个突发)时返回 429 与 Retry-After
+    用法:
+        with MockServer(latency=0.002) as server:
+            eagle = EagleAPI(**server.eagle_urls())
+    """
+
+    def __init__(
+        self,
+        flavor: str = "eagle",
+        latency: float = 0.0,
+        library: Optional[MockLibrary] = None,
+        host: str = "127.0.0.1",
+        rate_limit: Optional[float] = None,
+    ):
+        """
+        :param flavor: "eagle"、"synap"、"danbooru" 或 "files"
+        :param latency: 每个请求的模拟服务端延迟(秒)
+        :param library: 共享资料库，默认新建空库
+        :param host: 监听地址
+        :param rate_limit: 每秒允许的请求数，None 表示不限速
+        """
+        self.flavor = flavor
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self._tokens = rate_limit or 0.0
+        self._tokens_updated = time.monotonic()
+        self._throttle_lock = threading.Lock()
+        self.library = library or MockLibrary()
+        self.host = host
+        self.routes = {
+            "eagle": self._eagle_routes,
+            "synap": self._synap_routes,
+            "danbooru": self._danbooru_routes,
+            "files": dict,
+        }[flavor]()
+        self._servers: List[_Server] = []
+        self._threads: List[threading.Thread] = []
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def throttle(self) -> Optional[float]:
+        """服务端令牌桶: 放行返回 None，超限返回建议的 Retry-After(秒)"""
+        if not self.rate_limit:
+            return None
+        with self._throttle_lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.rate_limit, self._tokens + (now - self._tokens_updated) * self.rate_limit
+            )
+            self._tokens_updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return None
+            return (1 - self._tokens) / self.rate_limit
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def start(self) -> None:
+        for _ in range(2 if self.flavor == "eagle" else 1):
+            server = _Server((self.host, 0), _Handler)
+            server.owner = self
+            # 缩短关闭时的轮询间隔，stop() 不必等满默认的 0.5 秒
+            thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+            thread.start()
+            self._servers.append(server)
+            self._threads.append(thread)
+
+    def stop(self) -> None:
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
+        self._servers.clear()
+        self._threads.clear()
+
+    @property
+    def urls(self) -> List[str]:
+        return [f"http://{self.host}:{s.server_port}" for s in self._servers]
+
+    def eagle_urls(self) -> Dict[str, str]:
+        """EagleAPI / AsyncEagleAPI 的地址参数"""
+        return {"base_url_item": self.urls[0], "base_url_folder": self.urls[1]}
+
+    def synap_urls(self) -> Dict[str, str]:
+        """SynapForestAPI / AsyncSynapForestAPI 的地址参数"""
+        return {"base_url": self.urls[0]}
+
+    def danbooru_url(self) -> str:
+        """pybooru Danbooru(site_url=...) 的地址参数"""
+        return self.urls[0]
+
+    def files_url(self) -> str:
+        """图片 CDN 地址，作为 generate_posts(cdn_url=...) 的参数"""
+        return self.urls[0]
+
+    # ---------------- 路由 ----------------
+    def _eagle_routes(self) -> Dict:
+        lib = self.library
+
+        def item_list(query, data):
+            return {"status": "success", "data": lib.list_items(query)}
+
+        def folder_list(query, data):
+            return {"status": "success", "data": lib.folders}
+
+        def folder_create(query, data):
+            node = lib.add_folder(data["folderName"], data.get("parent"))
+            return {"status": "success", "data": {"id": node["id"], "name": node["name"]}}
+
+        def item_update(query, data):
+            return {"status": "success" if lib.update_item(data) else "error"}
+
+        def add_from_url(query, data):
+            lib.add_item(
+                name=data.get("name", "image"),
+                url=data.get("website", ""),
+                tags=data.get("tags", []),
+                folders=data.get("folderIds", []),
+            )
+            return {"status": "success"}
+
+        def add_from_path(query, data):
+            path = data.get("path", "")
+            if not os.path.isfile(path):
+                return {"status": "error", "message": f"file not found: {path}"}
+            lib.add_item(
+                name=data.get("name", "image"),
+                ext=os.path.splitext(path)[1].lstrip(".") or "png",
+                url=data.get("website", ""),
+                tags=data.get("tags", []),
+                folders=data.get("folderIds", []),
+            )
+            return {"status": "success"}
+
+        return {
+            ("GET", "/api/item/list"): item_list,
+            ("GET", "/api/folder/list"): folder_list,
+            ("POST", "/api/folder/create"): folder_create,
+            ("POST", "/api/item/update"): item_update,
+            ("POST", "/api/item/addFromURL"): add_from_url,
+            ("POST", "/api/item/addFromPath"): add_from_path,
+        }
+
+    def _synap_routes(self) -> Dict:
+        lib = self.library
+
+        def item_list(query, data):
+            return {"status": "success", "data": lib.list_items({**query, **data})}
+
+        def folder_list(query, data):
+            return {"status": "success", "data": lib.folders}
+
+        def folder_create(query, data):
+            parent = data.get("parent")
+            node = lib.add_folder(data["folderName"], parent)
+            return {"status": "success", "data": [{"id": node["id"], "name": node["name"]}]}
+
+        def item_update(query, data):
+            return {"status": "success" if lib.update_item(data) else "error"}
+
+        def add_from_urls(query, data):
+            for entry in data.get("items", []):
+                lib.add_item(
+                    name=entry.get("name", "image"),
+                    url=entry.get("website", ""),
+                    tags=entry.get("tags") or [],
+                    folders=data.get("folderIds") or [],
+                )
+            return {"status": "success"}
+
+        return {
+            ("POST", "/api/item/list"): item_list,
+            ("POST", "/api/folder/list"): folder_list,
+            ("POST", "/api/folder/create"): folder_create,
+            ("POST", "/api/item/update"): item_update,
+            ("POST", "/api/item/addFromUrls"): add_from_urls,
+        }
+
+    def _danbooru_routes(self) -> Dict:
+        lib = self.library
+
+        def post_list(query, data):
+            posts = lib.list_posts(query)
+            if query.get("only"):
+                fields = query["only"].split(",")
+                posts = [{f: p[f] for f in fields if f in p} for p in posts]
+            return posts
+
+        def tag_list(query, data):
+            counts = lib.tag_counts()
+            names = [n for n in query.get("search[name]", "").split(",") if n in counts]
+            return [{"name": n, "post_count": counts[n]} for n in names[:20]]
+
+        def count_posts(query, data):
+            return {"counts": {"posts": len(lib.search_posts(query.get("tags", "")))}}
+
+        return {
+            ("GET", "/posts.json"): post_list,
+            ("GET", "/tags.json"): tag_list,
+            ("GET", "/counts/posts.json"): count_posts,
+        }
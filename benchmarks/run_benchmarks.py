@@ -0,0 +1,322 @@
+"""
+端到端基准测试
+在替身服务与合成资料库上运行各脚本的主流程，报告墙钟时间、请求速率与峰值内存。
+每个 (场景, 规模) 在独立子进程中运行，峰值 RSS 互不干扰。
+场景:
+- danbooru:    danbooru_api.main(图片从替身 CDN 下载到暂存目录后按路径导入)
+- train:       main.ImageTrainer.train_tag_generate
+- auto_tagger: main.ImageTrainer.auto_tagger(默认使用替身 Predictor，只测流程本身)
+- sd:          SD_image_tag.ImageMetadataProcessor.process_ai_images
+用法: python -m benchmarks.run_benchmarks --sizes 1000 10000 100000 --latency 0.001
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import types
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from PIL import Image, PngImagePlugin
+
+from benchmarks.mock_server import MockServer
+from benchmarks.synthetic import (
+    generate_library,
+    generate_posts,
+    load_into_mock,
+    load_post_files,
+    write_library_tree,
+)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+ROOT = Path(__file__).resolve().parent.parent
+SCENARIOS = ("danbooru", "train", "auto_tagger", "sd")
+POST_IMAGE_BYTES = 64 * 1024  # danbooru 场景中每张原图的大小
+MODEL_HASHES = ("c1e1de52", "8ba2af87", "0a1b2c3d", "4e5f6a7b")
+
+
+def peak_rss_mb() -> Optional[float]:
+    """当前进程的峰值 RSS(MB)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _folder(name: str, children=()) -> Dict:
+    return {
+        "id": uuid.uuid4().hex[:13].upper(),
+        "name": name,
+        "children": [_folder(child) for child in children],
+    }
+
+
+def _write_image(path: Path, parameters: Optional[str] = None) -> None:
+    info = PngImagePlugin.PngInfo()
+    if parameters:
+        info.add_text("parameters", parameters)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", (8, 8), (len(path.name) % 256, 0, 0)).save(path, pnginfo=info)
+
+
+def _mark_targets(
+    items: List[Dict], folder_id: str, ratio: float, seed: int = 1
+) -> List[Dict]:
+    """把一部分项目放进目标文件夹，返回这些项目"""
+    rng = random.Random(seed)
+    targets = [item for item in items if rng.random() < ratio]
+    for item in targets:
+        item["ext"] = "png"
+        item["folders"].append(folder_id)
+    return targets
+
+
+def _write_images(library_path: Path, items: List[Dict], parameters: Dict[str, str]) -> None:
+    for item in items:
+        path = library_path / "images" / f"{item['id']}.info" / f"{item['name']}.png"
+        _write_image(path, parameters.get(item["id"]))
+
+
+class _StandInPredictor:
+    """
+    wd_tagger.Predictor 的替身: 由图片内容确定性地生成标签
+    使 auto_tagger 的基准只测量资料库读写与更新流程，不包含模型推理
+    """
+
+    def predict(self, image, model_repo, general_thresh, general_mcut_enabled,
+                character_thresh, character_mcut_enabled):
+        rng = random.Random(image.tobytes())
+        rating = {"general": 0.1, "sensitive": 0.1, "questionable": 0.1, "explicit": 0.1}
+        rating[rng.choice(list(rating))] = 0.9
+        character_res = {f"character {rng.randrange(50)}": 0.95}
+        general_res = {f"tag {rng.randrange(500)}": 0.5 for _ in range(10)}
+        return ", ".join(general_res), rating, character_res, general_res
+
+
+# ---------------- 子进程: 单个场景 ----------------
+def _setup_danbooru(folders, items, size):
+    folders.extend(
+        _folder(name)
+        for name in ("year_2024", "Manual", "FromDanbooru", "DanbooruHot",
+                     "general", "sensitive", "questionable", "explicit")
+    )
+    return {"n_posts": max(size // 10, 50)}
+
+
+def _run_danbooru(server: MockServer, ctx: Dict, workdir: Path, latency: float):
+    with open(workdir / "danbooru_config.json", "w", encoding="utf-8") as f:
+        json.dump({"danbooru": {"username": "bench", "api_key": "bench"}}, f)
+    from pybooru import Danbooru
+    import danbooru_api
+    from lib.danbooru_access import throttle_client
+    from lib.downloader import Downloader
+    from lib.eagle_api import EagleAPI
+    from lib.library_index import LibraryIndex
+    from lib.rate_limit import AdaptiveConcurrency, TokenBucket
+
+    danbooru = MockServer("danbooru", latency=latency, library=server.library)
+    cdn = MockServer("files", latency=latency, library=server.library)
+    danbooru.start()
+    cdn.start()
+    posts = generate_posts(ctx["n_posts"], cdn_url=cdn.files_url(), image_bytes=POST_IMAGE_BYTES)
+    server.library.posts = posts
+    load_post_files(server.library, posts, POST_IMAGE_BYTES)
+    try:
+        danbooru_api.backend = EagleAPI(**server.eagle_urls())
+        danbooru_api.library_index = LibraryIndex(workdir / "index.db", danbooru_api.backend)
+        # 替身服务不限速，但请求仍经过访问层(并发控制与重试)
+        danbooru_api.client = throttle_client(
+            Danbooru(site_url=danbooru.danbooru_url(), username="bench", api_key="bench"),
+            TokenBucket(None),
+            AdaptiveConcurrency(max_limit=danbooru_api.Config.MAX_CONCURRENT_REQUESTS),
+        )
+        danbooru_api.downloader = Downloader(workdir / "staging", max_workers=danbooru_api.Config.DOWNLOAD_WORKERS)
+        danbooru_api.Config.MAX_LIMIT = len(posts)
+        yield
+        danbooru_api.main()
+    finally:
+        danbooru.stop()
+        cdn.stop()
+
+
+def _setup_train(folders, items, size):
+    categories = [_folder(root, [f"{root.lower()}_{i}" for i in range(10)])
+                  for root in ("Artist", "Character", "Count")]
+    export = _folder("export_20251025")
+    folders.extend([export, *categories])
+    targets = _mark_targets(items, export["id"], 0.05)
+    for i, item in enumerate(targets):
+        item["folders"].extend(c["children"][i % 10]["id"] for c in categories)
+    return {"images": targets}
+
+
+def _run_train(server: MockServer, ctx: Dict, workdir: Path, latency: float):
+    from lib.eagle_api import EagleAPI
+    import main
+
+    trainer = main.ImageTrainer(
+        eagle=EagleAPI(**server.eagle_urls()),
+        library_path=workdir / "library",
+        destination_folder=workdir / "train",
+        index_path=workdir / "index.db",
+    )
+    yield
+    trainer.train_tag_generate()
+
+
+def _setup_auto_tagger(folders, items, size):
+    inbox = _folder("OvO")
+    folders.extend([inbox, _folder("Rating"), _folder("Character")])
+    return {"images": _mark_targets(items, inbox["id"], 0.02)}
+
+
+def _run_auto_tagger(server: MockServer, ctx: Dict, workdir: Path, latency: float):
+    from lib.eagle_api import EagleAPI
+    import main
+
+    trainer = main.ImageTrainer(
+        eagle=EagleAPI(**server.eagle_urls()),
+        library_path=workdir / "library",
+        destination_folder=workdir / "train",
+        index_path=workdir / "index.db",
+    )
+    yield
+    trainer.auto_tagger()
+
+
+def _setup_sd(folders, items, size):
+    new_ai = _folder("new ai")
+    folders.extend([new_ai, _folder("newaidetected"), _folder("todonai3"), _folder("AI Generated")])
+    targets = _mark_targets(items, new_ai["id"], 0.05)
+    parameters = {
+        item["id"]: f"Steps: 28, Model hash: {MODEL_HASHES[i % len(MODEL_HASHES)]}"
+        for i, item in enumerate(targets)
+    }
+    return {"images": targets, "parameters": parameters}
+
+
+def _run_sd(server: MockServer, ctx: Dict, workdir: Path, latency: float):
+    from lib.eagle_api import EagleAPI
+    import SD_image_tag
+
+    processor = SD_image_tag.ImageMetadataProcessor(
+        eagle=EagleAPI(**server.eagle_urls()),
+        library_path=workdir / "library",
+        index_path=workdir / "index.db",
+    )
+    yield
+    processor.process_ai_images()
+
+
+def run_scenario(scenario: str, size: int, latency: float, real_tagger: bool = False) -> Dict:
+    """在当前进程中准备并运行一个场景，返回测量结果"""
+    setup = globals()[f"_setup_{scenario}"]
+    runner = globals()[f"_run_{scenario}"]
+    if not real_tagger:
+        sys.modules["wd_tagger"] = types.SimpleNamespace(Predictor=_StandInPredictor)
+    os.environ.setdefault("NO_PROXY", "127.0.0.1,localhost")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = Path(tmp)
+        os.chdir(workdir)
+        folders, items = generate_library(size)
+        ctx = setup(folders, items, size)
+        if ctx.get("images"):
+            _write_images(workdir / "library", ctx["images"], ctx.get("parameters", {}))
+        write_library_tree(workdir / "library", folders, items)
+
+        with MockServer(latency=latency) as server:
+            load_into_mock(server.library, folders, items)
+            steps = runner(server, ctx, workdir, latency)
+            next(steps)  # 准备阶段(导入模块、构造客户端)不计时
+            setup_rss = peak_rss_mb()
+            requests_before = sum(server.library.request_counts.values())
+
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+                start = time.perf_counter()
+                next(steps, None)
+                wall = time.perf_counter() - start
+            requests = sum(server.library.request_counts.values()) - requests_before
+    peak_rss = peak_rss_mb()
+
+    return {
+        "scenario": scenario,
+        "items": size,
+        "wall_s": round(wall, 3),
+        "requests": requests,
+        "req_per_s": round(requests / wall, 1) if wall else None,
+        "setup_rss_mb": setup_rss and round(setup_rss, 1),
+        "peak_rss_mb": peak_rss and round(peak_rss, 1),
+    }
+
+
+# ---------------- 主进程: 汇总 ----------------
+def _run_worker(scenario: str, size: int, args) -> Dict:
+    command = [sys.executable, "-m", "benchmarks.run_benchmarks",
+               "--worker", scenario, "--sizes", str(size), "--latency", str(args.latency)]
+    if args.real_tagger:
+        command.append("--real-tagger")
+    pythonpath = os.pathsep.join(filter(None, [str(ROOT), os.environ.get("PYTHONPATH")]))
+    proc = subprocess.run(
+        command, capture_output=True, text=True, cwd=ROOT, env={**os.environ, "PYTHONPATH": pythonpath}
+    )
+    if proc.returncode != 0:
+        error = (proc.stderr.strip().splitlines() or ["unknown error"])[-1]
+        return {"scenario": scenario, "items": size, "error": error}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def _print_table(results: List[Dict]) -> None:
+    header = f"{'scenario':<12} {'items':>7} {'wall(s)':>9} {'requests':>9} {'req/s':>9} {'peak RSS(MB)':>13}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        if "error" in r:
+            print(f"{r['scenario']:<12} {r['items']:>7}  FAILED: {r['error']}")
+            continue
+        print(
+            f"{r['scenario']:<12} {r['items']:>7} {r['wall_s']:>9.2f} {r['requests']:>9} "
+            f"{r['req_per_s'] or 0:>9.0f} {r['peak_rss_mb'] or 0:>13.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟服务端延迟(秒)")
+    parser.add_argument("--real-tagger", action="store_true", help="auto_tagger 使用真实 wd_tagger 模型")
+    parser.add_argument("--output", help="结果另存为 JSON 文件")
+    parser.add_argument("--worker", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_scenario(args.worker, args.sizes[0], args.latency, args.real_tagger)))
+        return
+
+    results = []
+    for size in args.sizes:
+        for scenario in args.scenarios:
+            print(f"[Bench] {scenario} @ {size} items ...", flush=True)
+            results.append(_run_worker(scenario, size, args))
+    print()
+    _print_table(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""
+合成资料库生成器
+生成 N 个项目、指定深度的文件夹树和每项若干标签，
+可以写成 Eagle 磁盘目录结构，也可以装入替身服务；
+另可生成 Danbooru 帖子，供替身服务的 /posts.json 使用，
+以及帖子对应的图片内容，供替身服务的图片 CDN 使用。
+"""
+
+import hashlib
+import json
+import os
+import random
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+from urllib.parse import urlparse
+
+from benchmarks.mock_server import MockLibrary
+
+
+def _new_id() -> str:
+    return uuid.uuid4().hex[:13].upper()
+
+
+def generate_folders(depth: int = 2, fanout: int = 4, roots: Tuple[str, ...] = ()) -> List[Dict]:
+    """
+    生成嵌套文件夹树(结构同 /api/folder/list)
+    :param depth: 根文件夹以下的层数
+    :param fanout: 每层子文件夹数
+    :param roots: 根文件夹名称，默认 Root0..Root{fanout-1}
+    """
+
+    def build(name: str, level: int) -> Dict:
+        node = {"id": _new_id(), "name": name, "children": []}
+        if level < depth:
+            node["children"] = [build(f"{name}_{i}", level + 1) for i in range(fanout)]
+        return node
+
+    roots = roots or tuple(f"Root{i}" for i in range(fanout))
+    return [build(name, 0) for name in roots]
+
+
+def _flatten(folders: List[Dict]) -> List[str]:
+    ids, stack = [], list(folders)
+    while stack:
+        node = stack.pop()
+        ids.append(node["id"])
+        stack.extend(node.get("children", []))
+    return ids
+
+
+def generate_items(
+    n_items: int,
+    folders: List[Dict],
+    tags_per_item: int = 8,
+    folders_per_item: int = 3,
+    tag_vocabulary: int = 5000,
+    danbooru_ratio: float = 0.5,
+    seed: int = 0,
+) -> List[Dict]:
+    """
+    生成项目字典(字段同 get_items 返回值)
+    :param danbooru_ratio: url 指向 Danbooru 帖子的比例
+    """
+    rng = random.Random(seed)
+    folder_ids = _flatten(folders)
+    vocabulary = [f"tag_{i}" for i in range(tag_vocabulary)]
+    now = int(time.time() * 1000)
+    items = []
+    for i in range(n_items):
+        is_danbooru = rng.random() < danbooru_ratio
+        items.append(
+            {
+                "id": _new_id(),
+                "name": f"image_{i}",
+                "size": rng.randint(50_000, 5_000_000),
+                "ext": rng.choice(("png", "jpg", "webp")),
+                "tags": rng.sample(vocabulary, tags_per_item),
+                "folders": rng.sample(folder_ids, min(folders_per_item, len(folder_ids))),
+                "isDeleted": False,
+                "url": f"https://danbooru.donmai.us/posts/{i + 1}" if is_danbooru else "",
+                "annotation": "",
+                "modificationTime": now,
+                "lastModified": now,
+                "width": 1024,
+                "height": 1024,
+            }
+        )
+    return items
+
+
+def generate_library(
+    n_items: int,
+    folder_depth: int = 2,
+    folder_fanout: int = 4,
+    tags_per_item: int = 8,
+    seed: int = 0,
+) -> Tuple[List[Dict], List[Dict]]:
+    """生成 (文件夹树, 项目列表)"""
+    folders = generate_folders(folder_depth, folder_fanout)
+    items = generate_items(n_items, folders, tags_per_item=tags_per_item, seed=seed)
+    return folders, items
+
+
+def generate_posts(
+    n_posts: int,
+    start_id: int = 1,
+    tags_per_post: int = 20,
+    tag_vocabulary: int = 5000,
+    seed: int = 0,
+    cdn_url: str = "https://cdn.donmai.us",
+    image_bytes: int = 0,
+) -> List[Dict]:
+    """
+    生成 Danbooru 帖子(字段同 /posts.json 返回的完整对象，含 media_asset 变体)，按 id 降序
+    帖子 id 为 start_id..start_id+n_posts-1，与 generate_items 的 Danbooru url 可以重叠
+    :param cdn_url: 图片地址前缀(可指向替身服务的图片 CDN)
+    :param image_bytes: 大于 0 时 md5 取 post_content() 的 md5，可与 load_post_files 配合校验下载
+    """
+    rng = random.Random(seed)
+    vocabulary = [f"tag_{i}" for i in range(tag_vocabulary)]
+    counts = ["1girl", "2girls", "1boy", "solo", "multiple_girls"]
+    posts = []
+    for post_id in range(start_id + n_posts - 1, start_id - 1, -1):
+        general = [rng.choice(counts), *rng.sample(vocabulary, tags_per_post)]
+        copyright_tag = f"copyright_{rng.randrange(200)}"
+        character = f"character_{rng.randrange(2000)}"
+        artist = f"artist_{rng.randrange(5000)}"
+        if image_bytes:
+            md5 = hashlib.md5(post_content(post_id, image_bytes)).hexdigest()
+        else:
+            md5 = hashlib.md5(str(post_id).encode()).hexdigest()
+        cdn = f"{cdn_url}/{{}}/{md5[:2]}/{md5[2:4]}/{{}}{md5}.{{}}"
+        width, height = rng.choice(((1200, 1600), (2048, 1536), (850, 1200)))
+        timestamp = "2024-05-01T12:00:00.000+09:00"
+        variants = [
+            {"type": size, "url": cdn.format(size, "", "jpg"), "width": w, "height": h, "file_ext": "jpg"}
+            for size, w, h in (("180x180", 135, 180), ("360x360", 270, 360), ("720x720", 540, 720))
+        ] + [
+            {"type": "sample", "url": cdn.format("sample", "sample-", "jpg"), "width": 850, "height": 1133, "file_ext": "jpg"},
+            {"type": "original", "url": cdn.format("original", "", "jpg"), "width": width, "height": height, "file_ext": "jpg"},
+        ]
+        posts.append(
+            {
+                "id": post_id,
+                "created_at": timestamp,
+                "updated_at": timestamp,
+                "uploader_id": rng.randrange(1, 10**6),
+                "approver_id": None,
+                "score": rng.randrange(0, 500),
+                "up_score": rng.randrange(0, 500),
+                "down_score": -rng.randrange(0, 10),
+                "fav_count": rng.randrange(0, 1000),
+                "source": f"https://www.pixiv.net/artworks/{rng.randrange(10**8)}",
+                "pixiv_id": rng.randrange(10**8),
+                "md5": md5,
+                "rating": rng.choice("gsqe"),
+                "image_width": width,
+                "image_height": height,
+                "file_ext": "jpg",
+                "file_size": rng.randrange(100_000, 5_000_000),
+                "parent_id": None,
+                "has_children": False,
+                "has_active_children": False,
+                "has_visible_children": False,
+                "has_large": True,
+                "is_pending": False,
+                "is_flagged": False,
+                "is_deleted": False,
+                "is_banned": False,
+                "bit_flags": 0,
+                "last_comment_bumped_at": None,
+                "last_commented_at": None,
+                "last_noted_at": None,
+                "tag_count": len(general) + 4,
+                "tag_count_general": len(general),
+                "tag_count_artist": 1,
+                "tag_count_character": 1,
+                "tag_count_copyright": 1,
+                "tag_count_meta": 1,
+                "tag_string": " ".join([*general, character, copyright_tag, artist, "highres"]),
+                "tag_string_general": " ".join(general),
+                "tag_string_character": character,
+                "tag_string_copyright": copyright_tag,
+                "tag_string_artist": artist,
+                "tag_string_meta": "highres",
+                "file_url": cdn.format("original", "", "jpg"),
+                "large_file_url": cdn.format("sample", "sample-", "jpg"),
+                "preview_file_url": cdn.format("180x180", "", "jpg"),
+                "media_asset": {
+                    "id": post_id * 7,
+                    "created_at": timestamp,
+                    "updated_at": timestamp,
+                    "md5": md5,
+                    "file_ext": "jpg",
+                    "file_size": rng.randrange(100_000, 5_000_000),
+                    "image_width": width,
+                    "image_height": height,
+                    "duration": None,
+                    "status": "active",
+                    "file_key": uuid.uuid4().hex[:9],
+                    "is_public": True,
+                    "pixel_hash": uuid.uuid4().hex,
+                    "variants": variants,
+                },
+            }
+        )
+    return posts
+
+
+def post_content(post_id: int, size: int, variant: str = "original") -> bytes:
+    """帖子图片的确定性内容(随机字节，按帖子 id 与变体可复现)"""
+    return random.Random(f"{variant}-{post_id}").randbytes(size)
+
+
+def load_post_files(library: MockLibrary, posts: List[Dict], image_bytes: int) -> MockLibrary:
+    """
+    把帖子的原图(file_url)与大图(large_file_url)装入替身服务的图片 CDN
+    :param image_bytes: 原图大小，应与 generate_posts 的 image_bytes 一致；大图取其一半
+    """
+    files = {}
+    for post in posts:
+        files[urlparse(post["file_url"]).path] = post_content(post["id"], image_bytes)
+        files[urlparse(post["large_file_url"]).path] = post_content(post["id"], image_bytes // 2, "sample")
+    with library.lock:
+        library.files.update(files)
+    return library
+
+
+def write_library_tree(path: Union[str, Path], folders: List[Dict], items: List[Dict]) -> Path:
+    """
+    按 Eagle 磁盘结构写出资料库(只写 metadata.json，不写图片)
+    :return: 资料库根目录
+    """
+    root = Path(path)
+    images = root / "images"
+    images.mkdir(parents=True, exist_ok=True)
+    with open(root / "metadata.json", "w", encoding="utf-8") as f:
+        json.dump({"folders": folders, "smartFolders": [], "tagsGroups": []}, f)
+    for item in items:
+        info = images / f"{item['id']}.info"
+        os.makedirs(info, exist_ok=True)
+        with open(info / "metadata.json", "w", encoding="utf-8") as f:
+            json.dump(item, f)
+    return root
+
+
+def load_into_mock(library: MockLibrary, folders: List[Dict], items: List[Dict]) -> MockLibrary:
+    """把生成的资料库装入替身服务"""
+    with library.lock:
+        library.folders.extend(folders)
+        stack = list(folders)
+        while stack:
+            node = stack.pop()
+            library.folder_nodes[node["id"]] = node
+            stack.extend(node.get("children", []))
+        for item in items:
+            library.items[item["id"]] = item
+    return library
@@ -1,11 +1,28 @@
+import contextlib
 import datetime
 import os
 import re
-from typing import List, Dict, Optional
-
-from pybooru import Danbooru
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Container, Dict, Iterator, List, Optional, Tuple
+
+from lib.crawl_checkpoint import CheckpointTracker, CrawlCheckpoints
+from lib.danbooru_access import get_client
+from lib.download_cache import DownloadCache
+from lib.downloader import Downloader
 from lib.eagle_api import EagleAPI
+from lib.folder_index import FolderIndex
+from lib.import_batcher import ImportBatcher
+from lib.known_posts import KnownPosts
+from lib.library_index import LibraryIndex
+from lib.paging import iter_pages_concurrent, iter_pages_keyset
+from lib.perceptual_hash import hash_image_file
+from lib.perceptual_index import PerceptualIndex
+from lib.pipeline import Pipeline
+from lib.query_planner import explain, is_metatag, plan_tags
 from lib.synap_forest_api import SynapForestAPI
+from lib.tag_counts import TOTAL_KEY, TagCountCache
+from lib.tag_filter import TagFilter, is_local_only
 from danbooru_config import config  # 导入配置文件
 
 
@@ -22,15 +39,76 @@ class Config:
     用于集中管理查询条件、账户信息、分页设置等。
     """
 
-    SEARCH_QUERYS = ["order:rank"]  # 支持多标签与反选（-tag）
+    SEARCH_QUERYS = ["order:rank"]  # 支持多标签、反选（-tag）、OR 组（~a ~b）与通配（*_hair）
     USERNAME = config["danbooru"]["username"]
     API_KEY = config["danbooru"]["api_key"]
     LIMIT_PER_PAGE = 50  # 每页请求数量(Danbooru API 最大 100)
     MAX_LIMIT = 50  # 每次查询最大总数量
+    MAX_CONCURRENT_PAGES = 4  # 同时在途的请求数初始值，之后按延迟与 429 在 1..MAX_CONCURRENT_REQUESTS 间自适应
+    REQUESTS_PER_SECOND = 8  # Danbooru 请求速率上限(与账户等级的限速一致)
+    REQUEST_BURST = 16  # 空闲后允许的突发请求数
+    MAX_CONCURRENT_REQUESTS = 8  # 自适应并发上限的最大值
+    MAX_RETRIES = 5  # 429/5xx 的最大重试次数
+    LIBRARY_INDEX_PATH = "library_index.db"  # 本地资料库镜像
+    INDEX_MAX_AGE = 600  # 镜像超过该秒数未同步时才与服务端增量同步
+    KNOWN_POSTS_PATH = "danbooru_known_posts.db"  # 已导入帖子索引(id、md5)
+    KNOWN_POSTS_RECONCILE = 86400  # 已导入帖子索引与资料库对账的间隔(秒)
+    CHECKPOINT_PATH = "danbooru_checkpoints.db"  # 每个查询的抓取检查点
+    CHECKPOINT_EVERY_PAGES = 10  # 每完成多少页保存一次检查点
+    PIPELINE_PAGE_QUEUE = 4  # 流水线中等待筛选的页面数上限
+    PIPELINE_POST_QUEUE = 200  # 流水线中等待解析/上传的帖子数上限
+    UPLOAD_WORKERS = 8  # 并发上传线程数
+    FOLDER_WORKERS = 8  # 批量预建文件夹时的并发请求数
+    MAX_SERVER_TAGS = 2  # API 单次搜索的标签数上限
+    TAG_COUNT_CACHE_PATH = "danbooru_tag_counts.db"  # 标签帖子数缓存
+    TAG_COUNT_TTL = 86400  # 标签帖子数缓存有效期(秒)
+    PROJECT_POST_FIELDS = True  # 只请求 POST_FIELDS 中的字段(only= 参数)
+    VERBOSE_FILTER = False  # 逐条输出本地筛选淘汰的帖子及原因
+    DOWNLOAD_LOCALLY = True  # 先并发下载到缓存目录再用 addFromPath 导入(后端不支持时仍用 addFromURL)
+    DOWNLOAD_VARIANT = "original"  # "original" 原图(按 md5 校验) 或 "large"/"sample" 大图
+    STAGING_DIR = "danbooru_staging"  # 下载缓存目录(按 md5 寻址，danbooru_md5.py 共用)
+    DOWNLOAD_CACHE_MAX_BYTES = 20 * 1024**3  # 下载缓存大小上限，超出时淘汰最久未用的文件
+    DOWNLOAD_WORKERS = 8  # 并发下载线程数
+    SKIP_NEAR_DUPLICATES = True  # 导入前与感知哈希索引比较，跳过资料库中已有的近似重复图片(需本地下载)
+    PERCEPTUAL_INDEX_PATH = "perceptual_index.db"  # 感知哈希索引(由 find_duplicates.py 建立与更新)
+    PERCEPTUAL_METHOD = "dhash"  # 与 find_duplicates.py 一致
+    NEAR_DUP_DISTANCE = 4  # 64 位哈希中不超过该汉明距离视为近似重复
+
+
+# 初始化 Danbooru 客户端: 所有请求经由进程内共享的访问层(令牌桶 + 自适应并发 + 429 重试)
+client = get_client(
+    Config.USERNAME,
+    Config.API_KEY,
+    rate=Config.REQUESTS_PER_SECOND,
+    burst=Config.REQUEST_BURST,
+    initial_concurrency=Config.MAX_CONCURRENT_PAGES,
+    max_concurrency=Config.MAX_CONCURRENT_REQUESTS,
+    retries=Config.MAX_RETRIES,
+)
 
-
-# 初始化 Danbooru 客户端
-client = Danbooru("danbooru", username=Config.USERNAME, api_key=Config.API_KEY)
+# 本地存储在首次使用时才创建(由对应的 get_* 函数)，导入本模块不会在工作目录中生成文件；
+# 预先赋值(如基准测试指向临时目录)时直接使用赋入的对象
+library_index: Optional[LibraryIndex] = None  # 本地资料库镜像
+known_posts: Optional[KnownPosts] = None  # 已导入帖子索引(查重用，成功导入后写入)
+tag_count_cache: Optional[TagCountCache] = None  # 标签帖子数缓存(查询规划用)
+downloader: Optional[Downloader] = None  # 图片下载器(连接池 + .part 续传)，文件存放在按 md5 寻址的 LRU 缓存中
+stores_lock = threading.Lock()
+
+# 流水线实际读取的帖子字段，用于 only= 字段投影；新增对帖子字段的读取时需同步添加
+POST_FIELDS = (
+    "id",
+    "md5",
+    "file_url",
+    "large_file_url",
+    "file_ext",
+    "created_at",
+    "rating",
+    "tag_string_general",
+    "tag_string_character",
+    "tag_string_copyright",
+    "tag_string_artist",
+    "tag_string_meta",
+)
 
 # 评分映射
 RATING_MAP = {"e": "explicit", "s": "sensitive", "g": "general", "q": "questionable"}
@@ -43,55 +121,160 @@ COUNT_TAG_PATTERN = re.compile(
 # 正则: 提取 Danbooru 图片 URL 中的 ID
 DANBOORU_ID_PATTERN = re.compile(r"https://danbooru\.donmai\.us/posts/(\d+)")
 
-# 全局文件夹映射缓存
-folder_id_to_name = {}
-folder_name_to_id = {}
-folder_to_root = {}
+# 全局文件夹索引缓存
+folder_index = FolderIndex()
+
+# 文件夹创建统计: 预建请求数、预建轮数、逐帖回退创建数
+folder_stats = {"precreated": 0, "rounds": 0, "fallback_created": 0}
+folder_lock = threading.RLock()  # 创建文件夹(写 folder_index)时持有
+
+# 感知哈希索引(按需载入) 与近似重复检查统计
+perceptual_index: Optional[PerceptualIndex] = None
+near_dup_stats = {"checked": 0, "skipped": 0}
+near_dup_lock = threading.Lock()
 
 
 # ======================================
-#         文件夹映射与创建逻辑
+#              本地存储
 # ======================================
-def update_folder_mappings():
-    """
-    更新全局文件夹映射
-    """
-    global folder_id_to_name, folder_name_to_id, folder_to_root
-    folder_id_to_name, folder_name_to_id, folder_to_root = (
-        backend.get_folder_list_recursive()
-    )
+def get_library_index() -> LibraryIndex:
+    global library_index
+    with stores_lock:
+        if library_index is None:
+            library_index = LibraryIndex(Config.LIBRARY_INDEX_PATH, backend)
+        return library_index
 
 
-def add_folder_mappings(name: str, id: str, root_id: str):
+def get_known_posts() -> KnownPosts:
+    global known_posts
+    with stores_lock:
+        if known_posts is None:
+            known_posts = KnownPosts(Config.KNOWN_POSTS_PATH)
+        return known_posts
+
+
+def get_tag_count_cache() -> TagCountCache:
+    global tag_count_cache
+    with stores_lock:
+        if tag_count_cache is None:
+            tag_count_cache = TagCountCache(Config.TAG_COUNT_CACHE_PATH, Config.TAG_COUNT_TTL)
+        return tag_count_cache
+
+
+def get_downloader() -> Downloader:
+    global downloader
+    with stores_lock:
+        if downloader is None:
+            downloader = Downloader(
+                DownloadCache(Config.STAGING_DIR, Config.DOWNLOAD_CACHE_MAX_BYTES),
+                max_workers=Config.DOWNLOAD_WORKERS,
+            )
+        return downloader
+
+
+# ======================================
+#         文件夹映射与创建逻辑
+# ======================================
+def update_folder_mappings():
     """
-    更新本地文件夹映射表。
+    更新全局文件夹索引
     """
-    global folder_id_to_name, folder_name_to_id, folder_to_root
-    folder_name_to_id[name] = id
-    folder_id_to_name[id] = name
-    folder_to_root[id] = root_id
+    global folder_index
+    folder_index = backend.get_folder_list_recursive()
 
 
-def create_folder_if_valid(category: str, folder_type: str) -> None:
+def create_folder_if_valid(category: str, folder_type: str) -> Optional[str]:
     """
     创建文件夹(如果不存在)。
     自动在指定的“类型文件夹”下创建“类别子文件夹”。
+    类别按 (类型文件夹, 名称) 查找，不同作品下的同名角色各自独立。
     :param category: 文件夹类别
     :param folder_type: 文件夹类型名称
+    :return: 类别文件夹 ID
     """
-    global folder_name_to_id, folder_id_to_name, folder_to_root
-
-    # 创建顶级类型文件夹
-    if folder_type not in folder_name_to_id:
-        new_id = backend.create_folder(folder_name=folder_type)
-        add_folder_mappings(folder_type, new_id, new_id)
+    # 已存在(通常已由 precreate_folders 预建)时只查字典
+    category_id = lookup_folder(category, folder_type)
+    if category_id is not None:
+        return category_id
+
+    with folder_lock:
+        # 创建顶级类型文件夹
+        folder_type_id = folder_index.get_id(folder_type)
+        if folder_type_id is None:
+            folder_type_id = backend.create_folder(folder_name=folder_type)
+            folder_index.add(folder_type_id, folder_type)
+            folder_stats["fallback_created"] += 1
+
+        # 创建类别文件夹
+        if not category or folder_type_id is None:
+            return None
+        category_id = folder_index.find(category, folder_type_id)
+        if category_id is None:
+            category_id = backend.create_folder(category, folder_type_id)
+            folder_index.add(category_id, category, folder_type_id)
+            folder_stats["fallback_created"] += 1
+        return category_id
+
+
+def lookup_folder(category: str, folder_type: str) -> Optional[str]:
+    """只查找类别文件夹(不创建)，规则同 create_folder_if_valid"""
+    folder_type_id = folder_index.get_id(folder_type)
+    if not category or folder_type_id is None:
+        return None
+    return folder_index.find(category, folder_type_id)
+
+
+def _create_folders(requests: List[Tuple[str, Optional[str]]]) -> None:
+    """并发创建一批互不依赖的文件夹 (名称, 父文件夹ID)，结果在当前线程写入索引"""
+    with ThreadPoolExecutor(max_workers=Config.FOLDER_WORKERS) as executor:
+        created = list(executor.map(lambda r: backend.create_folder(r[0], r[1]), requests))
+    for (name, parent), folder_id in zip(requests, created):
+        folder_index.add(folder_id, name, parent)
+    folder_stats["precreated"] += len(requests)
+    folder_stats["rounds"] += 1
+
+
+def precreate_folders(posts: List[Dict]) -> int:
+    """
+    扫描一批帖子，按依赖分层批量创建缺失的类型文件夹与类别文件夹:
+    顶层类型文件夹 -> 类型下的类别(Artist/xxx、CopyrightNew/xxx ...) -> 作品下的角色
+    每层内的请求互不依赖，并发发出；之后 resolve_post 只需查字典
+    :return: 本次创建请求数
+    """
+    pending = {
+        (folder_type, tag)
+        for post in posts
+        if "file_url" in post
+        for folder_type, tags in folder_tag_groups(post)
+        for tag in tags
+        if tag
+    }
+    with folder_lock:
+        before = folder_stats["precreated"]
+        while pending:
+            ready = {pair for pair in pending if folder_index.get_id(pair[0]) is not None}
+            if not ready:
+                # 类型文件夹不存在: 不会由其他类别创建出来的类型，按 create_folder_if_valid 的规则建在顶层
+                produced = {category for _, category in pending}
+                types = {t for t, _ in pending if t not in produced} or {t for t, _ in pending}
+                _create_folders([(name, None) for name in sorted(types)])
+                # 创建失败的类型放弃，其类别交给逐帖回退
+                pending = {
+                    pair
+                    for pair in pending
+                    if pair[0] not in types or folder_index.get_id(pair[0]) is not None
+                }
+                continue
 
-    # 创建类别文件夹
-    if category and category not in folder_name_to_id:
-        folder_type_id = folder_name_to_id.get(folder_type)
-        if folder_type_id is not None:
-            new_id = backend.create_folder(category, folder_type_id)
-            add_folder_mappings(category, new_id, folder_to_root[folder_type_id])
+            pending -= ready
+            missing = {}
+            for folder_type, category in ready:
+                parent = folder_index.get_id(folder_type)
+                if folder_index.find(category, parent) is None:
+                    missing[(category, parent)] = None
+            if missing:
+                _create_folders(list(missing))
+        return folder_stats["precreated"] - before
 
 
 # ======================================
@@ -114,83 +297,304 @@ def parse_query(query: str) -> tuple[list[str], list[str]]:
     return include_tags, exclude_tags
 
 
-def get_all_results(
+def post_list(**params) -> List[Dict]:
+    """
+    client.post_list 的包装: 开启 Config.PROJECT_POST_FIELDS 时只请求 POST_FIELDS，
+    省去完整帖子对象中用不到的几十个字段与媒体变体信息
+    """
+    if Config.PROJECT_POST_FIELDS:
+        params["only"] = ",".join(POST_FIELDS)
+    return client.post_list(**params)
+
+
+def fetch_tag_counts(names: List[str]) -> Optional[Dict[str, int]]:
+    """
+    批量查询标签帖子数，TOTAL_KEY 表示全站帖子总数
+    :return: {标签: 帖子数}，服务端不存在的标签不在其中；请求失败返回 None
+    """
+    counts = {}
+    tags = [name for name in names if name != TOTAL_KEY]
+    try:
+        if TOTAL_KEY in names:
+            counts[TOTAL_KEY] = client.count_posts("")["counts"]["posts"]
+        # tags.json 每页默认 20 条
+        for start in range(0, len(tags), 20):
+            for tag in client.tag_list(name=",".join(tags[start : start + 20])):
+                counts[tag["name"]] = tag["post_count"]
+    except Exception as e:
+        print(f"[Planner] Fetching tag counts failed: {e}")
+        return None
+    return counts
+
+
+def plan_search(query: str, limit_per_page: int = Config.LIMIT_PER_PAGE) -> Dict:
+    """
+    为查询生成搜索方案: 在 API 标签数上限内选择最有选择性的条件，其余在本地过滤
+    标签帖子数来自本地缓存，过期或缺失时才向 Danbooru 查询；查询失败时退化为朴素方案
+    可选标签不多于剩余名额(没有可重排的条件)时不查询帖子数
+    :return: plan_tags() 的结果，另含 "filter": 由本地条件编译的 TagFilter
+    """
+    include_tags, exclude_tags = parse_query(query)
+    names = [
+        t.lower() for t in include_tags + exclude_tags if not is_metatag(t) and not is_local_only(t)
+    ]
+    metatags = [t for t in include_tags + exclude_tags if is_metatag(t)]
+    slots = max(Config.MAX_SERVER_TAGS - len(metatags), 0)
+    reorder = 0 < slots < len(names)
+    counts = get_tag_count_cache().get_many(names + [TOTAL_KEY], fetch_tag_counts) if reorder else {}
+    total = counts.pop(TOTAL_KEY, 0)
+    plan = plan_tags(
+        include_tags,
+        exclude_tags,
+        {name: counts[name.lower()] for name in include_tags + exclude_tags if name.lower() in counts},
+        total,
+        max_server_tags=Config.MAX_SERVER_TAGS,
+        page_size=limit_per_page,
+    )
+    plan["filter"] = TagFilter(plan["local_include"], plan["local_exclude"])
+    if reorder:
+        print(f"[Planner] '{query}': {explain(plan)}")
+    else:
+        print(
+            f"[Planner] '{query}': server {plan['server_tags']} + local {plan['local_include']}"
+            f" - {plan['local_exclude']} (nothing to reorder)"
+        )
+    return plan
+
+
+def keyset_direction(api_tags: List[str]) -> Optional[str]:
+    """
+    判断查询能否使用游标分页(page=b<id> / a<id>)
+    Danbooru 的游标只对按 id 排序的查询有效
+    :param api_tags: 实际发送给 API 的标签
+    :return: "b"(id 降序，默认排序)、"a"(order:id 升序)，其他排序返回 None
+    """
+    orders = [
+        tag.lower()
+        for tag in api_tags
+        if tag.lower().startswith(("order:", "ordfav:", "ordpool:", "random:"))
+    ]
+    if not orders or orders[-1] == "order:id_desc":
+        return "b"
+    if orders[-1] in ("order:id", "order:id_asc"):
+        return "a"
+    return None
+
+
+def iter_numbered_pages(
+    api_tags: str, limit_per_page: int, remaining: Callable[[], int]
+) -> Iterator[Tuple[int, List[Dict]]]:
+    """
+    页码分页: 按剩余需求分轮并发请求，逐页产出 (页码, 帖子)
+    - 每轮按 remaining() 估算还需要的页数，去重造成的缺口在下一轮补齐
+    - 在途请求数由共享访问层按延迟与限流自适应调整，遇到空页结束
+    """
+
+    def fetch(page_no: int) -> List[Dict]:
+        return post_list(tags=api_tags, page=page_no, limit=limit_per_page)
+
+    page = 1
+    while remaining() > 0:
+        pages_needed = -(-remaining() // limit_per_page)
+        fetched_pages = 0
+        for page_no, results in iter_pages_concurrent(
+            fetch,
+            start_page=page,
+            max_pages=pages_needed,
+            concurrency=Config.MAX_CONCURRENT_REQUESTS,  # 实际在途请求数由访问层自适应限制
+        ):
+            fetched_pages += 1
+            yield page_no, results
+        if fetched_pages < pages_needed:
+            return
+        page += fetched_pages
+
+
+def iter_keyset_pages(
+    api_tags: str, direction: str, limit_per_page: int, cursor: Optional[str] = None
+) -> Iterator[Tuple[Optional[str], List[Dict]]]:
+    """
+    游标分页: 以上一页边界 id 翻页，逐页产出 (游标, 帖子)，每页代价与深度无关
+    """
+    return iter_pages_keyset(
+        lambda page: post_list(tags=api_tags, page=page, limit=limit_per_page),
+        direction=direction,
+        cursor=cursor,
+        page_size=limit_per_page,
+    )
+
+
+def crawl_query(
     query: str,
     limit_per_page: int = Config.LIMIT_PER_PAGE,
     max_limit: int = Config.MAX_LIMIT,
-) -> List[Dict]:
+    checkpoint: Optional[Dict] = None,
+    local_filter: bool = True,
+    plan: Optional[Dict] = None,
+    known_ids: Optional[Container[int]] = None,
+) -> Iterator[Tuple[Dict, List[Dict]]]:
     """
-    分页获取 Danbooru 搜索结果，支持多标签本地筛选与反选。
+    逐页抓取 Danbooru 搜索结果并本地筛选，产出 (处理完该页后的检查点, 筛选后的帖子)。
+    - id 降序的查询: 先抓取比 newest_id 新的帖子(头部)，再从 cursor 继续未完成的回填(尾部)；
+      头部抓取中断时记下 head_cursor 与 pending_newest_id，下次运行先从 head_cursor 抓完这一段
+      再提升 newest_id，然后再从最新的帖子抓起
+    - order:id 升序的查询: 从 a<newest_id> 继续向新的方向抓取
+    - 其他排序(如 order:rank)不支持增量，检查点原样产出
+    - 达到 max_limit(去重后、本地筛选前的帖子数)或请求失败后停止；游标分页时 known_ids 中的帖子不计入，
+      页码分页每次从第一页翻起，全部计入(否则已导入的帖子占多数时每次都会翻到结果末尾)
+    调用方应在该页帖子处理完(导入已提交)之后再保存产出的检查点。
+    :param checkpoint: CrawlCheckpoints.get() 的结果，None 或空字典表示从头抓取
+    :param local_filter: 是否在此处执行本地筛选；为 False 时产出去重后的原始帖子
+    :param plan: plan_search() 的结果，默认在此生成
+    :param known_ids: 已导入的帖子 id(如 KnownPosts)，仍会产出，游标分页时不计入 max_limit
     """
-    include_tags, exclude_tags = parse_query(query)
-
-    # API 仅支持两个标签
-    api_tags = " ".join(include_tags[:2]) if include_tags else ""
+    plan = plan or plan_search(query, limit_per_page)
+    local_include, local_exclude = plan["local_include"], plan["local_exclude"]
+    tag_filter = plan.get("filter")
+    if tag_filter is None:
+        tag_filter = TagFilter(local_include, local_exclude)
+
+    # API 仅支持 Config.MAX_SERVER_TAGS 个标签，其余条件本地过滤
+    api_tags = " ".join(plan["server_tags"])
+    direction = keyset_direction(plan["server_tags"])
+    state = dict(checkpoint or {})
+    newest_id = state.get("newest_id")
     print(
-        f"[Danbooru] API 查询: {api_tags} | 本地过滤: {include_tags[2:]} - {exclude_tags}"
+        f"[Danbooru] API 查询: {api_tags} | 本地过滤: {local_include} - {local_exclude}"
+        f" | 分页: {'游标 ' + direction if direction else '页码'}"
+        + (f" | 检查点: {state}" if state else "")
     )
 
-    all_results = []
-    page = 1
-
-    while len(all_results) < max_limit:
-        try:
-            results = client.post_list(tags=api_tags, page=page, limit=limit_per_page)
-            if not results:
+    # 抓取阶段: (类型, 起始游标)
+    if direction == "b" and newest_id is not None:
+        passes = [("head", None)]
+        if state.get("head_cursor"):
+            passes.insert(0, ("head", state["head_cursor"]))
+        if not state.get("complete"):
+            passes.append(("tail", state.get("cursor")))
+    elif direction == "b":
+        passes = [("tail", None)]
+    elif direction == "a":
+        passes = [("tail", f"a{newest_id}" if newest_id is not None else None)]
+    else:
+        passes = [("numbered", None)]
+
+    seen_ids = set()
+    fetched = 0
+    page = None
+    try:
+        for kind, cursor in passes:
+            if kind == "tail" and state.get("complete"):
                 break
-            all_results.extend(results)
-            print(f"[Danbooru] Page {page}: fetched {len(results)} results.")
-            page += 1
-        except Exception as e:
-            print(f"[Error] Fetching '{api_tags}' page {page} failed: {e}")
-            break
-
-    print(f"[Danbooru] Total {len(all_results)} results before filtering.")
-    return filter_local_posts(all_results, include_tags[2:], exclude_tags)
+            if kind == "numbered":
+                pages = iter_numbered_pages(
+                    api_tags, limit_per_page, lambda: max_limit - fetched
+                )
+            else:
+                pages = iter_keyset_pages(api_tags, direction, limit_per_page, cursor)
+
+            newest_id = state.get("newest_id")
+            head_top = state.get("pending_newest_id") if cursor and kind == "head" else None
+            reached = False
+            with contextlib.closing(pages):
+                for page, results in pages:
+                    ids = [p["id"] for p in results]
+                    if kind == "head":
+                        # 头部: 只保留比高水位新的帖子，碰到已处理区间即结束
+                        head_top = head_top or max(ids)
+                        reached = min(ids) <= newest_id
+                        results = [p for p in results if p["id"] > newest_id]
+                        if reached:
+                            state.update(newest_id=head_top, head_cursor=None, pending_newest_id=None)
+                        else:
+                            state.update(head_cursor=f"b{min(ids)}", pending_newest_id=head_top)
+                    elif kind == "tail" and direction == "b":
+                        if state.get("newest_id") is None:
+                            state["newest_id"] = max(ids)
+                        state["cursor"] = f"b{min(ids)}"
+                        if len(ids) < limit_per_page:
+                            state.update(cursor=None, complete=True)
+                    elif kind == "tail":
+                        state["newest_id"] = max([*ids, state.get("newest_id") or 0])
+
+                    new_posts = [p for p in results if p["id"] not in seen_ids]
+                    seen_ids.update(p["id"] for p in new_posts)
+                    if kind == "numbered" or not known_ids:
+                        fetched += len(new_posts)
+                    else:
+                        fetched += sum(1 for p in new_posts if p["id"] not in known_ids)
+                    duplicates = len(results) - len(new_posts)
+                    print(
+                        f"[Danbooru] Page {page or 1}: fetched {len(results)} results"
+                        + (f" ({duplicates} duplicates dropped)." if duplicates else ".")
+                    )
+                    if local_filter:
+                        new_posts = filter_local_posts(new_posts, tag_filter)
+                    yield dict(state), new_posts
+                    if reached:
+                        break
+                    if fetched >= max_limit:
+                        return
+                else:
+                    # 翻到底: 头部整段都是新帖子，或回填已完成
+                    if kind == "head":
+                        state.update(
+                            newest_id=head_top or newest_id,
+                            head_cursor=None,
+                            pending_newest_id=None,
+                            cursor=None,
+                            complete=True,
+                        )
+                        yield dict(state), []
+                        if cursor is None:
+                            return
+                        continue
+                    if kind == "tail" and direction == "b" and not state.get("complete"):
+                        state.update(cursor=None, complete=True)
+                        yield dict(state), []
+    except Exception as e:
+        print(f"[Error] Fetching '{api_tags}' failed (last page: {page or 'none'}): {e}")
 
 
-def filter_local_posts(
-    posts: List[Dict], include_tags: List[str], exclude_tags: List[str]
+def get_all_results(
+    query: str,
+    limit_per_page: int = Config.LIMIT_PER_PAGE,
+    max_limit: int = Config.MAX_LIMIT,
 ) -> List[Dict]:
     """
-    本地标签筛选逻辑:
-    - 必须包含所有 include_tags
-    - 必须不包含任何 exclude_tags
-    """
-
-    def get_all_tags(post):
-        """提取该作品的所有标签（包括 general、character、artist、copyright）"""
-        tags = set()
-        for key in [
-            "tag_string_general",
-            "tag_string_character",
-            "tag_string_copyright",
-            "tag_string_artist",
-            "tag_string_meta",
-        ]:
-            tags.update(tag.lower() for tag in post.get(key, "").split())
-        return tags
-
-    filtered = []
-    for i, post in enumerate(posts):
-        tags = get_all_tags(post)
-        if i < 3:
-            print(f"DEBUG Post {i}: tags={list(tags)[:10]}...")  # 打印前3个的标签
-
-        # 包含判断
-        missing = [t for t in include_tags if t not in tags]
-        if missing:
-            print(f"DEBUG Filtered out (missing tags): {missing}")
-            continue
-
-        # 排除判断
-        blocked = [t for t in exclude_tags if t in tags]
-        if blocked:
-            print(f"DEBUG Filtered out (excluded tags): {blocked}")
-            continue
+    分页获取 Danbooru 搜索结果(不使用检查点)，支持多标签本地筛选与反选。
+    - 按 id 排序的查询使用游标分页(b<id> / a<id>)，深翻页代价恒定
+    - 其他排序(如 order:rank)使用页码分页，多个页面请求并发在途
+    - 请求总速率受共享访问层限制，429/5xx 自动退避重试；
+      遇到空页或达到 max_limit 后不再发出新请求
+    - 排名在抓取途中变化导致跨页重复出现的帖子只保留第一次
+    """
+    all_results = []
+    for _, posts in crawl_query(query, limit_per_page, max_limit):
+        all_results.extend(posts)
+    print(f"[Danbooru] Total {len(all_results)} results after filtering.")
+    return all_results
 
-        filtered.append(post)
 
+def filter_local_posts(
+    posts: List[Dict], tag_filter: TagFilter, verbose: bool = Config.VERBOSE_FILTER
+) -> List[Dict]:
+    """
+    本地标签筛选(条件见 TagFilter):
+    - 必须满足所有包含条件与 OR 组
+    - 必须不命中任何反选条件
+    :param tag_filter: plan_search() 生成的 plan["filter"]
+    :param verbose: 逐条输出被淘汰的帖子及原因
+    """
+    if not tag_filter:
+        return list(posts)
+    filtered = tag_filter.filter(posts)
+    if verbose:
+        kept = {id(post) for post in filtered}
+        for post in posts:
+            if id(post) not in kept:
+                missing, blocked = tag_filter.explain(post)
+                print(f"DEBUG Filtered out post {post.get('id')}: missing={missing} excluded={blocked}")
     print(f"[Filter] After local filter: {len(filtered)} / {len(posts)} remain.")
     return filtered
 
@@ -238,16 +642,16 @@ def get_folder_ids_for_post(post: Dict, search_query: str) -> List[Optional[int]
     # 常规归类文件夹
     folder_ids.extend(
         [
-            folder_name_to_id.get(created_at.strftime("year_%Y")),
-            folder_name_to_id.get("Manual"),
-            folder_name_to_id.get("FromDanbooru"),
-            folder_name_to_id.get(RATING_MAP.get(post["rating"], "general")),
+            folder_index.get_id(created_at.strftime("year_%Y")),
+            folder_index.get_id("Manual"),
+            folder_index.get_id("FromDanbooru"),
+            folder_index.get_id(RATING_MAP.get(post["rating"], "general")),
         ]
     )
 
     # 特殊归类: 热门榜单
     if "order:rank" in search_query.lower():
-        hot_id = folder_name_to_id.get("DanbooruHot")
+        hot_id = folder_index.get_id("DanbooruHot")
         if hot_id:
             folder_ids.append(hot_id)
 
@@ -257,40 +661,21 @@ def get_folder_ids_for_post(post: Dict, search_query: str) -> List[Optional[int]
 # ======================================
 #           处理单个帖子
 # ======================================
-def process_post(post: Dict, search_query: str, existing_ids: set) -> None:
-    """
-    处理单个 Danbooru 帖子:
-    - 解析标签
-    - 动态创建文件夹
-    - 上传图片到 Eagle
-    - 更新已存在 ID 集合
-    :param post: 帖子数据
-    """
-    try:
-        image_url = post["file_url"]
-    except KeyError:
-        print(f"[Skip] Post {post.get('id', 'unknown')} has no file_url.")
-        return
+def post_url(post: Dict) -> str:
+    return f"https://danbooru.donmai.us/posts/{post['id']}"
 
-    post_id = post["id"]
-    print(f"[Process] Post {post_id}")
 
-    url = f"https://danbooru.donmai.us/posts/{post_id}"
-
-    # 标签分类解析
+def folder_tag_groups(post: Dict) -> List[Tuple[str, List[str]]]:
+    """
+    帖子标签对应的 (类型文件夹, 类别名称列表)
+    角色归入所属第一个作品的文件夹(CopyrightNew 下)，没有作品时归入 CharacterNew
+    """
     copyrights, _ = process_tags(post["tag_string_copyright"])
     characters, _ = process_tags(post["tag_string_character"])
     artists, _ = process_tags(post["tag_string_artist"])
     all_metadata, _ = process_tags(post["tag_string_meta"])
-    count_tags, normal_tags = process_tags(
-        post["tag_string_general"], COUNT_TAG_PATTERN
-    )
-
-    # 文件夹集合
-    folder_ids = set(get_folder_ids_for_post(post, search_query))
-
-    # 根据标签创建/映射文件夹
-    tag_groups = [
+    count_tags, _ = process_tags(post["tag_string_general"], COUNT_TAG_PATTERN)
+    return [
         ("Count", count_tags),
         ("Artist", artists),
         ("CopyrightNew", copyrights),
@@ -298,24 +683,184 @@ def process_post(post: Dict, search_query: str, existing_ids: set) -> None:
         ("metadata", all_metadata),
     ]
 
-    for folder_type, tags in tag_groups:
+
+def resolve_post(post: Dict, search_query: str) -> Optional[Dict]:
+    """
+    解析单个 Danbooru 帖子的标签并确定(必要时创建)文件夹
+    已由 precreate_folders 预建时只查字典
+    :param post: 帖子数据
+    :return: add_from_url 的参数；帖子没有 file_url 时返回 None
+    """
+    try:
+        image_url = post["file_url"]
+    except KeyError:
+        print(f"[Skip] Post {post.get('id', 'unknown')} has no file_url.")
+        return None
+
+    print(f"[Process] Post {post['id']}")
+    _, normal_tags = process_tags(post["tag_string_general"], COUNT_TAG_PATTERN)
+
+    # 文件夹集合
+    folder_ids = set(get_folder_ids_for_post(post, search_query))
+
+    # 根据标签创建/映射文件夹
+    for folder_type, tags in folder_tag_groups(post):
         for tag in tags:
             if not tag:
                 continue
-            create_folder_if_valid(tag, folder_type)
-            if tag in folder_name_to_id:
-                folder_ids.add(folder_name_to_id[tag])
-
-    # 上传图片
-    backend.add_from_url(
-        image_url,
-        os.path.basename(image_url),
-        website=url,
-        tags=normal_tags,
-        annotation=None,
-        modificationTime=None,
-        folderIds=list(folder_ids) if folder_ids else None,
-    )
+            tag_folder_id = create_folder_if_valid(tag, folder_type)
+            if tag_folder_id:
+                folder_ids.add(tag_folder_id)
+
+    return {
+        "img_url": image_url,
+        "name": os.path.basename(image_url),
+        "website": post_url(post),
+        "tags": normal_tags,
+        "annotation": None,
+        "modificationTime": None,
+        "folderIds": list(folder_ids) if folder_ids else None,
+    }
+
+
+def use_local_download() -> bool:
+    """是否先下载到本地再导入: 需开启 Config.DOWNLOAD_LOCALLY 且后端支持 add_from_path"""
+    return Config.DOWNLOAD_LOCALLY and supports_path_import()
+
+
+def supports_path_import() -> bool:
+    return callable(getattr(backend, "add_from_path", None))
+
+
+def stage_post(post: Dict, args: Dict, fetch: bool = True) -> Dict:
+    """
+    从下载缓存取得帖子图片(未命中且 fetch=True 时下载)，成功时在导入参数中加入 path(改用 addFromPath 导入)
+    - 原图按帖子 md5 校验；大图内容与 md5 不同，只保证下载完整
+    - 下载失败或未命中且不下载时返回原参数，由 addFromURL 导入
+    :param args: resolve_post() 的结果
+    :param fetch: 缓存未命中时是否下载；为 False 时只复用已缓存的文件
+    """
+    url = args["img_url"]
+    if Config.DOWNLOAD_VARIANT in ("large", "sample"):
+        url = post.get("large_file_url") or url
+    verify = url == post.get("file_url")
+    downloader = get_downloader()
+    if not fetch:
+        path = downloader.cache.get(post["md5"]) if verify and post.get("md5") else None
+        return {**args, "path": str(path.resolve())} if path else args
+    ext = os.path.splitext(url)[1].lstrip(".") or post.get("file_ext")
+    try:
+        path = downloader.fetch(url, post.get("md5") if verify else None, ext)
+    except Exception as e:
+        print(f"[Download] Post {post['id']} failed, falling back to addFromURL: {e}")
+        return args
+    return {**args, "path": str(path.resolve())}
+
+
+def load_perceptual_index() -> Optional[PerceptualIndex]:
+    """载入 find_duplicates.py 维护的感知哈希索引；未开启或尚未建立索引时返回 None"""
+    global perceptual_index
+    if (
+        perceptual_index is None
+        and Config.SKIP_NEAR_DUPLICATES
+        and os.path.exists(Config.PERCEPTUAL_INDEX_PATH)
+    ):
+        perceptual_index = PerceptualIndex(
+            Config.PERCEPTUAL_INDEX_PATH, Config.PERCEPTUAL_METHOD, Config.NEAR_DUP_DISTANCE
+        )
+        print(f"[PHash] 已载入感知哈希索引: {len(perceptual_index)} 张图片")
+    return perceptual_index
+
+
+def find_near_duplicate(post: Dict, args: Dict) -> Optional[Tuple[int, str]]:
+    """
+    已下载到本地的帖子图片在资料库(及本次运行已放行的帖子)中的近似重复
+    没有近似重复时把该图片加入内存索引(预留)，本次运行中后续的相似帖子也会被拦下；
+    导入失败时由调用方 release_near_dup() 撤销。有近似重复时记入跳过表，下次运行不再抓取
+    :param args: stage_post() 的结果，没有 path(未下载)时不检查
+    :return: (汉明距离, 索引键: 项目 ID 或 post:<id>)，没有时返回 None
+    """
+    if perceptual_index is None or not args.get("path"):
+        return None
+    value = hash_image_file(args["path"], perceptual_index.method)
+    if value is None:
+        return None
+    key = near_dup_key(post["id"])
+    found = perceptual_index.check_and_add(key, value)
+    with near_dup_lock:
+        near_dup_stats["checked"] += 1
+        near_dup_stats["skipped"] += bool(found)
+    if found:
+        distance, duplicate_of = found[0]
+        print(f"[Skip] Post {post['id']} is a near-duplicate of {duplicate_of} (distance {distance})")
+        perceptual_index.skip(key, duplicate_of, distance)
+        return found[0]
+    return None
+
+
+def near_dup_key(post_id: int) -> str:
+    """帖子在感知哈希索引中的键(导入前，尚无项目 ID)"""
+    return f"post:{post_id}"
+
+
+def is_near_dup_skipped(post_id: int) -> bool:
+    """帖子是否在之前的运行中因近似重复被跳过"""
+    return perceptual_index is not None and perceptual_index.is_skipped(near_dup_key(post_id))
+
+
+def release_near_dup(post_id: int) -> None:
+    """帖子最终没有导入: 撤销 find_near_duplicate() 在索引中的预留"""
+    if perceptual_index is not None:
+        perceptual_index.release(near_dup_key(post_id))
+
+
+def import_post(args: Dict) -> bool:
+    """
+    不经 ImportBatcher 直接导入: 已下载到本地时用 addFromPath，否则 addFromURL
+    按路径导入失败(如 Eagle 读不到暂存目录)时改用 addFromURL 重试
+    """
+    args = dict(args)
+    path = args.pop("path", None)
+    if path:
+        path_args = {k: v for k, v in args.items() if k != "img_url"}
+        if backend.add_from_path(path, **path_args):
+            return True
+        print(f"[Import] addFromPath failed for {path}, retrying via addFromURL.")
+    return backend.add_from_url(**args)
+
+
+def process_post(
+    post: Dict,
+    search_query: str,
+    existing_ids: set,
+    importer: Optional[ImportBatcher] = None,
+) -> None:
+    """
+    处理单个 Danbooru 帖子:
+    - 解析标签
+    - 动态创建文件夹
+    - 从下载缓存取得图片，未命中时下载(开启 Config.DOWNLOAD_LOCALLY 时)
+    - 与感知哈希索引比较，跳过近似重复(已调用 load_perceptual_index 时)
+    - 上传图片到 Eagle
+    :param post: 帖子数据
+    :param importer: 批量导入器(由其 on_done 回调记录已导入帖子并撤销失败帖子的预留)；
+                     为 None 时直接逐个上传
+    """
+    if is_near_dup_skipped(post.get("id")):
+        return
+    args = resolve_post(post, search_query)
+    if args is None:
+        return
+    if supports_path_import():
+        args = stage_post(post, args, fetch=Config.DOWNLOAD_LOCALLY)
+    if find_near_duplicate(post, args):
+        return
+    if importer:
+        importer.add(**args)
+    elif import_post(args):
+        get_known_posts().add(post["id"], post.get("md5"))
+    else:
+        release_near_dup(post["id"])
 
 
 # ======================================
@@ -323,13 +868,14 @@ def process_post(post: Dict, search_query: str, existing_ids: set) -> None:
 # ======================================
 def get_existing_danbooru_ids() -> set:
     """
-    从 Eagle 获取现有条目，提取已存在的 Danbooru ID 集合。
+    从本地资料库镜像提取已存在的 Danbooru ID 集合(需遍历全部 URL，仅用于对账)。
+    镜像过期时先与 Eagle 增量同步。
     """
-    existing_items = backend.get_items()
+    library_index = get_library_index()
+    library_index.ensure_fresh(Config.INDEX_MAX_AGE)
     danbooru_ids = set()
 
-    for item in existing_items:
-        url = item.get("url", "")
+    for url in library_index.urls_matching(DANBOORU_ID_PATTERN.pattern):
         match = DANBOORU_ID_PATTERN.match(url)
         if match:
             danbooru_ids.add(int(match.group(1)))
@@ -338,38 +884,162 @@ def get_existing_danbooru_ids() -> set:
     return danbooru_ids
 
 
+def load_known_posts() -> KnownPosts:
+    """
+    准备已导入帖子索引: 距上次对账超过 Config.KNOWN_POSTS_RECONCILE 秒时才扫描资料库对账，
+    其余运行直接使用持久化的索引
+    """
+    known_posts = get_known_posts()
+    if known_posts.needs_reconcile(Config.KNOWN_POSTS_RECONCILE):
+        known_posts.reconcile(get_existing_danbooru_ids())
+    else:
+        print(f"[Info] 已导入帖子索引: {len(known_posts)} 个 Danbooru 条目。")
+    return known_posts
+
+
 # ======================================
 #              主程序入口
 # ======================================
 def main():
     """
-    主执行逻辑:
-    - 同步 Eagle 文件夹结构
-    - 读取已存在条目
-    - 执行 Danbooru 查询
-    - 下载并导入图片(跳过重复)
+    主执行逻辑(流式流水线):
+    - 同步 Eagle 文件夹结构，载入已导入帖子索引(定期与资料库对账，平时不扫描资料库)
+    - 抓取页面 -> 本地筛选/去重/预建文件夹 -> 解析标签并确定文件夹 -> 查下载缓存/并发下载 -> 上传，
+      各阶段之间是有界队列；下载失败或关闭本地下载时由 Eagle 按 URL 下载
+    - 已下载的图片与感知哈希索引比较，资料库中已有近似重复(重新编码、缩放等)时跳过
+    - 第一页的帖子在后续页面仍在抓取时就开始上传，内存占用由队列长度决定而与 MAX_LIMIT 无关
+    - 每个查询从检查点继续；某页及之前所有页的帖子都导入成功后才推进该查询的检查点，
+      有导入失败时该查询的检查点停在失败页之前，下次运行重试
+    - 结束时输出各阶段吞吐与队列深度，以及下载速度(MB/s)与每帖延迟
     """
     update_folder_mappings()
-    existing_ids = get_existing_danbooru_ids()
+    local_download = use_local_download()
+    path_import = supports_path_import()
+    load_perceptual_index()
+    known = load_known_posts()
+    queued_ids = set()  # 本次运行已排入导入的帖子(跨查询去重)
+    md5_by_url = {}
+    checkpoints = CrawlCheckpoints(Config.CHECKPOINT_PATH)
+    tracker = CheckpointTracker(checkpoints, Config.CHECKPOINT_EVERY_PAGES)
+
+    def on_imported(item: Dict, ok: bool) -> None:
+        md5 = md5_by_url.pop(item["website"], None)
+        post_id = int(DANBOORU_ID_PATTERN.match(item["website"]).group(1))
+        if ok:
+            known.add(post_id, md5)
+            tracker.done(item["website"])
+        else:
+            release_near_dup(post_id)
+            tracker.failed(item["website"])
+
+    importer = ImportBatcher(backend, max_workers=Config.UPLOAD_WORKERS, on_done=on_imported)
 
     unique_queries = list(set(Config.SEARCH_QUERYS))
     print(f"[Start] Processing queries: {unique_queries}")
+    added_count = 0
+
+    def fetch_pages() -> Iterator[Tuple[str, Dict, Dict, List[Dict]]]:
+        for search_query in unique_queries:
+            print(f"\n[Query] '{search_query}' 开始处理...")
+            plan = plan_search(search_query)
+            state = checkpoints.get(search_query)
+            for state, posts in crawl_query(
+                search_query,
+                max_limit=Config.MAX_LIMIT,
+                checkpoint=state,
+                local_filter=False,
+                plan=plan,
+                known_ids=known,
+            ):
+                yield search_query, plan, state, posts
+
+    def filter_page(page: Tuple[str, Dict, Dict, List[Dict]]) -> List[Tuple[str, Dict]]:
+        nonlocal added_count
+        search_query, plan, state, posts = page
+        kept = []
+        try:
+            for post in filter_local_posts(posts, plan["filter"]):
+                post_id = post.get("id")
+                if post_id in known or post_id in queued_ids:
+                    print(f"[Skip] Duplicate post {post_id}")
+                    continue
+                if is_near_dup_skipped(post_id):
+                    print(f"[Skip] Post {post_id} was skipped earlier as a near-duplicate")
+                    continue
+                queued_ids.add(post_id)
+                md5_by_url[post_url(post)] = post.get("md5")
+                kept.append(post)
+            # 整页的缺失文件夹一次性分层并发创建，下游解析阶段只查字典
+            precreate_folders(kept)
+        except Exception:
+            # 该页仍要登记(记为失败)，否则之后的页面会把检查点推进到它之后，这些帖子再也不会被抓取
+            for post in kept:
+                queued_ids.discard(post.get("id"))
+                md5_by_url.pop(post_url(post), None)
+            tracker.add_page(search_query, state, [], failed=True)
+            raise
+        added_count += len(kept)
+        tracker.add_page(search_query, state, [post_url(post) for post in kept])
+        return [(search_query, post) for post in kept]
+
+    def resolve(entry: Tuple[str, Dict]) -> List[Tuple[Dict, Dict]]:
+        search_query, post = entry
+        args = resolve_post(post, search_query)
+        if args is None:
+            md5_by_url.pop(post_url(post), None)
+            tracker.done(post_url(post))
+            return []
+        return [(post, args)]
+
+    def download(entry: Tuple[Dict, Dict]) -> List[Dict]:
+        post, args = entry
+        # 缓存命中时总是按路径导入；未命中时仅在开启本地下载时下载
+        # 按路径导入一直失败、导入器已停用路径导入时不再下载
+        if path_import and importer.by_path:
+            args = stage_post(post, args, fetch=local_download)
+        if find_near_duplicate(post, args):
+            md5_by_url.pop(post_url(post), None)
+            tracker.done(post_url(post))
+            return []
+        return [args]
+
+    def upload(args: Dict) -> None:
+        importer.add(**args)
+        print(f"[Queued] {args['website']} queued for import.")
+
+    # 文件夹解析会读写全局 folder_index，只用一个线程
+    pipeline = (
+        Pipeline()
+        .add_stage("filter", filter_page, queue_size=Config.PIPELINE_PAGE_QUEUE)
+        .add_stage("folders", resolve, queue_size=Config.PIPELINE_POST_QUEUE)
+        .add_stage("download", download, workers=Config.DOWNLOAD_WORKERS, queue_size=Config.PIPELINE_POST_QUEUE)
+        .add_stage("upload", upload, queue_size=Config.PIPELINE_POST_QUEUE)
+    )
+    report = pipeline.run(fetch_pages())
+
+    import_report = importer.close()
+    final_states = tracker.close()
+    checkpoints.close()
+
+    print(f"\n[Pipeline] 各阶段统计:\n{Pipeline.format_report(report)}")
+    print(f"[Pipeline] 导入: {import_report}")
+    if hasattr(client, "throttle"):
+        print(f"[Danbooru] 访问统计: {client.throttle.get_stats()}")
+    if path_import:
+        print(f"[Download] 下载统计: {get_downloader().get_stats()}")
+        print(f"[Download] 缓存: {get_downloader().cache.get_stats()}")
+    if perceptual_index is not None:
+        print(f"[PHash] 近似重复检查: {near_dup_stats}")
+    print(
+        f"[Folders] 预建 {folder_stats['precreated']} 个文件夹，共 {folder_stats['rounds']} 轮并发请求"
+        f"(解析阶段省去 {folder_stats['precreated']} 次串行创建请求)；"
+        f"逐帖回退创建 {folder_stats['fallback_created']} 个"
+    )
+    print(f"[Checkpoint] {final_states or '无'}")
 
-    for search_query in unique_queries:
-        print(f"\n[Query] '{search_query}' 开始处理...")
-        results = get_all_results(search_query, max_limit=Config.MAX_LIMIT)
-        print(f"[Query] 共获取 {len(results)} 条结果。")
-
-        for post in results:
-            post_id = post.get("id")
-            if post_id in existing_ids:
-                print(f"[Skip] Duplicate post {post_id}")
-                continue
-            process_post(post, search_query, existing_ids)
-
-            # 动态维护已存在ID
-            existing_ids.add(post_id)
-            print(f"[Added] Post {post_id} added successfully.")
+    # 新增的条目尚未进入镜像，下次运行时强制同步
+    if added_count:
+        get_library_index().mark_stale()
 
 
 if __name__ == "__main__":
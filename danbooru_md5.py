@@ -1,58 +1,155 @@
-import hashlib
+import os
+from typing import Dict, Optional
 
-from pybooru import Danbooru
-
-from lib import eagle_api
+from lib.danbooru_access import get_client
+from lib.download_cache import DownloadCache
+from lib.eagle_api import EagleAPI
+from lib.file_hasher import FileHasher
+from lib.known_posts import KnownPosts
+from lib.md5_lookup import Md5LookupCache, Md5Resolver
+from lib.update_queue import UpdateQueue
 from danbooru_config import config  # 导入配置文件
 
-# 配置常量
+
+# ======================================
+#           初始化与配置
+# ======================================
 class Config:
+    """
+    修复 wrong_url 文件夹中项目的 Danbooru 链接:
+    按文件 md5 在 Danbooru 查找原帖，把项目 URL 改为帖子地址
+    """
+
     USERNAME = config["danbooru"]["username"]
     API_KEY = config["danbooru"]["api_key"]
+    LIBRARY_PATH = "D:/AI Image.library"  # Eagle 资料库目录(读取原图计算 md5)
+    WRONG_URL_FOLDER = "wrong_url"  # 待修复项目所在的文件夹
+    REQUESTS_PER_SECOND = 8  # 与 danbooru_api 使用同一账户时共享同一份额度
+    MAX_CONCURRENT_REQUESTS = 4  # 同时在途的 md5 查询批次数
+    MD5_BATCH_SIZE = 100  # 每个搜索请求查询的 md5 数(md5:a,b,c，单页上限 200)
+    MD5_LOOKUP_CACHE_PATH = "danbooru_md5_lookups.db"  # md5 查询结果缓存
+    NEGATIVE_TTL = 7 * 86400  # 未找到结果的缓存有效期(秒)
+    STAGING_DIR = "danbooru_staging"  # 与 danbooru_api 共用的下载缓存目录
+    DOWNLOAD_CACHE_MAX_BYTES = 20 * 1024**3
+    KNOWN_POSTS_PATH = "danbooru_known_posts.db"  # 与 danbooru_api 共用的已导入帖子索引
+    HASH_CACHE_PATH = "file_hashes.db"  # 文件摘要缓存，按 (路径, 大小, mtime_ns) 失效
+    HASH_WORKERS = None  # 摘要计算线程数，None 为 min(32, CPU 数 + 4)
+    UPDATE_WORKERS = 8  # 并发更新线程数
+    DRY_RUN = False  # 只输出将要修改的 URL，不发送，也不写入下载缓存
+
+
+backend = EagleAPI()
+
+# 初始化 Danbooru 客户端(与同进程内的其他调用方共享令牌桶，429 时自动退避重试)
+client = get_client(
+    Config.USERNAME,
+    Config.API_KEY,
+    rate=Config.REQUESTS_PER_SECOND,
+    max_concurrency=Config.MAX_CONCURRENT_REQUESTS,
+)
 
-# 初始化 Danbooru 客户端
-client = Danbooru('danbooru', username=Config.USERNAME, api_key=Config.API_KEY)
+# 文件摘要: 线程池并行计算，未变化的文件直接取缓存(只需 stat)；首次使用时才创建缓存文件
+hasher: Optional[FileHasher] = None
+
+
+def get_hasher() -> FileHasher:
+    global hasher
+    if hasher is None:
+        hasher = FileHasher(Config.HASH_CACHE_PATH, algorithms=("md5", "sha256"), workers=Config.HASH_WORKERS)
+    return hasher
 
 
 def calculate_md5(file_path):
-    # 创建一个 MD5 哈希对象
-    md5_hash = hashlib.md5()
-
-    # 以二进制模式打开文件
-    with open(file_path, "rb") as f:
-        # 一次读取文件的一部分以避免内存溢出
-        for chunk in iter(lambda: f.read(4096), b""):
-            md5_hash.update(chunk)
-
-    # 返回计算得出的 MD5 哈希值
-    return md5_hash.hexdigest()
-
-
-eagle_folder = "D:/AI Image.library/images/"
-artist_prefix = "artist:"
-
-items_data = eagle_api.get_items()
-folder_id_to_name, folder_name_to_id, folder_to_root = eagle_api.get_folder_list_recursive()
-print(len(items_data))
-if items_data:
-    # 进一步处理“items_data”
-    print("成功提取数据！")
-    i = 1
-    for item in items_data:
-        # 提取tags和folders
-        id = item.get("id", [])
-        name = item.get("name", [])
-        ext = item.get("ext", [])
-        folder_ids = item.get("folders", [])
-
-        if folder_name_to_id["wrong_url"] in folder_ids:
-            # 示例：计算图片文件的 MD5 值
-            source_file = eagle_folder + id + ".info/" + name + '.' + ext
-            md5_value = calculate_md5(source_file)
-            print(f"The MD5 hash of the file is: {md5_value}")
-            # 使用 MD5 值进行搜索
-            post = client.post_list(tags=f'md5:{md5_value}')
-            if post:
-                # 计算正确的URL
-                url = "https://danbooru.donmai.us/posts/" + str(post[0]["id"])
-                eagle_api.update_item(id, new_url=url)
+    return get_hasher().hash_file(file_path)["md5"]
+
+
+def item_file_path(item: Dict) -> str:
+    """项目原图在资料库中的路径"""
+    return os.path.join(
+        Config.LIBRARY_PATH, "images", f"{item['id']}.info", f"{item['name']}.{item['ext']}"
+    )
+
+
+def post_url(post_id: int) -> str:
+    return f"https://danbooru.donmai.us/posts/{post_id}"
+
+
+# ======================================
+#              主程序入口
+# ======================================
+def main():
+    """
+    - 列出 wrong_url 文件夹中的项目，并行计算原图 md5(未变化的文件走摘要缓存)
+    - 按批查询 Danbooru(每个请求多个 md5，多个批次并发，受共享访问层限速)；
+      找到的结果永久缓存，未找到的在 Config.NEGATIVE_TTL 内不再查询
+    - 经写后队列并发更新项目 URL(与当前 URL 相同的不发请求)，
+      修复的帖子同时记入已导入帖子索引与下载缓存
+    """
+    folders = backend.get_folder_list_recursive()
+    folder_id = folders.get_id(Config.WRONG_URL_FOLDER)
+    if folder_id is None:
+        print(f"[Error] 文件夹 '{Config.WRONG_URL_FOLDER}' 不存在。")
+        return
+
+    items = {os.path.abspath(item_file_path(item)): item for item in backend.iter_items(folders=[folder_id])}
+    print(f"[Info] '{Config.WRONG_URL_FOLDER}' 中有 {len(items)} 个项目。")
+    if not items:
+        return
+
+    hasher = get_hasher()
+    md5_by_path = {path: digests["md5"] for path, digests in hasher.hash_files(items)}
+    print(f"[Hasher] {hasher.get_stats()}")
+
+    lookup_cache = Md5LookupCache(Config.MD5_LOOKUP_CACHE_PATH, Config.NEGATIVE_TTL)
+    resolver = Md5Resolver(
+        client,
+        lookup_cache,
+        batch_size=Config.MD5_BATCH_SIZE,
+        workers=Config.MAX_CONCURRENT_REQUESTS,
+    )
+    post_ids = resolver.resolve(md5_by_path.values())
+    lookup_cache.close()
+    print(f"[Md5Lookup] {resolver.get_stats()}")
+
+    known = KnownPosts(Config.KNOWN_POSTS_PATH)
+    # 下载缓存: 已确认是 Danbooru 原图的本地文件登记进去，danbooru_api 导入同一帖子时不再下载
+    # (DRY_RUN 时不打开，也不创建缓存目录)
+    download_cache = (
+        None if Config.DRY_RUN else DownloadCache(Config.STAGING_DIR, Config.DOWNLOAD_CACHE_MAX_BYTES)
+    )
+    fixed = {}  # 项目 ID -> (帖子 id, md5)
+
+    def on_updated(item_id: str, fields: Dict) -> None:
+        known.add(*fixed[item_id])
+
+    queue = UpdateQueue(
+        backend,
+        max_workers=Config.UPDATE_WORKERS,
+        dry_run=Config.DRY_RUN,
+        on_success=on_updated,
+    )
+    with queue:
+        for path, md5 in md5_by_path.items():
+            post_id = post_ids.get(md5)
+            if post_id is None:
+                continue
+            item = items[path]
+            fixed[item["id"]] = (post_id, md5)
+            if download_cache is not None:
+                try:
+                    download_cache.adopt(path, md5, item["ext"])
+                except OSError as e:
+                    print(f"[DownloadCache] Cannot adopt {path}: {e}")
+            queue.put(item["id"], current=item, new_url=post_url(post_id))
+    known.close()
+    if download_cache is not None:
+        download_cache.close()
+
+    print(
+        f"[Done] {len(items)} 个项目，找到 {len(fixed)} 个原帖，"
+        f"未找到 {len(md5_by_path) - len(fixed)} 个；更新: {queue.report}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import os
+from typing import Dict, List
+
+from lib.eagle_api import EagleAPI
+from lib.perceptual_index import PerceptualIndex
+from lib.update_queue import UpdateQueue
+
+
+# ======================================
+#           初始化与配置
+# ======================================
+class Config:
+    """
+    在资料库中查找近似重复的图片(重新编码、缩放、轻微裁剪等，md5 不同)，
+    把每个重复簇打上簇标签并归入同一个 Eagle 文件夹
+    """
+
+    LIBRARY_PATH = "D:/AI Image.library"  # Eagle 资料库目录(读取原图计算感知哈希)
+    PERCEPTUAL_INDEX_PATH = "perceptual_index.db"  # 感知哈希索引(danbooru_api 导入前查重共用)
+    PERCEPTUAL_METHOD = "dhash"  # "dhash"(快，容忍轻微裁剪) 或 "phash"(不同图片间区分度更高)
+    MAX_DISTANCE = 4  # 64 位哈希中不超过该汉明距离视为近似重复
+    HASH_WORKERS = None  # 解码进程数，None 为 CPU 数
+    IMAGE_EXTS = {"jpg", "jpeg", "png", "webp", "bmp", "gif", "tif", "tiff"}
+    DUPLICATES_FOLDER = "near_duplicates"  # 重复簇归入的文件夹(不存在时创建)
+    CLUSTER_TAG_PREFIX = "dup_cluster:"  # 簇标签前缀，后接簇内保留项目的 ID
+    # "tag": 所有成员打簇标签并加入 DUPLICATES_FOLDER，原文件夹不变
+    # "move": 每簇保留分辨率最高的一张(只打标签)，其余移出原文件夹、只留在 DUPLICATES_FOLDER
+    ACTION = "tag"
+    UPDATE_WORKERS = 8  # 并发更新线程数
+    DRY_RUN = False  # 只输出将要做的修改，不发送
+
+
+backend = EagleAPI()
+
+
+def item_file_path(item: Dict) -> str:
+    """项目原图在资料库中的路径"""
+    return os.path.join(
+        Config.LIBRARY_PATH, "images", f"{item['id']}.info", f"{item['name']}.{item['ext']}"
+    )
+
+
+def pick_keeper(items: List[Dict]) -> Dict:
+    """簇内保留的项目: 分辨率最高，其次文件最大"""
+    return max(
+        items,
+        key=lambda item: ((item.get("width") or 0) * (item.get("height") or 0), item.get("size") or 0),
+    )
+
+
+def get_duplicates_folder() -> str:
+    folder_id = backend.get_folder_list_recursive().get_id(Config.DUPLICATES_FOLDER)
+    if folder_id is None and not Config.DRY_RUN:
+        folder_id = backend.create_folder(Config.DUPLICATES_FOLDER)
+    return folder_id or f"<{Config.DUPLICATES_FOLDER}>"
+
+
+# ======================================
+#              主程序入口
+# ======================================
+def main():
+    """
+    - 列出资料库项目，为新增或变化的图片在进程池中计算感知哈希(其余读索引缓存)，清理已删除项目
+    - 在多索引哈希上找出汉明距离不超过 Config.MAX_DISTANCE 的图片对，合并成簇
+    - 经写后队列并发更新: 簇标签 + 重复文件夹(按 Config.ACTION 保留或移出原文件夹)
+    """
+    items = {
+        item["id"]: item
+        for item in backend.iter_items()
+        if (item.get("ext") or "").lower() in Config.IMAGE_EXTS
+    }
+    print(f"[Info] 资料库中有 {len(items)} 张图片。")
+
+    index = PerceptualIndex(Config.PERCEPTUAL_INDEX_PATH, Config.PERCEPTUAL_METHOD, Config.MAX_DISTANCE)
+    index.update(((item_id, item_file_path(item)) for item_id, item in items.items()), workers=Config.HASH_WORKERS)
+    removed = index.prune(set(items))
+    if removed:
+        print(f"[PHash] 移除 {removed} 个已删除项目的哈希")
+
+    clusters = index.clusters()
+    index.close()
+    print(f"[PHash] 找到 {len(clusters)} 个近似重复簇，共 {sum(map(len, clusters))} 张图片")
+    if not clusters:
+        return
+
+    folder_id = get_duplicates_folder()
+    moved = 0
+    with UpdateQueue(backend, max_workers=Config.UPDATE_WORKERS, dry_run=Config.DRY_RUN) as queue:
+        for keys in clusters:
+            members = [items[key] for key in keys]
+            keeper = pick_keeper(members)
+            tag = f"{Config.CLUSTER_TAG_PREFIX}{keeper['id']}"
+            for item in members:
+                tags = sorted(set(item.get("tags") or []) | {tag})
+                if Config.ACTION == "move":
+                    if item is keeper:
+                        queue.put(item["id"], current=item, tags=tags)
+                        continue
+                    folders = [folder_id]
+                    moved += 1
+                else:
+                    folders = sorted(set(item.get("folders") or []) | {folder_id})
+                queue.put(item["id"], current=item, tags=tags, folders=folders)
+
+    print(f"[Done] {len(clusters)} 个簇" + (f"，移动 {moved} 张" if Config.ACTION == "move" else "") + f"；更新: {queue.report}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,494 @@
+import asyncio
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional
+
+import aiohttp
+
+from lib.folder_index import FolderIndex
+from lib.http_pool import IDEMPOTENT_METHODS, backoff_delay
+from lib.paging import PageFetchError
+
+
+class _AsyncClientBase:
+    """
+    异步客户端公共部分
+    - 单个 aiohttp.ClientSession，连接数与并发数一致
+    - asyncio.Semaphore 限制同时在途的请求数
+    - 按带抖动的指数退避重试，规则同 PooledSession: GET 在连接错误、超时与 5xx 时重试，
+      POST 只在请求发出前的连接错误(连接被拒绝、建立连接超时)时重试
+    """
+
+    def __init__(
+        self,
+        headers: Dict[str, str],
+        concurrency: int = 16,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        backoff_max: float = 10.0,
+    ):
+        self.headers = headers
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def close(self) -> None:
+        """关闭会话"""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        # 会话与信号量必须在事件循环内创建
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency)
+            self._session = aiohttp.ClientSession(
+                headers=self.headers, connector=connector, trust_env=False
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+    ) -> Optional[Dict]:
+        """
+        内部请求方法
+        :param method: HTTP 方法 ('get' 或 'post')
+        :param url: 完整请求地址
+        :param data: 请求数据
+        :param params: 查询参数
+        :return: 响应数据字典或 None
+        """
+        session = self._get_session()
+        if params:
+            params = {k: str(v) for k, v in params.items() if v is not None}
+
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        attempt = 0
+        async with self._semaphore:
+            while True:
+                try:
+                    async with session.request(
+                        method, url, json=data, params=params
+                    ) as response:
+                        if response.status == 200:
+                            return await response.json(content_type=None)
+                        text = await response.text()
+                        if response.status < 500 or not idempotent or attempt >= self.max_retries:
+                            print(
+                                f"Error in {method} request to {url}. "
+                                f"Status code: {response.status}, Response: {text}"
+                            )
+                            return None
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                    not_sent = isinstance(e, (aiohttp.ClientConnectorError, aiohttp.ConnectionTimeoutError))
+                    if attempt >= self.max_retries or not (idempotent or not_sent):
+                        print(f"Request failed for {url}: {str(e)}")
+                        return None
+
+                await asyncio.sleep(
+                    backoff_delay(attempt, self.backoff_factor, self.backoff_max)
+                )
+                attempt += 1
+
+    async def iter_items(
+        self, page_size: int = 1000, **filters
+    ) -> AsyncIterator[Dict]:
+        """
+        分页流式遍历项目，处理当前页时下一页已在请求中
+        某页请求失败时抛出 PageFetchError
+        :param filters: orderBy / ext / folders / tags
+        """
+        offset = 0
+        pending = asyncio.ensure_future(self.get_items_page(offset, page_size, **filters))
+        try:
+            while pending is not None:
+                page = await pending
+                pending = None
+                if page is None:
+                    raise PageFetchError(f"Fetching page {offset} failed.")
+                if not page:
+                    return
+                if len(page) >= page_size:
+                    offset += 1
+                    pending = asyncio.ensure_future(
+                        self.get_items_page(offset, page_size, **filters)
+                    )
+                for item in page:
+                    yield item
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+
+    async def get_items(
+        self,
+        limit: Optional[int] = None,
+        orderBy: str = "NAME",
+        ext: str = "",
+        folders: Optional[List[str]] = None,
+        tags: Optional[List[str]] = None,
+    ) -> Optional[List[Dict]]:
+        """
+        获取项目列表，内部按页拉取
+        :param limit: 最多返回的条数，None 表示全部
+        :return: 项目列表；任一页请求失败时返回 None
+        """
+        items = []
+        pages = self.iter_items(orderBy=orderBy, ext=ext, folders=folders, tags=tags)
+        try:
+            async with aclosing(pages):
+                async for item in pages:
+                    items.append(item)
+                    if limit is not None and len(items) >= limit:
+                        break
+        except PageFetchError as e:
+            print(f"Listing items failed: {e}")
+            return None
+        return items
+
+    async def update_items(self, updates: List[Dict]) -> List[bool]:
+        """
+        并发批量更新项目
+        :param updates: update_item 的关键字参数列表，每项必须包含 item_id
+        :return: 与 updates 一一对应的结果
+        """
+        return await asyncio.gather(*(self.update_item(**u) for u in updates))
+
+
+class AsyncEagleAPI(_AsyncClientBase):
+    """
+    EagleAPI 的异步版本，方法与同步版一致
+    用法:
+        async with AsyncEagleAPI(concurrency=32) as eagle:
+            await asyncio.gather(*(eagle.update_item(i, tags=t) for i, t in pending))
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 16,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        base_url_item: str = "http://localhost:41695",
+        base_url_folder: str = "http://localhost:41595",
+    ):
+        """
+        :param concurrency: 最大并发请求数
+        :param max_retries: 可重试的错误的最大重试次数
+        :param backoff_factor: 重试退避基数(秒)
+        :param base_url_item: 项目操作地址
+        :param base_url_folder: 文件夹操作地址
+        """
+        super().__init__(
+            {"Content-Type": "application/json"},
+            concurrency=concurrency,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+        )
+        self.base_url_item = base_url_item
+        self.base_url_folder = base_url_folder
+
+    async def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        is_item_api: bool = False,
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+    ) -> Optional[Dict]:
+        base_url = self.base_url_item if is_item_api else self.base_url_folder
+        return await self._request(method, f"{base_url}{endpoint}", data, params)
+
+    async def add_from_url(
+        self,
+        img_url: str,
+        name: str,
+        website: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        annotation: Optional[str] = None,
+        modificationTime: Optional[str] = None,
+        folderIds: Optional[List[str]] = None,
+        headers: Optional[Dict] = None,
+    ) -> bool:
+        """
+        从 URL 添加项目 (使用 41695 端口)
+        """
+        data = {
+            "url": img_url,
+            "name": name,
+            "website": website,
+            "tags": tags,
+            "annotation": annotation,
+            "modificationTime": modificationTime,
+            "folderIds": folderIds,
+            "headers": headers,
+        }
+        data = {k: v for k, v in data.items() if v is not None}
+
+        result = await self._make_request(
+            "post", "/api/item/addFromURL", is_item_api=True, data=data
+        )
+        return bool(result and result.get("status") == "success")
+
+    async def create_folder(
+        self, folder_name: str, parent: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        创建文件夹 (使用 41595 端口)
+        """
+        data = {"folderName": folder_name}
+        if parent:
+            data["parent"] = parent
+
+        result = await self._make_request("post", "/api/folder/create", data=data)
+        if result and result.get("status") == "success":
+            return result.get("data", {}).get("id")
+        return None
+
+    async def update_item(
+        self,
+        item_id: str,
+        tags: Optional[List[str]] = None,
+        annotation: Optional[str] = None,
+        new_url: Optional[str] = None,
+        star: Optional[bool] = None,
+        name: Optional[str] = None,
+        folders: Optional[List[str]] = None,
+    ) -> bool:
+        """
+        更新项目 (使用 41695 端口)
+        """
+        data = {
+            "id": item_id,
+            "tags": tags,
+            "annotation": annotation,
+            "url": new_url,
+            "star": star,
+            "name": name,
+            "folders": folders,
+        }
+        data = {k: v for k, v in data.items() if v is not None}
+
+        result = await self._make_request(
+            "post", "/api/item/update", is_item_api=True, data=data
+        )
+        return bool(result and result.get("status") == "success")
+
+    async def get_items_page(
+        self,
+        offset: int = 0,
+        page_size: int = 1000,
+        orderBy: str = "NAME",
+        ext: str = "",
+        folders: Optional[List[str]] = None,
+        tags: Optional[List[str]] = None,
+    ) -> Optional[List[Dict]]:
+        """
+        获取单页项目 (使用 41595 端口)，offset 为页序号
+        """
+        params = {"limit": page_size, "offset": offset, "orderBy": orderBy, "ext": ext}
+        if folders:
+            params["folders"] = ",".join(folders)
+        if tags:
+            params["tags"] = ",".join(tags)
+        result = await self._make_request("get", "/api/item/list", params=params)
+        if result and result.get("status") == "success":
+            return result.get("data")
+        return None
+
+    async def get_folder_list_recursive(
+        self,
+    ) -> FolderIndex:
+        """
+        获取文件夹结构 (使用 41595 端口)
+        返回: FolderIndex
+        """
+        result = await self._make_request("get", "/api/folder/list")
+        if not result or result.get("status") != "success":
+            return FolderIndex()
+        return FolderIndex.from_tree(result.get("data", []) or [])
+
+
+class AsyncSynapForestAPI(_AsyncClientBase):
+    """
+    SynapForestAPI 的异步版本，方法与同步版一致
+    """
+
+    root_folder_id = "00000000-0000-0000-0000-000000000000"
+
+    def __init__(
+        self,
+        concurrency: int = 16,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        base_url: str = "http://127.0.0.1:42595",
+    ):
+        """
+        :param concurrency: 最大并发请求数
+        :param max_retries: 可重试的错误的最大重试次数
+        :param backoff_factor: 重试退避基数(秒)
+        :param base_url: 服务地址
+        """
+        super().__init__(
+            {"Content-Type": "application/json", "Authorization": "TEST123123"},
+            concurrency=concurrency,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+        )
+        self.base_url = base_url
+
+    async def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        data: Optional[Dict] = None,
+        params: Optional[Dict] = None,
+    ) -> Optional[Dict]:
+        if method.lower() == "get":
+            return await self._request(method, f"{self.base_url}{endpoint}", params=params)
+        return await self._request(method, f"{self.base_url}{endpoint}", data=data)
+
+    async def add_from_url(
+        self,
+        img_url: str,
+        name: str,
+        website: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        annotation: Optional[str] = None,
+        modificationTime: Optional[str] = None,
+        folderIds: Optional[List[str]] = None,
+        headers: Optional[Dict] = None,
+    ) -> bool:
+        """
+        从 URL 添加项目
+        """
+        data = {
+            "items": [
+                {
+                    "url": img_url,
+                    "name": name,
+                    "website": website,
+                    "tags": tags,
+                    "annotation": annotation,
+                    "modificationTime": modificationTime,
+                }
+            ],
+            "tag_mode": "name",
+            "folderIds": folderIds,
+            "headers": headers,
+        }
+        data = {k: v for k, v in data.items() if v is not None}
+
+        result = await self._make_request("post", "/api/item/addFromUrls", data=data)
+        return bool(result and result.get("status") == "success")
+
+    async def add_from_urls(
+        self,
+        items: List[Dict],
+        folderIds: Optional[List[str]] = None,
+        headers: Optional[Dict] = None,
+    ) -> bool:
+        """
+        一次请求从多个 URL 添加项目
+        """
+        data = {
+            "items": [
+                {k: v for k, v in item.items() if v is not None} for item in items
+            ],
+            "tag_mode": "name",
+            "folderIds": folderIds,
+            "headers": headers,
+        }
+        data = {k: v for k, v in data.items() if v is not None}
+
+        result = await self._make_request("post", "/api/item/addFromUrls", data=data)
+        return bool(result and result.get("status") == "success")
+
+    async def create_folder(
+        self, folder_name: str, parent: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        创建文件夹
+        """
+        data = {"folderName": folder_name, "parent": parent or self.root_folder_id}
+
+        result = await self._make_request("post", "/api/folder/create", data=data)
+        if result and result.get("status") == "success":
+            return result["data"][0].get("id")
+        return None
+
+    async def update_item(
+        self,
+        item_id: str,
+        tags: Optional[List[str]] = None,
+        annotation: Optional[str] = None,
+        new_url: Optional[str] = None,
+        star: Optional[bool] = None,
+        name: Optional[str] = None,
+        folders: Optional[List[str]] = None,
+    ) -> bool:
+        """
+        更新项目
+        """
+        data = {
+            "id": item_id,
+            "tags": tags,
+            "annotation": annotation,
+            "url": new_url,
+            "star": star,
+            "name": name,
+            "folders": folders,
+            "tag_mode": "name" if tags is not None else None,
+        }
+        data = {k: v for k, v in data.items() if v is not None}
+
+        result = await self._make_request("post", "/api/item/update", data=data)
+        return bool(result and result.get("status") == "success")
+
+    async def get_items_page(
+        self,
+        offset: int = 0,
+        page_size: int = 1000,
+        orderBy: str = "NAME",
+        ext: str = "",
+        folders: Optional[List[str]] = None,
+        tags: Optional[List[str]] = None,
+    ) -> Optional[List[Dict]]:
+        """
+        获取单页项目，offset 为页序号
+        """
+        data = {"limit": page_size, "offset": offset, "orderBy": orderBy}
+        if ext:
+            data["exts"] = [ext]
+        if folders:
+            data["folders"] = folders
+        if tags:
+            data["tags"] = tags
+        result = await self._make_request("post", "/api/item/list", data=data)
+        if result and result.get("status") == "success":
+            return result.get("data")
+        return None
+
+    async def get_folder_list_recursive(
+        self,
+    ) -> FolderIndex:
+        """
+        获取文件夹结构
+        返回: FolderIndex
+        """
+        result = await self._make_request("post", "/api/folder/list", data={})
+        if not result or result.get("status") != "success":
+            return FolderIndex()
+        return FolderIndex.from_tree(result.get("data", []) or [])
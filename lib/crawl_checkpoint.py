@@ -0,0 +1,195 @@
+import sqlite3
+import threading
+import time
+from collections import deque
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    query TEXT PRIMARY KEY,
+    newest_id INTEGER,
+    cursor TEXT,
+    complete INTEGER NOT NULL DEFAULT 0,
+    updated REAL,
+    head_cursor TEXT,
+    pending_newest_id INTEGER
+);
+"""
+
+
+class CrawlCheckpoints:
+    """
+    按查询保存的抓取检查点(SQLite)
+    每个查询记录:
+    - newest_id: 已处理的连续区间上界(高水位)，下次运行只需抓取比它新的帖子
+    - cursor:    回填进度，区间下界的游标(如 "b12345")，中断后从这里继续
+    - complete:  回填是否已到底
+    - pending_newest_id / head_cursor: 未完成的头部抓取(比 newest_id 新的帖子)的上界与进度游标，
+      (head_cursor, pending_newest_id] 已处理；头部抓取到 newest_id 后才把 newest_id 提升为 pending_newest_id
+    即 (cursor, newest_id] 之间的帖子都已处理；complete 时 newest_id 以下全部已处理
+    用法:
+        checkpoints = CrawlCheckpoints("danbooru_checkpoints.db")
+        state = checkpoints.get(query)
+        ...
+        checkpoints.save(query, state)
+    """
+
+    def __init__(self, db_path: Union[str, Path]):
+        """
+        :param db_path: SQLite 文件路径
+        """
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        """旧版检查点表没有头部进度列"""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(checkpoints)")}
+        with self.conn:
+            if "head_cursor" not in columns:
+                self.conn.execute("ALTER TABLE checkpoints ADD COLUMN head_cursor TEXT")
+            if "pending_newest_id" not in columns:
+                self.conn.execute("ALTER TABLE checkpoints ADD COLUMN pending_newest_id INTEGER")
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get(self, query: str) -> Dict:
+        """
+        读取查询的检查点
+        :return: {"newest_id", "cursor", "complete", "head_cursor", "pending_newest_id"}，
+                 从未抓取过时为空字典
+        """
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT newest_id, cursor, complete, head_cursor, pending_newest_id "
+                "FROM checkpoints WHERE query = ?",
+                (query,),
+            ).fetchone()
+        if row is None:
+            return {}
+        return {
+            "newest_id": row[0],
+            "cursor": row[1],
+            "complete": bool(row[2]),
+            "head_cursor": row[3],
+            "pending_newest_id": row[4],
+        }
+
+    def save(self, query: str, state: Dict) -> None:
+        """写入查询的检查点(state 结构同 get 的返回值)"""
+        if not state:
+            return
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints "
+                "(query, newest_id, cursor, complete, updated, head_cursor, pending_newest_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    query,
+                    state.get("newest_id"),
+                    state.get("cursor"),
+                    int(bool(state.get("complete"))),
+                    time.time(),
+                    state.get("head_cursor"),
+                    state.get("pending_newest_id"),
+                ),
+            )
+
+    def reset(self, query: Optional[str] = None) -> None:
+        """清除某个查询(默认全部)的检查点，下次从头抓取"""
+        with self._lock, self.conn:
+            if query is None:
+                self.conn.execute("DELETE FROM checkpoints")
+            else:
+                self.conn.execute("DELETE FROM checkpoints WHERE query = ?", (query,))
+
+    def queries(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self.conn.execute("SELECT query FROM checkpoints")]
+
+
+class CheckpointTracker:
+    """
+    流水线中的检查点推进
+    页面按抓取顺序登记，并给出该页待完成的帖子；只有某页及之前所有页的帖子都完成后，
+    该页的检查点才算提交，每提交 save_every 页写入一次 CrawlCheckpoints
+    某页有帖子导入失败时，该页及该查询之后的所有页都不再提交，检查点停在失败之前，
+    下次运行会重新抓取这些页面(已导入的帖子由 KnownPosts 跳过)
+    """
+
+    def __init__(self, store: CrawlCheckpoints, save_every: int = 10):
+        """
+        :param store: 检查点存储
+        :param save_every: 每提交多少页写入一次
+        """
+        self.store = store
+        self.save_every = save_every
+        self._lock = threading.Lock()
+        self._pages = deque()  # [query, state, 未完成的键集合, 是否有失败]
+        self._owner: Dict[str, list] = {}
+        self._committed: Dict[str, Dict] = {}
+        self._saved: Dict[str, Dict] = {}
+        self._failed: Set[str] = set()
+        self._since_save = 0
+
+    def add_page(self, query: str, state: Dict, keys: Iterable[str], failed: bool = False) -> None:
+        """
+        登记一页及其待完成的帖子键(如帖子 URL)
+        :param failed: 该页在登记前就处理失败(如本地筛选出错)，等同于其中有帖子导入失败
+        """
+        entry = [query, state, set(keys), failed]
+        with self._lock:
+            self._pages.append(entry)
+            for key in entry[2]:
+                self._owner[key] = entry
+            self._advance()
+
+    def done(self, key: str) -> None:
+        """某个帖子已导入，或已确定无需导入(如没有 file_url、近似重复)"""
+        self._finish(key, False)
+
+    def failed(self, key: str) -> None:
+        """某个帖子导入失败: 该页及该查询之后的页面都不再提交"""
+        self._finish(key, True)
+
+    def _finish(self, key: str, failed: bool) -> None:
+        with self._lock:
+            entry = self._owner.pop(key, None)
+            if entry is not None:
+                entry[2].discard(key)
+                entry[3] = entry[3] or failed
+                self._advance()
+
+    def _advance(self) -> None:
+        while self._pages and not self._pages[0][2]:
+            query, state, _, failed = self._pages.popleft()
+            if failed:
+                self._failed.add(query)
+            if query in self._failed:
+                continue
+            self._committed[query] = state
+            self._since_save += 1
+        if self._since_save >= self.save_every:
+            self._save()
+
+    def _save(self) -> None:
+        for query, state in self._committed.items():
+            if self._saved.get(query) != state:
+                self.store.save(query, state)
+                self._saved[query] = state
+        self._since_save = 0
+
+    def close(self) -> Dict[str, Dict]:
+        """写入所有已提交的检查点，返回各查询最终的检查点"""
+        with self._lock:
+            self._advance()
+            self._save()
+            if self._pages:
+                print(f"[Checkpoint] {len(self._pages)} pages not fully imported, not saved.")
+            if self._failed:
+                print(f"[Checkpoint] Imports failed, checkpoints held before the failure: {sorted(self._failed)}")
+            return dict(self._committed)
@@ -0,0 +1,178 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+import requests
+from pybooru import Danbooru
+from requests.adapters import HTTPAdapter
+
+from lib.rate_limit import AdaptiveConcurrency, TokenBucket
+
+# 可重试的状态码: 限流与服务端暂时不可用
+RETRY_STATUS = (429, 502, 503, 504)
+
+
+class RateLimitExceeded(requests.exceptions.RequestException):
+    """重试次数用完后仍被限流或服务端不可用"""
+
+
+def retry_after(response: requests.Response) -> Optional[float]:
+    """解析 Retry-After 头(秒数或 HTTP 日期)，没有或无法解析时返回 None"""
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class ThrottledAdapter(HTTPAdapter):
+    """
+    Danbooru 共享访问层: 挂载到 pybooru 客户端的 requests.Session 上，
+    对经由该会话的所有请求(翻页、标签数、md5 查询……)统一生效
+    - 每次发送前从共享令牌桶取令牌，从自适应并发上限取名额
+    - 429/5xx 时按 Retry-After(没有时指数退避加抖动)暂停整个令牌桶后重试，
+      调用方看到的是一次慢一些的成功请求，而不是异常；429 同时降低令牌桶速率与并发上限
+    """
+
+    def __init__(
+        self,
+        bucket: TokenBucket,
+        concurrency: Optional[AdaptiveConcurrency] = None,
+        retries: int = 5,
+        backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        **kwargs,
+    ):
+        """
+        :param bucket: 共享令牌桶
+        :param concurrency: 自适应并发上限，None 表示不限制
+        :param retries: 可重试响应的最大重试次数
+        :param backoff: 没有 Retry-After 时的首次退避(秒)，之后逐次翻倍
+        :param max_backoff: 单次退避上限(秒)
+        """
+        super().__init__(**kwargs)
+        self.bucket = bucket
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "throttled": 0, "retried": 0, "waited_s": 0.0}
+
+    def send(self, request, **kwargs):
+        for attempt in range(self.retries + 1):
+            self.bucket.acquire()
+            if self.concurrency:
+                self.concurrency.acquire()
+            start = time.perf_counter()
+            response = None
+            try:
+                response = super().send(request, **kwargs)
+            finally:
+                if self.concurrency:
+                    self.concurrency.release(
+                        time.perf_counter() - start if response is not None else None,
+                        throttled=response is not None and response.status_code == 429,
+                    )
+            with self._lock:
+                self.stats["requests"] += 1
+
+            if response.status_code not in RETRY_STATUS:
+                self.bucket.succeeded()
+                return response
+            delay = retry_after(response)
+            if delay is None:
+                delay = min(self.backoff * 2**attempt, self.max_backoff) * random.uniform(0.5, 1.0)
+            with self._lock:
+                self.stats["throttled"] += 1
+            if attempt == self.retries:
+                break
+            print(
+                f"[Danbooru] HTTP {response.status_code}, retrying in {delay:.1f}s "
+                f"({attempt + 1}/{self.retries})"
+            )
+            response.close()
+            if response.status_code == 429:
+                self.bucket.throttled(delay)
+            else:
+                self.bucket.pause(delay)
+            with self._lock:
+                self.stats["retried"] += 1
+                self.stats["waited_s"] += delay
+        raise RateLimitExceeded(
+            f"HTTP {response.status_code} after {self.retries} retries: {request.url}",
+            response=response,
+        )
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats["waited_s"] = round(stats["waited_s"], 1)
+        stats["rate"] = round(self.bucket.rate, 2)
+        if self.concurrency:
+            stats["concurrency"] = self.concurrency.limit
+        return stats
+
+
+def throttle_client(client, bucket: TokenBucket, concurrency: Optional[AdaptiveConcurrency] = None, **kwargs):
+    """
+    给 pybooru 客户端挂上共享访问层
+    :param client: pybooru.Danbooru 实例
+    :param bucket: 共享令牌桶，同一账户的所有客户端应传入同一个
+    :param concurrency: 自适应并发上限
+    :param kwargs: 传给 ThrottledAdapter(retries / backoff / max_backoff / pool_maxsize 等)
+    :return: client 本身，适配器在 client.throttle 上
+    """
+    kwargs.setdefault("pool_maxsize", concurrency.max_limit if concurrency else 16)
+    adapter = ThrottledAdapter(bucket, concurrency, **kwargs)
+    client.client.mount("https://", adapter)
+    client.client.mount("http://", adapter)
+    client.throttle = adapter
+    return client
+
+
+_clients: Dict[tuple, object] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(
+    username: str,
+    api_key: str,
+    site_name: str = "danbooru",
+    site_url: str = "",
+    rate: Optional[float] = 8,
+    burst: Optional[float] = None,
+    initial_concurrency: int = 4,
+    max_concurrency: int = 8,
+    retries: int = 5,
+):
+    """
+    进程内共享的 Danbooru 客户端: 同一站点与账户只创建一次，
+    所有调用方(翻页抓取、标签数查询、md5 查询……)共用同一个令牌桶与并发上限
+    :param rate: 账户的每秒请求上限
+    :param burst: 令牌桶容量
+    :param initial_concurrency: 初始并发上限
+    :param max_concurrency: 最大并发上限
+    :param retries: 429/5xx 的最大重试次数
+    :return: 已挂载 ThrottledAdapter 的 pybooru.Danbooru
+    """
+    key = (site_name, site_url, username)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = throttle_client(
+                Danbooru(site_name, site_url=site_url, username=username, api_key=api_key),
+                TokenBucket(rate, burst),
+                AdaptiveConcurrency(initial=initial_concurrency, max_limit=max_concurrency),
+                retries=retries,
+            )
+            _clients[key] = client
+        return client
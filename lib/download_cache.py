@@ -0,0 +1,183 @@
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    md5 TEXT PRIMARY KEY,
+    ext TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_files_last_used ON files(last_used);
+"""
+
+
+class DownloadCache:
+    """
+    按内容 md5 寻址的本地图片缓存: <root>/<md5[:2]>/<md5>.<ext>
+    - 索引(SQLite，位于缓存目录内)记录每个文件的大小与最近使用时间，多个脚本/进程可共用同一目录
+    - 总大小超过 max_bytes 时按最近使用时间淘汰(LRU)；刚写入或刚命中的文件排在最后，
+      只要上限远大于流水线中在途的帖子数，就不会在导入前被淘汰
+    - 打开时索引为空而目录中已有文件(旧版暂存目录或索引丢失)会扫描一次补建索引
+    用法:
+        cache = DownloadCache("danbooru_staging", max_bytes=20 * 1024**3)
+        path = cache.get(md5)
+        if path is None:
+            path = cache.put(downloaded_file, md5, "jpg")
+    """
+
+    INDEX_NAME = "cache.db"
+
+    def __init__(self, root: Union[str, Path], max_bytes: Optional[int] = None):
+        """
+        :param root: 缓存目录
+        :param max_bytes: 总大小上限(字节)，None 表示不限
+        """
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.root / self.INDEX_NAME), check_same_thread=False, timeout=30)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.stats = {"hits": 0, "misses": 0, "added": 0, "evicted": 0}
+        self._total = self._sum_sizes()
+        if not len(self):
+            self.rebuild()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def path_for(self, md5: str, ext: str) -> Path:
+        return self.root / md5[:2] / f"{md5}.{ext}"
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def __contains__(self, md5: str) -> bool:
+        with self._lock:
+            row = self.conn.execute("SELECT ext FROM files WHERE md5 = ?", (md5,)).fetchone()
+        return row is not None and self.path_for(md5, row[0]).exists()
+
+    def _sum_sizes(self) -> int:
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM files").fetchone()[0]
+
+    @property
+    def total_bytes(self) -> int:
+        """本进程视角的总大小(其他进程写入的部分在下次淘汰时计入)"""
+        return self._total
+
+    def get(self, md5: str) -> Optional[Path]:
+        """命中时刷新最近使用时间并返回路径；文件已被外部删除时清除索引记录"""
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT ext FROM files WHERE md5 = ?", (md5,)).fetchone()
+            path = self.path_for(md5, row[0]) if row else None
+            if path is not None and not path.exists():
+                self.conn.execute("DELETE FROM files WHERE md5 = ?", (md5,))
+                path = None
+            if path is None:
+                self.stats["misses"] += 1
+                return None
+            self.conn.execute("UPDATE files SET last_used = ? WHERE md5 = ?", (time.time(), md5))
+            self.stats["hits"] += 1
+        return path
+
+    def put(self, src: Union[str, Path], md5: str, ext: str) -> Path:
+        """
+        把已校验的文件移入缓存(同一文件系统内为原子重命名)，必要时淘汰旧文件
+        :param src: 待移入的文件，通常是下载完成的 .part
+        """
+        path = self.path_for(md5, ext)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(src, path)
+        self._record(md5, ext, path.stat().st_size)
+        return path
+
+    def adopt(self, src: Union[str, Path], md5: str, ext: str) -> Path:
+        """
+        把已有的本地文件(如资料库中的原图)登记进缓存，不经网络
+        优先创建硬链接，不占额外空间；跨文件系统时复制
+        """
+        path = self.path_for(md5, ext)
+        if path.exists():
+            self._record(md5, ext, path.stat().st_size)
+            return path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.adopt")
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copyfile(src, tmp)
+        return self.put(tmp, md5, ext)
+
+    def _record(self, md5: str, ext: str, size: int) -> None:
+        with self._lock, self.conn:
+            row = self.conn.execute("SELECT size FROM files WHERE md5 = ?", (md5,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO files (md5, ext, size, last_used) VALUES (?, ?, ?, ?)",
+                (md5, ext, size, time.time()),
+            )
+            self._total += size - (row[0] if row else 0)
+            self.stats["added"] += row is None
+        if self.max_bytes is not None and self._total > self.max_bytes:
+            self.evict(keep=(md5,))
+
+    def evict(self, keep: Iterable[str] = ()) -> int:
+        """按最近使用时间从旧到新删除文件，直到总大小不超过上限，返回删除的文件数"""
+        if self.max_bytes is None:
+            return 0
+        keep = set(keep)
+        removed = []
+        with self._lock, self.conn:
+            # 重新求和，计入其他进程(如 danbooru_md5.py)写入的文件
+            total = self._sum_sizes()
+            if total <= self.max_bytes:
+                self._total = total
+                return 0
+            for md5, ext, size in self.conn.execute(
+                "SELECT md5, ext, size FROM files ORDER BY last_used"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                if md5 in keep:
+                    continue
+                self.path_for(md5, ext).unlink(missing_ok=True)
+                removed.append((md5,))
+                total -= size
+            self.conn.executemany("DELETE FROM files WHERE md5 = ?", removed)
+            self.stats["evicted"] += len(removed)
+            self._total = total
+        return len(removed)
+
+    def rebuild(self) -> int:
+        """扫描缓存目录补建索引(忽略未完成的 .part)，以文件修改时间作为最近使用时间"""
+        rows = []
+        for path in self.root.glob("??/*.*"):
+            md5, _, ext = path.name.partition(".")
+            if len(md5) != 32 or "." in ext:
+                continue
+            stat = path.stat()
+            rows.append((md5, ext, stat.st_size, stat.st_mtime))
+        if rows:
+            with self._lock, self.conn:
+                self.conn.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)", rows)
+                self._total = self._sum_sizes()
+            print(f"[DownloadCache] 已从目录补建索引: {len(rows)} 个文件")
+            self.evict()
+        return len(rows)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.stats)
+            files, total = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM files").fetchone()
+        stats.update(files=files, mb=round(total / 1e6, 1))
+        if self.max_bytes is not None:
+            stats["max_mb"] = round(self.max_bytes / 1e6, 1)
+        return stats
@@ -0,0 +1,164 @@
+import hashlib
+import os
+import statistics
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from lib.download_cache import DownloadCache
+
+
+class DownloadError(Exception):
+    """下载失败或校验不通过"""
+
+
+class Downloader:
+    """
+    图片并发下载器(本地暂存目录)
+    - 连接池会话，多个线程同时调用 fetch() 即并发下载
+    - 先写入 <文件>.part，校验 md5 后再原子重命名到位；中断留下的 .part 下次用 Range 续传
+    - 文件存放在按内容 md5 寻址的 DownloadCache 中，下载前先查缓存，命中则不发请求
+    - 统计下载字节数、耗时与每个文件的延迟
+    用法:
+        downloader = Downloader(DownloadCache("danbooru_staging", max_bytes=20 * 1024**3), max_workers=8)
+        path = downloader.fetch(post["file_url"], post["md5"], post["file_ext"])
+        print(downloader.get_stats())
+    """
+
+    def __init__(
+        self,
+        cache: Union[DownloadCache, str, Path],
+        max_workers: int = 8,
+        chunk_size: int = 256 * 1024,
+        timeout: float = 60,
+        retries: int = 2,
+        headers: Optional[Dict] = None,
+    ):
+        """
+        :param cache: 下载缓存，传入目录时创建不限大小的缓存
+        :param max_workers: 连接池大小(应不小于并发下载的线程数)
+        :param chunk_size: 流式读取的块大小(字节)
+        :param timeout: 连接与读取超时(秒)
+        :param retries: 连接中断后的续传次数
+        :param headers: 额外请求头
+        """
+        self.cache = cache if isinstance(cache, DownloadCache) else DownloadCache(cache)
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self.retries = retries
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._latencies: List[float] = []
+        self._started: Optional[float] = None
+        self._finished: Optional[float] = None
+        self.stats = {"files": 0, "cached": 0, "resumed": 0, "failed": 0, "bytes": 0}
+
+    def path_for(self, md5: str, ext: str) -> Path:
+        """内容寻址的缓存路径"""
+        return self.cache.path_for(md5, ext)
+
+    def fetch(self, url: str, md5: Optional[str] = None, ext: Optional[str] = None) -> Path:
+        """
+        从缓存取得文件，未命中时下载到缓存，返回路径
+        :param url: 文件地址
+        :param md5: 期望的内容 md5；提供时用于寻址与校验，否则按 URL 的 md5 寻址且不校验
+        :param ext: 扩展名，默认取 URL 的扩展名
+        :raises DownloadError: 下载失败或 md5 不符
+        """
+        start = time.perf_counter()
+        with self._lock:
+            if self._started is None:
+                self._started = start
+        ext = ext or os.path.splitext(url.split("?")[0])[1].lstrip(".") or "bin"
+        key = md5 or hashlib.md5(url.encode()).hexdigest()
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._record(start, cached=True)
+            return cached
+
+        path = self.path_for(key, ext)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        part = path.with_name(path.name + ".part")
+        try:
+            received, resumed = self._download(url, part, md5)
+        except Exception:
+            with self._lock:
+                self.stats["failed"] += 1
+            raise
+        path = self.cache.put(part, key, ext)
+        self._record(start, received=received, resumed=resumed)
+        return path
+
+    def _download(self, url: str, part: Path, md5: Optional[str]):
+        """下载(必要时续传)到 part，返回 (本次接收的字节数, 是否续传过)"""
+        received = 0
+        resumed = False
+        for attempt in range(self.retries + 1):
+            offset = part.stat().st_size if part.exists() else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            try:
+                with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                    if response.status_code == 416:  # .part 已完整
+                        break
+                    if response.status_code not in (200, 206):
+                        raise DownloadError(f"HTTP {response.status_code}: {url}")
+                    # 服务端不支持 Range 时返回 200 与完整内容，从头写
+                    append = offset and response.status_code == 206
+                    resumed = resumed or bool(append)
+                    with open(part, "ab" if append else "wb") as f:
+                        for chunk in response.iter_content(self.chunk_size):
+                            f.write(chunk)
+                            received += len(chunk)
+                break
+            except (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError,
+                    requests.exceptions.Timeout) as e:
+                if attempt == self.retries:
+                    raise DownloadError(f"{url}: {e}") from e
+
+        if md5:
+            digest = hashlib.md5()
+            with open(part, "rb") as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(chunk)
+            if digest.hexdigest() != md5:
+                part.unlink()
+                raise DownloadError(f"md5 mismatch for {url}: expected {md5}, got {digest.hexdigest()}")
+        return received, resumed
+
+    def _record(self, start: float, received: int = 0, cached: bool = False, resumed: bool = False) -> None:
+        now = time.perf_counter()
+        with self._lock:
+            self._finished = now
+            self.stats["cached" if cached else "files"] += 1
+            self.stats["resumed"] += int(resumed)
+            self.stats["bytes"] += received
+            if not cached:
+                self._latencies.append(now - start)
+
+    def get_stats(self) -> Dict:
+        """下载统计: 文件数、复用数、续传数、失败数、MB、MB/s(按首个请求到最后完成的墙钟时间)、延迟"""
+        with self._lock:
+            stats = dict(self.stats)
+            latencies = sorted(self._latencies)
+            wall = (self._finished or 0) - (self._started or 0)
+        stats["mb"] = round(stats.pop("bytes") / 1e6, 2)
+        stats["mb_per_s"] = round(stats["mb"] / wall, 2) if wall > 0 else None
+        if latencies:
+            stats["latency_ms"] = {
+                "mean": round(statistics.fmean(latencies) * 1000, 1),
+                "p50": round(latencies[len(latencies) // 2] * 1000, 1),
+                "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 1),
+            }
+        return stats
+
+    def close(self) -> None:
+        self.session.close()
@@ -1,18 +1,52 @@
 import requests
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Iterator, List, Optional, Any
+
+from lib.folder_index import FolderIndex
+from lib.http_pool import PooledSession
+from lib.paging import PageFetchError, iter_paged
+
 
 class EagleAPI:
-    def __init__(self):
+    def __init__(self, pool_size: int = 10, max_retries: int = 3, backoff_factor: float = 0.5,
+                 base_url_item: str = "http://localhost:41695",
+                 base_url_folder: str = "http://localhost:41595"):
         """
         初始化 Eagle API 客户端
         保留原始的两个不同端口：
         - 41595 用于文件夹和项目列表操作
         - 41695 用于项目添加和更新操作
+        每个端口各持有一个连接池会话(keep-alive + 重试退避)
+        :param pool_size: 每个端口的连接池大小
+        :param max_retries: 连接错误或 5xx 时的最大重试次数
+        :param backoff_factor: 重试退避基数(秒)
+        :param base_url_item: 项目操作地址(可指向本地替身服务)
+        :param base_url_folder: 文件夹操作地址(可指向本地替身服务)
         """
-        self.base_url_item = "http://localhost:41695"  # 项目操作端口
-        self.base_url_folder = "http://localhost:41595"  # 文件夹操作端口
+        self.base_url_item = base_url_item  # 项目操作端口
+        self.base_url_folder = base_url_folder  # 文件夹操作端口
         self.headers = {"Content-Type": "application/json"}
 
+        session_options = {
+            "headers": self.headers,
+            "pool_size": pool_size,
+            "max_retries": max_retries,
+            "backoff_factor": backoff_factor,
+        }
+        self.item_session = PooledSession(self.base_url_item, **session_options)
+        self.folder_session = PooledSession(self.base_url_folder, **session_options)
+
+    def get_connection_stats(self) -> Dict[str, Dict[str, int]]:
+        """获取两个端口的连接统计(新建/复用连接数、重试次数等)"""
+        return {
+            self.base_url_item: self.item_session.get_stats(),
+            self.base_url_folder: self.folder_session.get_stats(),
+        }
+
+    def close(self) -> None:
+        """关闭两个端口的连接池"""
+        self.item_session.close()
+        self.folder_session.close()
+
     def _make_request(self, method: str, endpoint: str, 
                      is_item_api: bool = False,
                      data: Optional[Dict] = None, 
@@ -26,14 +60,14 @@ class EagleAPI:
         :param params: 查询参数
         :return: 响应数据字典或 None
         """
-        base_url = self.base_url_item if is_item_api else self.base_url_folder
-        url = f"{base_url}{endpoint}"
+        session = self.item_session if is_item_api else self.folder_session
+        url = f"{session.base_url}{endpoint}"
         
         try:
             if method.lower() == 'get':
-                response = requests.get(url, params=params, headers=self.headers, proxies={'http': None, 'https': None})
+                response = session.request('get', endpoint, params=params)
             else:
-                response = requests.post(url, json=data, headers=self.headers, proxies={'http': None, 'https': None})
+                response = session.request('post', endpoint, json=data)
 
             if response.status_code == 200:
                 return response.json()
@@ -74,6 +108,34 @@ class EagleAPI:
             return True
         return False
 
+    def add_from_path(self, path: str, name: str, 
+                     website: Optional[str] = None, 
+                     tags: Optional[List[str]] = None, 
+                     annotation: Optional[str] = None, 
+                     modificationTime: Optional[str] = None, 
+                     folderIds: Optional[List[str]] = None) -> bool:
+        """
+        从本地文件添加项目 (使用 41695 端口)
+        文件由调用方预先下载，Eagle 只需复制，不再自行下载
+        :param path: 本地文件的绝对路径
+        """
+        data = {
+            "path": path,
+            "name": name,
+            "website": website,
+            "tags": tags,
+            "annotation": annotation,
+            "modificationTime": modificationTime,
+            "folderIds": folderIds
+        }
+        data = {k: v for k, v in data.items() if v is not None}
+
+        result = self._make_request('post', '/api/item/addFromPath', is_item_api=True, data=data)
+        if result and result.get("status") == "success":
+            print("addFromPath successfully.")
+            return True
+        return False
+
     def create_folder(self, folder_name: str, parent: Optional[str] = None) -> Optional[str]:
         """
         创建文件夹 (使用 41595 端口)
@@ -116,57 +178,76 @@ class EagleAPI:
             return True
         return False
 
-    def get_items(self, limit: int = 100000, orderBy: str = "NAME", ext: str = "") -> Optional[List[Dict]]:
+    def get_items(self, limit: Optional[int] = None, orderBy: str = "NAME", ext: str = "",
+                  folders: Optional[List[str]] = None,
+                  tags: Optional[List[str]] = None) -> Optional[List[Dict]]:
         """
         获取项目列表 (使用 41595 端口)
+        内部按页拉取，资料库再大也不会被截断
+        :param limit: 最多返回的条数，None 表示全部
+        :return: 项目列表；任一页请求失败时返回 None
+        """
+        items = []
+        try:
+            for item in self.iter_items(orderBy=orderBy, ext=ext, folders=folders, tags=tags):
+                items.append(item)
+                if limit is not None and len(items) >= limit:
+                    break
+        except PageFetchError as e:
+            print(f"Listing items failed: {e}")
+            return None
+        return items
+
+    def get_items_page(self, offset: int = 0, page_size: int = 1000, orderBy: str = "NAME",
+                       ext: str = "", folders: Optional[List[str]] = None,
+                       tags: Optional[List[str]] = None) -> Optional[List[Dict]]:
+        """
+        获取单页项目 (使用 41595 端口)
+        :param offset: 页序号，从 0 开始(Eagle 的 offset 按页计)
+        :param page_size: 每页条数
+        :param folders: 服务端按文件夹ID过滤
+        :param tags: 服务端按标签过滤
         """
         params = {
-            "limit": limit,
+            "limit": page_size,
+            "offset": offset,
             "orderBy": orderBy,
             "ext": ext
         }
+        if folders:
+            params["folders"] = ",".join(folders)
+        if tags:
+            params["tags"] = ",".join(tags)
         result = self._make_request('get', '/api/item/list', params=params)
         if result and result.get("status") == "success":
             return result.get("data")
         return None
 
-    def get_folder_list_recursive(self) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
+    def iter_items(self, page_size: int = 1000, orderBy: str = "NAME", ext: str = "",
+                   folders: Optional[List[str]] = None,
+                   tags: Optional[List[str]] = None,
+                   prefetch: bool = True) -> Iterator[Dict]:
+        """
+        分页流式遍历项目 (使用 41595 端口)
+        处理当前页时后台预取下一页，内存占用只与 page_size 有关
+        某页请求失败时抛出 PageFetchError
+        :param folders: 服务端按文件夹ID过滤
+        :param tags: 服务端按标签过滤
+        :param prefetch: 是否后台预取下一页
+        """
+        return iter_paged(
+            lambda offset: self.get_items_page(offset, page_size, orderBy, ext, folders, tags),
+            page_size,
+            prefetch=prefetch,
+        )
+
+    def get_folder_list_recursive(self) -> FolderIndex:
         """
         获取文件夹结构 (使用 41595 端口)
-        返回: (folder_id_to_name, folder_name_to_id, folder_to_root)
+        返回: FolderIndex，可按旧接口解包为 (folder_id_to_name, folder_name_to_id, folder_to_root)
         """
         result = self._make_request('get', '/api/folder/list')
         if not result or result.get("status") != "success":
-            return {}, {}, {}
-
-        folders = result.get("data", [])
-        folder_id_to_name = {}
-        folder_name_to_id = {}
-        folder_to_root = {}
-
-        stack = [(folder, None) for folder in folders]  # (folder, root_id)
-
-        while stack:
-            folder, root_id = stack.pop()
-            folder_id = folder.get("id")
-            folder_name = folder.get("name")
-            
-            folder_id_to_name[folder_id] = folder_name
-            folder_name_to_id[folder_name] = folder_id
-            
-            current_root = root_id if root_id else folder_id
-            folder_to_root[folder_id] = current_root
-            
-            children = folder.get("children", [])
-            for child in children:
-                stack.append((child, current_root))
-
-        return folder_id_to_name, folder_name_to_id, folder_to_root
-
-    def get_folders_by_root_id(self, root_id: str, folder_to_root: Dict[str, str]) -> List[str]:
-        """获取指定根文件夹下的所有文件夹ID"""
-        return [fid for fid, rid in folder_to_root.items() if rid == root_id]
-
-    def get_folder_name_by_id(self, folder_id: str, folder_id_to_name: Dict[str, str]) -> str:
-        """获取文件夹名称"""
-        return folder_id_to_name.get(folder_id, "Folder not found")
\ No newline at end of file
+            return FolderIndex()
+
+        return FolderIndex.from_tree(result.get("data", []))
@@ -0,0 +1,220 @@
+import hashlib
+import mmap
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+# 缓存支持的算法(对应 hashes 表中的列)
+ALGORITHMS = ("md5", "sha256")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS hashes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    md5 TEXT,
+    sha256 TEXT
+);
+"""
+
+
+def hash_file(
+    path: Union[str, Path],
+    algorithms: Sequence[str] = ("md5",),
+    buffer_size: int = 1024 * 1024,
+    mmap_threshold: int = 32 * 1024 * 1024,
+) -> Dict[str, str]:
+    """
+    计算文件摘要，一次读取同时喂给多个算法
+    hashlib 在数据较大时释放 GIL，多线程同时调用可以并行
+    :param buffer_size: 缓冲读取的块大小
+    :param mmap_threshold: 不小于该大小的文件用 mmap 整体映射后一次计算
+    :return: {算法: 十六进制摘要}
+    """
+    digests = [hashlib.new(name) for name in algorithms]
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size and size >= mmap_threshold:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for digest in digests:
+                    digest.update(mapped)
+        else:
+            buffer = bytearray(min(buffer_size, max(size, 1)))
+            view = memoryview(buffer)
+            while True:
+                n = f.readinto(buffer)
+                if not n:
+                    break
+                for digest in digests:
+                    digest.update(view[:n])
+    return {name: digest.hexdigest() for name, digest in zip(algorithms, digests)}
+
+
+class HashCache:
+    """
+    文件摘要的持久化缓存(SQLite)，以 (路径, 大小, mtime_ns) 判断文件是否变化
+    文件未变时直接返回上次的摘要，不再读取内容
+    """
+
+    def __init__(self, db_path: Union[str, Path]):
+        """
+        :param db_path: SQLite 文件路径
+        """
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def lookup(self, entries: Sequence[Tuple[str, os.stat_result]], algorithms: Sequence[str]) -> Dict[str, Dict[str, str]]:
+        """
+        批量查询缓存
+        :param entries: (路径, stat 结果)
+        :return: {路径: 摘要}，只包含大小与修改时间都未变且所需算法齐全的文件
+        """
+        columns = ", ".join(algorithms)
+        hits = {}
+        with self._lock:
+            for path, stat in entries:
+                row = self.conn.execute(
+                    f"SELECT size, mtime_ns, {columns} FROM hashes WHERE path = ?", (path,)
+                ).fetchone()
+                if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns and all(row[2:]):
+                    hits[path] = dict(zip(algorithms, row[2:]))
+        return hits
+
+    def store(self, rows: Iterable[Tuple[str, os.stat_result, Dict[str, str]]]) -> None:
+        """写入 (路径, stat 结果, 摘要)；同一文件未变时保留已有的其他算法摘要"""
+        values = [
+            (path, stat.st_size, stat.st_mtime_ns, digests.get("md5"), digests.get("sha256"))
+            for path, stat, digests in rows
+        ]
+        if not values:
+            return
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO hashes (path, size, mtime_ns, md5, sha256) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET "
+                "md5 = CASE WHEN size = excluded.size AND mtime_ns = excluded.mtime_ns "
+                "THEN COALESCE(excluded.md5, md5) ELSE excluded.md5 END, "
+                "sha256 = CASE WHEN size = excluded.size AND mtime_ns = excluded.mtime_ns "
+                "THEN COALESCE(excluded.sha256, sha256) ELSE excluded.sha256 END, "
+                "size = excluded.size, mtime_ns = excluded.mtime_ns",
+                values,
+            )
+
+
+class FileHasher:
+    """
+    并行、带缓存的文件摘要计算
+    - 先 stat 所有文件并批量查缓存，未变化的文件不读取内容
+    - 其余文件在线程池中计算(大块缓冲读取 / 大文件 mmap，hashlib 释放 GIL，可跑满磁盘带宽)
+    - 结果分批写回缓存
+    用法:
+        hasher = FileHasher("file_hashes.db", algorithms=("md5", "sha256"))
+        for path, digests in hasher.hash_files(paths):
+            print(path, digests["md5"])
+        print(hasher.get_stats())
+    """
+
+    def __init__(
+        self,
+        cache_path: Optional[Union[str, Path]] = None,
+        algorithms: Sequence[str] = ("md5",),
+        workers: Optional[int] = None,
+        buffer_size: int = 1024 * 1024,
+        batch_size: int = 500,
+    ):
+        """
+        :param cache_path: 摘要缓存的 SQLite 路径，None 表示不缓存
+        :param algorithms: 计算的算法，取自 ALGORITHMS
+        :param workers: 线程数，默认 min(32, CPU 数 + 4)
+        :param buffer_size: 缓冲读取的块大小
+        :param batch_size: 每计算多少个文件写一次缓存
+        """
+        unknown = set(algorithms) - set(ALGORITHMS)
+        if unknown:
+            raise ValueError(f"Unsupported algorithms: {sorted(unknown)}")
+        self.algorithms = tuple(algorithms)
+        self.cache = HashCache(cache_path) if cache_path else None
+        self.workers = workers or min(32, (os.cpu_count() or 1) + 4)
+        self.buffer_size = buffer_size
+        self.batch_size = batch_size
+        self.stats = {"files": 0, "cached": 0, "hashed": 0, "failed": 0, "bytes": 0, "seconds": 0.0}
+
+    def close(self) -> None:
+        if self.cache:
+            self.cache.close()
+
+    def hash_file(self, path: Union[str, Path]) -> Dict[str, str]:
+        """单个文件(同样查询与写入缓存)"""
+        for _, digests in self.hash_files([path]):
+            return digests
+        raise OSError(f"Cannot hash {path}")
+
+    def hash_files(self, paths: Iterable[Union[str, Path]]) -> Iterator[Tuple[str, Dict[str, str]]]:
+        """
+        计算一批文件的摘要，逐个产出 (绝对路径, {算法: 摘要})
+        缓存命中的先产出，其余按输入顺序产出(并发计算，但结果按提交顺序返回)；无法读取的文件打印后跳过
+        """
+        start = time.perf_counter()
+        entries = []
+        for path in paths:
+            path = os.path.abspath(path)
+            try:
+                entries.append((path, os.stat(path)))
+            except OSError as e:
+                print(f"[Hasher] Cannot stat {path}: {e}")
+                self.stats["failed"] += 1
+        self.stats["files"] += len(entries)
+
+        hits = self.cache.lookup(entries, self.algorithms) if self.cache else {}
+        self.stats["cached"] += len(hits)
+        for path, digests in hits.items():
+            yield path, digests
+
+        misses = [(path, stat) for path, stat in entries if path not in hits]
+        pending = []
+
+        def compute(entry):
+            path, stat = entry
+            try:
+                return path, stat, hash_file(path, self.algorithms, self.buffer_size)
+            except OSError as e:
+                print(f"[Hasher] Cannot read {path}: {e}")
+                return path, stat, None
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="hasher") as pool:
+                for path, stat, digests in pool.map(compute, misses):
+                    if digests is None:
+                        self.stats["failed"] += 1
+                        continue
+                    self.stats["hashed"] += 1
+                    self.stats["bytes"] += stat.st_size
+                    pending.append((path, stat, digests))
+                    if self.cache and len(pending) >= self.batch_size:
+                        self.cache.store(pending)
+                        pending = []
+                    yield path, digests
+        finally:
+            if self.cache:
+                self.cache.store(pending)
+            self.stats["seconds"] += time.perf_counter() - start
+
+    def get_stats(self) -> Dict:
+        """文件数、缓存命中数、实际计算数、失败数、读取的 MB 与 MB/s"""
+        stats = dict(self.stats)
+        seconds = stats.pop("seconds")
+        stats["mb"] = round(stats.pop("bytes") / 1e6, 1)
+        stats["mb_per_s"] = round(stats["mb"] / seconds, 1) if seconds else None
+        stats["seconds"] = round(seconds, 2)
+        return stats
@@ -0,0 +1,139 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from lib.folder_index import FolderIndex
+
+
+class FolderCache:
+    """
+    进程内文件夹缓存
+    - 首次使用时拉取一次文件夹树，之后只在缓存未命中时才重新拉取
+    - 同一个名称未命中并刷新过一次后不再触发刷新(负缓存)
+    - 记录本进程创建的文件夹，刷新后仍会保留
+    - list_round_trips 统计 /api/folder/list 的请求次数
+    - dry_run=True 时不创建文件夹，缺失的文件夹以占位ID "<名称>" 记入缓存
+    """
+
+    def __init__(self, backend, max_workers: int = 8, dry_run: bool = False):
+        """
+        :param backend: EagleAPI 或 SynapForestAPI
+        :param max_workers: 批量创建文件夹时的并发数
+        :param dry_run: 只分配占位ID，不实际创建文件夹
+        """
+        self.backend = backend
+        self.max_workers = max_workers
+        self.dry_run = dry_run
+        self._index: Optional[FolderIndex] = None
+        self._lock = threading.RLock()
+        self._missed: Set[Tuple[Optional[str], str]] = set()
+        self.created: Dict[str, Tuple[str, Optional[str]]] = {}  # id -> (name, parent)
+        self.list_round_trips = 0
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def index(self) -> FolderIndex:
+        if self._index is None:
+            self.refresh()
+        return self._index
+
+    def refresh(self) -> FolderIndex:
+        """从服务端重新拉取文件夹树，并补回本进程创建的文件夹"""
+        with self._lock:
+            index = self.backend.get_folder_list_recursive()
+            self.list_round_trips += 1
+            for folder_id, (name, parent) in self.created.items():
+                index.add(folder_id, name, parent)
+            self._index = index
+            self._missed.clear()
+            return index
+
+    def get(self, name: str, parent: Optional[str] = None) -> Optional[str]:
+        """
+        按 (父文件夹, 名称) 查找，未命中时最多刷新一次
+        :param parent: 父文件夹ID，None 表示顶层
+        """
+        with self._lock:
+            folder_id = self.index.find(name, parent)
+            if folder_id is not None:
+                self.hits += 1
+                return folder_id
+
+            self.misses += 1
+            key = (parent, name)
+            if key in self._missed:
+                return None
+            folder_id = self.refresh().find(name, parent)
+            if folder_id is None:
+                self._missed.add(key)
+            return folder_id
+
+    def get_by_name(self, name: str) -> Optional[str]:
+        """按名称查找(不限父文件夹，同名时返回先出现的一个)"""
+        return self.index.get_id(name)
+
+    def _create(self, name: str, parent: Optional[str]) -> Optional[str]:
+        if self.dry_run:
+            folder_id = f"<{name}>"
+            print(f"[DryRun] Would create folder {name!r} under {parent}")
+        else:
+            folder_id = self.backend.create_folder(name, parent)
+        if folder_id:
+            with self._lock:
+                self.created[folder_id] = (name, parent)
+                self.index.add(folder_id, name, parent)
+                self._missed.discard((parent, name))
+        return folder_id
+
+    def ensure(self, name: str, parent: Optional[str] = None) -> Optional[str]:
+        """获取文件夹ID，不存在时创建"""
+        folder_id = self.get(name, parent)
+        if folder_id is None:
+            folder_id = self._create(name, parent)
+        return folder_id
+
+    def ensure_many(
+        self, names: Iterable[str], parent: Optional[str] = None
+    ) -> Dict[str, str]:
+        """
+        批量确保同一父文件夹下的多个文件夹存在
+        缺失的文件夹最多触发一次刷新，然后并发创建
+        :return: 名称到ID的映射(创建失败的名称不在其中)
+        """
+        names = [n for n in dict.fromkeys(names) if n]
+        result = {}
+        missing = []
+        for name in names:
+            folder_id = self.index.find(name, parent)
+            if folder_id is None:
+                missing.append(name)
+            else:
+                result[name] = folder_id
+
+        if missing:
+            index = self.refresh()
+            still_missing = []
+            for name in missing:
+                folder_id = index.find(name, parent)
+                if folder_id is None:
+                    still_missing.append(name)
+                else:
+                    result[name] = folder_id
+
+            if still_missing:
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    created = executor.map(lambda n: self._create(n, parent), still_missing)
+                    for name, folder_id in zip(still_missing, created):
+                        if folder_id:
+                            result[name] = folder_id
+        return result
+
+    def get_stats(self) -> Dict[str, int]:
+        """缓存统计: 文件夹列表请求次数、命中、未命中、本进程创建数"""
+        return {
+            "list_round_trips": self.list_round_trips,
+            "hits": self.hits,
+            "misses": self.misses,
+            "created": len(self.created),
+        }
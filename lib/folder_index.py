@@ -0,0 +1,115 @@
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class FolderIndex:
+    """
+    文件夹树索引
+    - 按 ID、按 (父文件夹, 名称)、按根文件夹 O(1) 查找
+    - 维护父子邻接表，可解析完整路径
+    - create_folder 之后用 add() 就地插入，无需重新拉取整棵树
+    兼容旧接口: 可按元组解包为 (folder_id_to_name, folder_name_to_id, folder_to_root)
+    注意 folder_name_to_id 中同名文件夹只保留先出现的一个，需要区分时请用 find(name, parent)
+    """
+
+    def __init__(self):
+        self.folder_id_to_name: Dict[str, str] = {}
+        self.folder_name_to_id: Dict[str, str] = {}
+        self.folder_to_root: Dict[str, str] = {}
+        self.parent_of: Dict[str, Optional[str]] = {}
+        self.children: Dict[Optional[str], List[str]] = {None: []}  # None 为顶层
+        self._by_parent_name: Dict[Tuple[Optional[str], str], str] = {}
+        self._by_root: Dict[str, List[str]] = {}
+        self._by_name: Dict[str, List[str]] = {}
+
+    @classmethod
+    def from_tree(cls, folders: List[Dict]) -> "FolderIndex":
+        """
+        由 /api/folder/list 返回的嵌套文件夹树构建
+        广度优先，保证父文件夹先于子文件夹插入
+        """
+        index = cls()
+        level = [(folder, None) for folder in folders or []]
+        while level:
+            next_level = []
+            for folder, parent_id in level:
+                folder_id = folder.get("id")
+                index.add(folder_id, folder.get("name"), parent_id)
+                for child in folder.get("children") or []:
+                    next_level.append((child, folder_id))
+            level = next_level
+        return index
+
+    def __iter__(self) -> Iterator[Dict[str, str]]:
+        return iter((self.folder_id_to_name, self.folder_name_to_id, self.folder_to_root))
+
+    def __contains__(self, folder_id: str) -> bool:
+        return folder_id in self.folder_id_to_name
+
+    def __len__(self) -> int:
+        return len(self.folder_id_to_name)
+
+    def add(self, folder_id: str, name: str, parent: Optional[str] = None) -> None:
+        """
+        插入文件夹(通常在 create_folder 成功后调用)
+        :param folder_id: 文件夹ID
+        :param name: 文件夹名称
+        :param parent: 父文件夹ID，None 表示顶层
+        """
+        if not folder_id or folder_id in self.folder_id_to_name:
+            return
+        root_id = self.folder_to_root.get(parent, parent) if parent else folder_id
+
+        self.folder_id_to_name[folder_id] = name
+        self.folder_name_to_id.setdefault(name, folder_id)
+        self.folder_to_root[folder_id] = root_id
+        self.parent_of[folder_id] = parent
+        self.children.setdefault(parent, []).append(folder_id)
+        self.children.setdefault(folder_id, [])
+        self._by_parent_name.setdefault((parent, name), folder_id)
+        self._by_root.setdefault(root_id, []).append(folder_id)
+        self._by_name.setdefault(name, []).append(folder_id)
+
+    def name(self, folder_id: str, default: str = "Folder not found") -> str:
+        """获取文件夹名称"""
+        return self.folder_id_to_name.get(folder_id, default)
+
+    def get_id(self, name: str) -> Optional[str]:
+        """按名称查找(同名时返回先出现的一个)"""
+        return self.folder_name_to_id.get(name)
+
+    def find(self, name: str, parent: Optional[str] = None) -> Optional[str]:
+        """按 (父文件夹, 名称) 精确查找，parent=None 表示顶层"""
+        return self._by_parent_name.get((parent, name))
+
+    def ids_by_name(self, name: str) -> List[str]:
+        """所有同名文件夹的ID"""
+        return list(self._by_name.get(name, []))
+
+    def root_of(self, folder_id: str) -> Optional[str]:
+        """文件夹所属的根文件夹ID"""
+        return self.folder_to_root.get(folder_id)
+
+    def folders_by_root(self, root_id: str) -> List[str]:
+        """指定根文件夹下的所有文件夹ID(含根自身)"""
+        return list(self._by_root.get(root_id, []))
+
+    def child_ids(self, folder_id: Optional[str]) -> List[str]:
+        """直接子文件夹ID，folder_id=None 返回顶层文件夹"""
+        return list(self.children.get(folder_id, []))
+
+    def path(self, folder_id: str, sep: str = "/") -> str:
+        """完整路径，如 CopyrightNew/genshin_impact/furina_(genshin_impact)"""
+        names = []
+        while folder_id is not None and folder_id in self.folder_id_to_name:
+            names.append(self.folder_id_to_name[folder_id])
+            folder_id = self.parent_of.get(folder_id)
+        return sep.join(reversed(names))
+
+    def resolve_path(self, path: str, sep: str = "/") -> Optional[str]:
+        """按完整路径查找文件夹ID，找不到返回 None"""
+        folder_id = None
+        for name in [p for p in path.split(sep) if p]:
+            folder_id = self.find(name, folder_id)
+            if folder_id is None:
+                return None
+        return folder_id
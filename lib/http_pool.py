@@ -0,0 +1,138 @@
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+
+# 可以安全重发的方法: 服务端即使已处理过，再处理一次结果也相同
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def backoff_delay(attempt: int, backoff_factor: float, backoff_max: float) -> float:
+    """第 attempt 次重试前的等待时间(full jitter 指数退避)"""
+    cap = min(backoff_max, backoff_factor * (2**attempt))
+    return random.uniform(0, cap)
+
+
+def request_not_sent(error: Exception) -> bool:
+    """连接错误是否发生在请求发出之前(建立连接超时、连接被拒绝、域名解析失败)，此时任何方法都可以重发"""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], "reason", None) if error.args else None
+    return isinstance(reason, urllib3.exceptions.NewConnectionError)
+
+
+class PooledSession:
+    """
+    单端口的连接池会话
+    - 基于 requests.Session + HTTPAdapter，复用 keep-alive 连接
+    - 按带抖动的指数退避重试: GET/HEAD 在连接错误、超时与 5xx 时重试；
+      POST 等非幂等请求只在请求发出前的连接错误时重试(读超时或 5xx 时服务端可能已处理，重发会重复创建)
+    - 统计新建连接数与复用连接数
+    """
+
+    proxies = {"http": None, "https": None}
+
+    def __init__(
+        self,
+        base_url: str,
+        headers: Optional[Dict] = None,
+        pool_size: int = 10,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        backoff_max: float = 10.0,
+        timeout: Optional[float] = None,
+    ):
+        """
+        :param base_url: 服务地址，如 http://localhost:41595
+        :param headers: 默认请求头
+        :param pool_size: 连接池大小(同时保持的 keep-alive 连接数)
+        :param max_retries: 可重试的错误(见类说明)的最大重试次数
+        :param backoff_factor: 退避基数(秒)，第 n 次重试最多等待 backoff_factor * 2^n
+        :param backoff_max: 单次退避的最长等待时间(秒)
+        :param timeout: 请求超时(秒)，None 表示不限
+        """
+        self.base_url = base_url.rstrip("/")
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        self.session.headers["Connection"] = "keep-alive"
+        # 重试由本类处理，适配器本身不再重试
+        self.adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=0, pool_block=True
+        )
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.failures = 0
+
+    def request(self, method: str, endpoint: str, **kwargs) -> requests.Response:
+        """
+        发送请求，可重试的错误自动重试(幂等方法: 连接错误、超时与 5xx；其他方法: 请求发出前的连接错误)
+        :param method: HTTP 方法
+        :param endpoint: API 端点，如 /api/item/list
+        :return: 最后一次请求的响应(5xx 不可重试或重试耗尽时也原样返回)；
+                 连接失败且不可重试或重试耗尽时抛出 RequestException
+        """
+        url = f"{self.base_url}{endpoint}"
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS
+        kwargs.setdefault("proxies", self.proxies)
+        kwargs.setdefault("timeout", self.timeout)
+
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, url, **kwargs)
+                if response.status_code < 500 or not idempotent or attempt >= self.max_retries:
+                    return response
+                # 读完并丢弃响应体，连接才能放回池中复用
+                response.content
+                response.close()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.max_retries or not (idempotent or request_not_sent(e)):
+                    with self._lock:
+                        self.failures += 1
+                    raise
+
+            with self._lock:
+                self.retries += 1
+            time.sleep(backoff_delay(attempt, self.backoff_factor, self.backoff_max))
+            attempt += 1
+
+    def get_stats(self) -> Dict[str, int]:
+        """
+        连接统计
+        返回: {"requests", "new_connections", "reused_connections", "retries", "failures"}
+        """
+        requests_count = 0
+        new_connections = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            try:
+                pool = pools[key]
+            except KeyError:
+                continue
+            requests_count += pool.num_requests
+            new_connections += pool.num_connections
+
+        return {
+            "requests": requests_count,
+            "new_connections": new_connections,
+            "reused_connections": max(requests_count - new_connections, 0),
+            "retries": self.retries,
+            "failures": self.failures,
+        }
+
+    def close(self) -> None:
+        """关闭会话并释放连接"""
+        self.session.close()
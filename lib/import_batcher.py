@@ -0,0 +1,237 @@
+import json
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class ImportBatcher:
+    """
+    addFromURL 批量导入适配器
+    - 按 (folderIds, headers) 分组收集待导入项目
+    - 某组攒满 batch_size 或最早一项等待超过 max_delay 秒时刷新
+    - 后端支持 add_from_urls(SynapForest)时一组只发一次请求；
+      否则(Eagle 的 addFromURLs 只能指定单个文件夹)回退为并发的单项 add_from_url，
+      此时攒批没有收益，每项加入后立即提交
+    - 带本地文件路径(path)的项目在后端支持 add_from_path 时改用 addFromPath 单项导入，不参与攒批；
+      按路径导入失败时改用 img_url 重试(后端可能读不到该路径，如 WSL 下的暂存目录)，
+      从未成功且连续 path_fallback_limit 次回退后不再按路径导入
+    用法:
+        with ImportBatcher(backend) as importer:
+            importer.add(url, name, website=..., tags=..., folderIds=...)
+        print(importer.report)
+    """
+
+    def __init__(
+        self,
+        backend,
+        batch_size: int = 50,
+        max_delay: float = 2.0,
+        max_workers: int = 8,
+        on_done: Optional[Callable[[Dict, bool], None]] = None,
+        path_fallback_limit: int = 3,
+    ):
+        """
+        :param backend: EagleAPI 或 SynapForestAPI
+        :param batch_size: 每组攒满多少项刷新
+        :param max_delay: 一组最早一项的最长等待时间(秒)
+        :param max_workers: 并发请求数
+        :param on_done: 每项导入完成后的回调 (项目参数, 是否成功)
+        :param path_fallback_limit: 按路径导入从未成功时，回退多少次后停用路径导入
+        """
+        self.backend = backend
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.on_done = on_done
+        self.bulk = callable(getattr(backend, "add_from_urls", None))
+        self.by_path = callable(getattr(backend, "add_from_path", None))
+        self.path_fallback_limit = path_fallback_limit
+        self._path_succeeded = False
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="import-batcher"
+        )
+        self._lock = threading.Lock()
+        self._groups: Dict[Tuple, List[Dict]] = {}
+        self._group_started: Dict[Tuple, float] = {}
+        self._futures: List[Future] = []
+        self.report = {"items": 0, "requests": 0, "succeeded": 0, "failed": 0, "path_fallbacks": 0}
+
+        self._closed = threading.Event()
+        self._timer = threading.Thread(target=self._flush_expired_loop, daemon=True)
+        self._timer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @staticmethod
+    def _group_key(folderIds: Optional[List[str]], headers: Optional[Dict]) -> Tuple:
+        folders = tuple(sorted(folderIds)) if folderIds else ()
+        return folders, json.dumps(headers, sort_keys=True) if headers else ""
+
+    def add(
+        self,
+        img_url: str,
+        name: str,
+        website: Optional[str] = None,
+        tags: Optional[List[str]] = None,
+        annotation: Optional[str] = None,
+        modificationTime: Optional[str] = None,
+        folderIds: Optional[List[str]] = None,
+        headers: Optional[Dict] = None,
+        path: Optional[str] = None,
+    ) -> None:
+        """
+        加入一个待导入项目，参数同 add_from_url
+        :param path: 已下载到本地的文件路径；后端不支持 add_from_path 时忽略，仍按 img_url 导入
+        """
+        item = {
+            "url": img_url,
+            "name": name,
+            "website": website,
+            "tags": tags,
+            "annotation": annotation,
+            "modificationTime": modificationTime,
+        }
+        if path and self.by_path:
+            item["path"] = path
+            with self._lock:
+                self.report["items"] += 1
+                future = self._executor.submit(self._send_single, item, folderIds, headers)
+                self._futures = [f for f in self._futures if not f.done()] + [future]
+            return
+        key = self._group_key(folderIds, headers)
+        with self._lock:
+            group = self._groups.setdefault(key, [])
+            if not group:
+                self._group_started[key] = time.monotonic()
+            group.append(item)
+            self.report["items"] += 1
+            full = not self.bulk or len(group) >= self.batch_size
+        if full:
+            self._flush_group(key)
+
+    def _flush_group(self, key: Tuple) -> None:
+        with self._lock:
+            items = self._groups.pop(key, [])
+            self._group_started.pop(key, None)
+        if not items:
+            return
+
+        folders, headers_json = key
+        folderIds = list(folders) or None
+        headers = json.loads(headers_json) if headers_json else None
+        if self.bulk:
+            futures = [self._executor.submit(self._send_bulk, items, folderIds, headers)]
+        else:
+            futures = [
+                self._executor.submit(self._send_single, item, folderIds, headers)
+                for item in items
+            ]
+        with self._lock:
+            self._futures = [f for f in self._futures if not f.done()] + futures
+
+    def _record(self, items: List[Dict], ok: bool) -> None:
+        with self._lock:
+            self.report["requests"] += 1
+            self.report["succeeded" if ok else "failed"] += len(items)
+        if self.on_done:
+            for item in items:
+                self.on_done(item, ok)
+
+    def _send_bulk(self, items: List[Dict], folderIds, headers) -> None:
+        try:
+            ok = self.backend.add_from_urls(items, folderIds=folderIds, headers=headers)
+        except Exception as e:
+            print(f"[ImportBatcher] Bulk import of {len(items)} items failed: {e}")
+            ok = False
+        self._record(items, ok)
+
+    def _send_single(self, item: Dict, folderIds, headers) -> None:
+        if "path" in item and self._send_path(item, folderIds):
+            return
+        try:
+            ok = self.backend.add_from_url(
+                item["url"],
+                item["name"],
+                website=item["website"],
+                tags=item["tags"],
+                annotation=item["annotation"],
+                modificationTime=item["modificationTime"],
+                folderIds=folderIds,
+                headers=headers,
+            )
+        except Exception as e:
+            print(f"[ImportBatcher] Import of {item['url']} failed: {e}")
+            ok = False
+        self._record([item], ok)
+
+    def _send_path(self, item: Dict, folderIds) -> bool:
+        """按路径导入；成功时记录结果并返回 True，失败时返回 False 由调用方按 URL 重试"""
+        try:
+            ok = self.backend.add_from_path(
+                item["path"],
+                item["name"],
+                website=item["website"],
+                tags=item["tags"],
+                annotation=item["annotation"],
+                modificationTime=item["modificationTime"],
+                folderIds=folderIds,
+            )
+        except Exception as e:
+            print(f"[ImportBatcher] Import of {item['path']} failed: {e}")
+            ok = False
+        with self._lock:
+            if ok:
+                self._path_succeeded = True
+            else:
+                self.report["requests"] += 1
+                self.report["path_fallbacks"] += 1
+                if (
+                    self.by_path
+                    and not self._path_succeeded
+                    and self.report["path_fallbacks"] >= self.path_fallback_limit
+                ):
+                    self.by_path = False
+                    print("[ImportBatcher] Path imports keep failing, switching to addFromURL.")
+        if ok:
+            self._record([item], ok)
+        else:
+            print(f"[ImportBatcher] Retrying {item['url']} via addFromURL.")
+        return ok
+
+    def _flush_expired_loop(self) -> None:
+        while not self._closed.wait(self.max_delay / 2):
+            now = time.monotonic()
+            with self._lock:
+                expired = [
+                    key
+                    for key, started in self._group_started.items()
+                    if now - started >= self.max_delay
+                ]
+            for key in expired:
+                self._flush_group(key)
+
+    def flush(self, wait: bool = True) -> Dict[str, int]:
+        """刷新所有分组；wait=True 时等待已提交的请求完成"""
+        with self._lock:
+            keys = list(self._groups)
+        for key in keys:
+            self._flush_group(key)
+        if wait:
+            with self._lock:
+                futures = list(self._futures)
+            for future in futures:
+                future.result()
+        return dict(self.report)
+
+    def close(self) -> Dict[str, int]:
+        """最后一次刷新，等待全部请求完成后返回报告"""
+        self._closed.set()
+        self._timer.join()
+        report = self.flush(wait=True)
+        self._executor.shutdown(wait=True)
+        print(f"[ImportBatcher] Report: {report}")
+        return report
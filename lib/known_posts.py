@@ -0,0 +1,161 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    post_id INTEGER PRIMARY KEY,
+    md5 TEXT,
+    added REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_posts_md5 ON posts(md5);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class PostIdBitmap:
+    """
+    帖子 id 集合的位图表示: 第 n 位表示 id n 是否存在
+    Danbooru 的 id 连续且稠密，一千万个 id 只占约 1.2 MB，远小于同等规模的 set[int]
+    """
+
+    def __init__(self, ids: Iterable[int] = ()):
+        self._bits = bytearray()
+        self._count = 0
+        self.update(ids)
+
+    def add(self, post_id: int) -> None:
+        byte, bit = divmod(post_id, 8)
+        if byte >= len(self._bits):
+            # 按倍数扩容，避免逐字节增长
+            self._bits.extend(bytes(max(byte + 1 - len(self._bits), len(self._bits))))
+        if not self._bits[byte] & (1 << bit):
+            self._bits[byte] |= 1 << bit
+            self._count += 1
+
+    def update(self, ids: Iterable[int]) -> None:
+        for post_id in ids:
+            self.add(post_id)
+
+    def discard(self, post_id: int) -> None:
+        byte, bit = divmod(post_id, 8)
+        if byte < len(self._bits) and self._bits[byte] & (1 << bit):
+            self._bits[byte] &= ~(1 << bit) & 0xFF
+            self._count -= 1
+
+    def __contains__(self, post_id) -> bool:
+        if not isinstance(post_id, int) or post_id < 0:
+            return False
+        byte = post_id >> 3
+        return byte < len(self._bits) and bool(self._bits[byte] & (1 << (post_id & 7)))
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._bits)
+
+
+class KnownPosts:
+    """
+    已导入 Danbooru 帖子的持久化索引(SQLite)，记录帖子 id 与 md5
+    - 打开时把 id 载入内存位图，查重是一次位运算，不必扫描资料库
+    - 每成功导入一个帖子调用 add() 写入，下次运行直接可用
+    - reconcile() 定期与资料库中实际存在的帖子对账: 补上库里有但索引缺失的，
+      删去库里已删除的(最近 grace 秒内写入的除外，Eagle 可能尚未完成下载)
+    用法:
+        known = KnownPosts("danbooru_known_posts.db")
+        if known.needs_reconcile(86400):
+            known.reconcile(ids_in_library)
+        if post_id not in known: ...
+        known.add(post_id, md5)
+    """
+
+    def __init__(self, db_path: Union[str, Path]):
+        """
+        :param db_path: SQLite 文件路径
+        """
+        self.db_path = Path(db_path)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.ids = PostIdBitmap(row[0] for row in self.conn.execute("SELECT post_id FROM posts"))
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __contains__(self, post_id) -> bool:
+        return post_id in self.ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def has_md5(self, md5: str) -> bool:
+        with self._lock:
+            row = self.conn.execute("SELECT 1 FROM posts WHERE md5 = ? LIMIT 1", (md5,)).fetchone()
+        return row is not None
+
+    def add(self, post_id: int, md5: Optional[str] = None) -> None:
+        """记录一个已导入的帖子(已存在时补上 md5)"""
+        self.add_many([(post_id, md5)])
+
+    def add_many(self, posts: Iterable[Tuple[int, Optional[str]]]) -> None:
+        rows = [(int(post_id), md5, time.time()) for post_id, md5 in posts]
+        if not rows:
+            return
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO posts (post_id, md5, added) VALUES (?, ?, ?) "
+                "ON CONFLICT(post_id) DO UPDATE SET md5 = COALESCE(excluded.md5, md5)",
+                rows,
+            )
+            self.ids.update(row[0] for row in rows)
+
+    @property
+    def last_reconcile(self) -> float:
+        """上次对账的时间戳(秒)，从未对账为 0"""
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'last_reconcile'").fetchone()
+        return float(row[0]) if row else 0.0
+
+    def needs_reconcile(self, max_age: float) -> bool:
+        return time.time() - self.last_reconcile >= max_age
+
+    def reconcile(self, library_ids: Iterable[int], grace: float = 3600) -> Dict[str, int]:
+        """
+        与资料库中实际存在的帖子 id 对账
+        :param library_ids: 资料库中的全部 Danbooru 帖子 id
+        :param grace: 最近多少秒内写入的记录即使库中没有也保留
+        :return: {"total", "added", "removed"}
+        """
+        library_ids = set(library_ids)
+        now = time.time()
+        with self._lock, self.conn:
+            rows = self.conn.execute("SELECT post_id, added FROM posts").fetchall()
+            indexed = {post_id for post_id, _ in rows}
+            removed = [
+                (post_id,)
+                for post_id, added in rows
+                if post_id not in library_ids and now - added >= grace
+            ]
+            added = [(post_id, None, now) for post_id in library_ids - indexed]
+            self.conn.executemany("DELETE FROM posts WHERE post_id = ?", removed)
+            self.conn.executemany("INSERT INTO posts (post_id, md5, added) VALUES (?, ?, ?)", added)
+            self.conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('last_reconcile', ?)", (str(now),)
+            )
+            for (post_id,) in removed:
+                self.ids.discard(post_id)
+            self.ids.update(row[0] for row in added)
+        report = {"total": len(self.ids), "added": len(added), "removed": len(removed)}
+        print(
+            f"[KnownPosts] 对账完成: {report['total']} 个帖子, "
+            f"补入 {report['added']}, 移除 {report['removed']}"
+        )
+        return report
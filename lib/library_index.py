@@ -0,0 +1,413 @@
+import json
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from lib.folder_index import FolderIndex
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    ext TEXT,
+    url TEXT,
+    mtime INTEGER,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS item_tags (
+    item_id TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (item_id, tag)
+);
+CREATE TABLE IF NOT EXISTS item_folders (
+    item_id TEXT NOT NULL,
+    folder_id TEXT NOT NULL,
+    PRIMARY KEY (item_id, folder_id)
+);
+CREATE TABLE IF NOT EXISTS folders (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    root_id TEXT,
+    parent_id TEXT
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_items_ext ON items(ext);
+CREATE INDEX IF NOT EXISTS idx_item_tags_tag ON item_tags(tag);
+CREATE INDEX IF NOT EXISTS idx_item_folders_folder ON item_folders(folder_id);
+"""
+
+
+def item_mtime(item: Dict) -> int:
+    """项目的修改时间(毫秒)，优先 lastModified，其次 modificationTime"""
+    return int(item.get("lastModified") or item.get("modificationTime") or 0)
+
+
+class LibraryIndex:
+    """
+    资料库的本地 SQLite 镜像
+    - 保存项目、标签、文件夹以及项目与文件夹的归属关系
+    - sync() 按项目修改时间增量同步，只写入有变化的行
+    - full_resync() 清空后全量重建，check_consistency() 检查镜像完整性
+    用法:
+        index = LibraryIndex("library_index.db", EagleAPI())
+        index.ensure_fresh(max_age=600)
+        items = index.items_in_folder(folder_id)
+    """
+
+    def __init__(self, db_path: Union[str, Path], backend=None):
+        """
+        :param db_path: SQLite 文件路径
+        :param backend: EagleAPI 或 SynapForestAPI，用于同步
+        """
+        self.db_path = Path(db_path)
+        self.backend = backend
+        self._lock = threading.Lock()
+        # 手动管理事务，见 _transaction()
+        self.conn = sqlite3.connect(
+            str(self.db_path), check_same_thread=False, isolation_level=None
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.create_function("REGEXP", 2, self._regexp, deterministic=True)
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self) -> None:
+        """旧版镜像的 folders 表没有 parent_id 列"""
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(folders)")}
+        if "parent_id" not in columns:
+            self.conn.execute("ALTER TABLE folders ADD COLUMN parent_id TEXT")
+
+    @staticmethod
+    def _regexp(pattern: str, value: Optional[str]) -> bool:
+        return value is not None and re.search(pattern, value) is not None
+
+    def close(self) -> None:
+        self.conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """加锁并在单个事务中执行，异常时回滚"""
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                yield
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+
+    # ---------------- 元信息 ----------------
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value)
+        )
+
+    @property
+    def last_sync(self) -> float:
+        """上次同步完成的时间戳(秒)，从未同步为 0"""
+        return float(self._get_meta("last_sync") or 0)
+
+    # ---------------- 写入 ----------------
+    def _write_item(self, item: Dict) -> None:
+        item_id = item["id"]
+        self.conn.execute(
+            "INSERT OR REPLACE INTO items (id, name, ext, url, mtime, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                item_id,
+                item.get("name"),
+                (item.get("ext") or "").lower(),
+                item.get("url"),
+                item_mtime(item),
+                json.dumps(item, ensure_ascii=False),
+            ),
+        )
+        self.conn.execute("DELETE FROM item_tags WHERE item_id = ?", (item_id,))
+        self.conn.execute("DELETE FROM item_folders WHERE item_id = ?", (item_id,))
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO item_tags (item_id, tag) VALUES (?, ?)",
+            [(item_id, tag) for tag in item.get("tags") or []],
+        )
+        self.conn.executemany(
+            "INSERT OR IGNORE INTO item_folders (item_id, folder_id) VALUES (?, ?)",
+            [(item_id, fid) for fid in item.get("folders") or []],
+        )
+
+    def _delete_items(self, item_ids: Iterable[str]) -> None:
+        rows = [(item_id,) for item_id in item_ids]
+        for table, column in (("items", "id"), ("item_tags", "item_id"), ("item_folders", "item_id")):
+            self.conn.executemany(f"DELETE FROM {table} WHERE {column} = ?", rows)
+
+    def _sync_folders(self, folders: Optional[FolderIndex] = None) -> int:
+        if folders is None:
+            folders = self.backend.get_folder_list_recursive()
+        if not len(folders):
+            return 0
+        self.conn.execute("DELETE FROM folders")
+        # folder_id_to_name 按插入顺序保存，父文件夹总在子文件夹之前
+        self.conn.executemany(
+            "INSERT INTO folders (id, name, root_id, parent_id) VALUES (?, ?, ?, ?)",
+            [
+                (fid, name, folders.root_of(fid), folders.parent_of.get(fid))
+                for fid, name in folders.folder_id_to_name.items()
+            ],
+        )
+        return len(folders)
+
+    def upsert_item(self, item: Dict) -> None:
+        """写入或覆盖单个项目(例如本进程更新项目后同步到镜像)"""
+        with self._transaction():
+            self._write_item(item)
+
+    def record_update(self, item_id: str, **fields) -> None:
+        """
+        把已成功提交到服务端的修改同步到镜像，避免下次运行前镜像过期
+        :param fields: 与 update_item 相同的字段，如 tags / folders / url
+        """
+        if "new_url" in fields:
+            fields["url"] = fields.pop("new_url")
+        # 读改写在同一事务内，可从多个线程调用
+        with self._transaction():
+            row = self.conn.execute("SELECT data FROM items WHERE id = ?", (item_id,)).fetchone()
+            if row is None:
+                return
+            item = json.loads(row[0])
+            item.update({k: v for k, v in fields.items() if v is not None})
+            self._write_item(item)
+
+    # ---------------- 同步 ----------------
+    def sync(
+        self,
+        items: Optional[Iterable[Dict]] = None,
+        batch_size: int = 2000,
+        present_ids: Optional[Set[str]] = None,
+        folders: Optional[FolderIndex] = None,
+    ) -> Dict[str, int]:
+        """
+        增量同步: 只写入修改时间变化的项目，并删除服务端已不存在的项目
+        :param items: 项目来源，默认 backend.iter_items()
+        :param batch_size: 每批提交的写入数
+        :param present_ids: items 只包含变化项目时，传入全部现存项目ID用于识别删除
+        :param folders: 文件夹树，默认 backend.get_folder_list_recursive()
+        :return: {"seen", "added", "updated", "deleted", "folders"}
+        """
+        if items is None:
+            items = self.backend.iter_items()
+
+        known = dict(self.conn.execute("SELECT id, mtime FROM items"))
+        report = {"seen": 0, "added": 0, "updated": 0, "deleted": 0, "folders": 0}
+        seen = set()
+        pending = 0
+
+        with self._transaction():
+            report["folders"] = self._sync_folders(folders)
+            for item in items:
+                item_id = item.get("id")
+                if not item_id or item.get("isDeleted"):
+                    continue
+                seen.add(item_id)
+                report["seen"] += 1
+
+                stored_mtime = known.get(item_id)
+                if stored_mtime is not None and stored_mtime == item_mtime(item):
+                    continue
+                report["added" if stored_mtime is None else "updated"] += 1
+                self._write_item(item)
+
+                # 分批提交，避免单个事务过大
+                pending += 1
+                if pending >= batch_size:
+                    self.conn.execute("COMMIT")
+                    self.conn.execute("BEGIN")
+                    pending = 0
+
+            removed = set(known) - (seen if present_ids is None else present_ids)
+            self._delete_items(removed)
+            report["deleted"] = len(removed)
+            self._set_meta("last_sync", str(time.time()))
+
+        print(
+            f"[Index] 同步完成: {report['seen']} 项, 新增 {report['added']}, "
+            f"更新 {report['updated']}, 删除 {report['deleted']}, 文件夹 {report['folders']}"
+        )
+        return report
+
+    def full_resync(self, items: Optional[Iterable[Dict]] = None) -> Dict[str, int]:
+        """清空镜像后全量重建"""
+        with self._transaction():
+            for table in ("items", "item_tags", "item_folders", "folders"):
+                self.conn.execute(f"DELETE FROM {table}")
+            self.conn.execute("DELETE FROM meta WHERE key IN ('last_sync', 'disk_scan', 'disk_retry')")
+        return self.sync(items)
+
+    def mark_stale(self) -> None:
+        """标记镜像已过期(例如本进程新增了项目)，下次 ensure_fresh() 必定同步"""
+        with self._transaction():
+            self._set_meta("last_sync", "0")
+
+    def sync_from_reader(self, reader) -> Dict[str, int]:
+        """
+        从磁盘读取器(EagleLibraryReader)增量同步
+        只解析 metadata.json 修改时间晚于上次磁盘扫描的项目，其余项目只需一次 stat
+        回收站中的项目从镜像删除；元数据读取失败的项目记入 disk_retry，下次无论修改时间都重新读取
+        """
+        started = time.time()
+        last_scan = float(self._get_meta("disk_scan") or 0)
+        # 留出余量，避免文件系统时间精度导致漏掉临界修改
+        changed_since = last_scan - 2 if last_scan else None
+        retry = set(json.loads(self._get_meta("disk_retry") or "[]"))
+        present, failed = set(), set()
+        report = self.sync(
+            reader.iter_items(
+                changed_since=changed_since, present_ids=present, failed_ids=failed, retry_ids=retry
+            ),
+            present_ids=present,
+            folders=reader.get_folder_list_recursive(),
+        )
+        with self._transaction():
+            self._set_meta("disk_scan", str(started))
+            self._set_meta("disk_retry", json.dumps(sorted(failed)))
+        if failed:
+            print(f"[Index] {len(failed)} 项元数据读取失败，下次同步时重试")
+        report["failed"] = len(failed)
+        return report
+
+    def ensure_fresh(self, max_age: float = 600, reader=None) -> Optional[Dict[str, int]]:
+        """
+        镜像超过 max_age 秒未同步时执行增量同步
+        :param reader: 可选的 EagleLibraryReader；提供时总是做一次廉价的磁盘增量同步
+        :return: 同步报告；镜像足够新时返回 None
+        """
+        if reader is not None and reader.exists():
+            return self.sync_from_reader(reader)
+        if time.time() - self.last_sync < max_age:
+            print(f"[Index] 使用本地镜像 ({self.count_items()} 项)")
+            return None
+        return self.sync()
+
+    def check_consistency(self, deep: bool = False) -> Dict[str, int]:
+        """
+        一致性检查
+        - 本地: SQLite 完整性、孤立的标签/归属行、引用了未知文件夹的归属
+        - deep=True 时再与服务端逐项比对: 缺失、多余、修改时间不一致
+        :return: 各项问题的计数，全部为 0 表示一致
+        """
+        conn = self.conn
+        report = {
+            "integrity_errors": int(conn.execute("PRAGMA integrity_check").fetchone()[0] != "ok"),
+            "orphan_tags": conn.execute(
+                "SELECT COUNT(*) FROM item_tags WHERE item_id NOT IN (SELECT id FROM items)"
+            ).fetchone()[0],
+            "orphan_memberships": conn.execute(
+                "SELECT COUNT(*) FROM item_folders WHERE item_id NOT IN (SELECT id FROM items)"
+            ).fetchone()[0],
+            "unknown_folders": conn.execute(
+                "SELECT COUNT(DISTINCT folder_id) FROM item_folders "
+                "WHERE folder_id NOT IN (SELECT id FROM folders)"
+            ).fetchone()[0],
+        }
+
+        if deep:
+            known = dict(conn.execute("SELECT id, mtime FROM items"))
+            missing = stale = 0
+            seen = set()
+            for item in self.backend.iter_items():
+                item_id = item.get("id")
+                seen.add(item_id)
+                if item_id not in known:
+                    missing += 1
+                elif known[item_id] != item_mtime(item):
+                    stale += 1
+            report["missing"] = missing
+            report["stale"] = stale
+            report["extra"] = len(set(known) - seen)
+
+        print(f"[Index] 一致性检查: {report}")
+        return report
+
+    # ---------------- 查询 ----------------
+    def _query_items(self, sql: str, params: Tuple = ()) -> List[Dict]:
+        return [json.loads(row[0]) for row in self.conn.execute(sql, params)]
+
+    def count_items(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def get_item(self, item_id: str) -> Optional[Dict]:
+        items = self._query_items("SELECT data FROM items WHERE id = ?", (item_id,))
+        return items[0] if items else None
+
+    def items_in_folder(self, folder_id: str) -> List[Dict]:
+        """文件夹 X 中的项目"""
+        return self._query_items(
+            "SELECT i.data FROM items i JOIN item_folders f ON f.item_id = i.id "
+            "WHERE f.folder_id = ? ORDER BY i.name",
+            (folder_id,),
+        )
+
+    def live_items_in_folder(self, folder_id: str, reader=None) -> List[Dict]:
+        """
+        文件夹 X 中项目的最新数据，供读-改-写(UpdateQueue 的 current=)使用；只读扫描用 items_in_folder
+        - 可读取资料库目录时先做磁盘增量同步再查镜像(磁盘即 Eagle 已保存的状态)
+        - 否则不使用可能过期的镜像，直接向服务端列出该文件夹，并把结果写回镜像
+        :param reader: 可选的 EagleLibraryReader
+        """
+        if reader is not None and reader.exists():
+            self.sync_from_reader(reader)
+            return self.items_in_folder(folder_id)
+        items = [
+            item
+            for item in self.backend.iter_items(folders=[folder_id])
+            if item.get("id") and not item.get("isDeleted")
+        ]
+        with self._transaction():
+            for item in items:
+                self._write_item(item)
+        return items
+
+    def items_by_ext(self, ext: str) -> List[Dict]:
+        """指定扩展名的项目"""
+        return self._query_items(
+            "SELECT data FROM items WHERE ext = ? ORDER BY name", (ext.lower(),)
+        )
+
+    def items_with_tag(self, tag: str) -> List[Dict]:
+        """带有指定标签的项目"""
+        return self._query_items(
+            "SELECT i.data FROM items i JOIN item_tags t ON t.item_id = i.id "
+            "WHERE t.tag = ? ORDER BY i.name",
+            (tag,),
+        )
+
+    def items_with_url_matching(self, pattern: str) -> List[Dict]:
+        """URL 匹配正则的项目，如 r"danbooru\\.donmai\\.us/posts/\\d+" """
+        return self._query_items(
+            "SELECT data FROM items WHERE url REGEXP ? ORDER BY name", (pattern,)
+        )
+
+    def urls_matching(self, pattern: str) -> List[str]:
+        """只返回匹配正则的 URL，不解析项目 JSON"""
+        return [
+            row[0]
+            for row in self.conn.execute("SELECT url FROM items WHERE url REGEXP ?", (pattern,))
+        ]
+
+    def get_folder_index(self) -> FolderIndex:
+        """从镜像读取文件夹结构(按写入顺序插入，父文件夹先于子文件夹)"""
+        folders = FolderIndex()
+        for fid, name, parent_id in self.conn.execute(
+            "SELECT id, name, parent_id FROM folders ORDER BY rowid"
+        ):
+            folders.add(fid, name, parent_id)
+        return folders
@@ -0,0 +1,105 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+
+from lib.folder_index import FolderIndex
+
+
+class EagleLibraryReader:
+    """
+    Eagle 资料库只读读取器，直接读取磁盘而不经过 HTTP API
+    - 项目元数据: <library>/images/<id>.info/metadata.json
+    - 文件夹树:   <library>/metadata.json 中的 "folders"
+    - os.scandir 枚举目录，线程池并发 stat 与解析
+    产出的字典与 EagleAPI.get_items() 相同，可作为 LibraryIndex 的数据源
+    """
+
+    def __init__(self, library_path: Union[str, Path], max_workers: int = 16):
+        """
+        :param library_path: 资料库根目录，如 /mnt/d/AI Image.library
+        :param max_workers: 并发解析线程数
+        """
+        self.library_path = Path(library_path)
+        self.images_path = self.library_path / "images"
+        self.max_workers = max_workers
+
+    def exists(self) -> bool:
+        return self.images_path.is_dir()
+
+    def scan_ids(self) -> List[str]:
+        """只枚举目录，返回所有项目ID"""
+        with os.scandir(self.images_path) as entries:
+            return [
+                entry.name[: -len(".info")]
+                for entry in entries
+                if entry.name.endswith(".info") and entry.is_dir()
+            ]
+
+    def _read_metadata(self, item_id: str, changed_since: Optional[float]) -> Tuple[str, Optional[Dict]]:
+        """
+        :return: (状态, 项目)，状态为 "ok"、"unchanged"(未晚于 changed_since)、"deleted"(在回收站中)或 "failed"
+        """
+        path = os.path.join(self.images_path, f"{item_id}.info", "metadata.json")
+        try:
+            if changed_since is not None and os.stat(path).st_mtime <= changed_since:
+                return "unchanged", None
+            with open(path, "rb") as f:
+                item = json.loads(f.read())
+        except (OSError, ValueError) as e:
+            print(f"[Reader] Failed to read {path}: {e}")
+            return "failed", None
+        if item.get("isDeleted"):
+            return "deleted", None
+        return "ok", item
+
+    def iter_items(
+        self,
+        changed_since: Optional[float] = None,
+        present_ids: Optional[Set[str]] = None,
+        chunk_size: int = 1024,
+        failed_ids: Optional[Set[str]] = None,
+        retry_ids: Optional[Set[str]] = None,
+    ) -> Iterator[Dict]:
+        """
+        并发解析并逐条产出项目(回收站中的项目不产出)
+        :param changed_since: 只产出 metadata.json 修改时间(秒)晚于该值的项目，None 表示全部
+        :param present_ids: 传入集合时填入扫描到的全部现存项目ID(用于增量同步时识别删除)；
+                            遍历过程中会移除读到的回收站项目，遍历结束后才完整
+        :param chunk_size: 每批提交给线程池的项目数，限制内存占用
+        :param failed_ids: 传入集合时填入元数据读取失败的项目ID，供下次重试
+        :param retry_ids: 无论修改时间都重新读取的项目ID(上次读取失败的项目)
+        """
+        item_ids = self.scan_ids()
+        if present_ids is not None:
+            present_ids.update(item_ids)
+        retry_ids = retry_ids or set()
+
+        def read(item_id: str) -> Tuple[str, Optional[Dict]]:
+            return self._read_metadata(item_id, None if item_id in retry_ids else changed_since)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for start in range(0, len(item_ids), chunk_size):
+                chunk = item_ids[start : start + chunk_size]
+                for item_id, (status, item) in zip(chunk, executor.map(read, chunk)):
+                    if status == "ok":
+                        yield item
+                    elif status == "deleted" and present_ids is not None:
+                        present_ids.discard(item_id)
+                    elif status == "failed" and failed_ids is not None:
+                        failed_ids.add(item_id)
+
+    def get_items(self) -> List[Dict]:
+        """读取全部项目"""
+        return list(self.iter_items())
+
+    def get_folder_list_recursive(self) -> FolderIndex:
+        """读取资料库根目录 metadata.json 中的文件夹树"""
+        try:
+            with open(self.library_path / "metadata.json", "rb") as f:
+                metadata = json.loads(f.read())
+        except (OSError, ValueError) as e:
+            print(f"[Reader] Failed to read library metadata: {e}")
+            return FolderIndex()
+        return FolderIndex.from_tree(metadata.get("folders", []))
@@ -0,0 +1,139 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS md5_posts (
+    md5 TEXT PRIMARY KEY,
+    post_id INTEGER,
+    checked REAL NOT NULL
+);
+"""
+
+
+class Md5LookupCache:
+    """
+    md5 -> Danbooru 帖子 id 的查询结果缓存(SQLite)
+    - 找到的帖子永久保留(md5 与帖子一一对应，不会变化)
+    - 未找到的结果(post_id 为 NULL)在 negative_ttl 秒内有效，过期后重新查询(帖子可能稍后才上传)
+    """
+
+    def __init__(self, db_path: Union[str, Path], negative_ttl: float = 7 * 86400):
+        """
+        :param db_path: SQLite 文件路径
+        :param negative_ttl: 未找到结果的有效期(秒)
+        """
+        self.db_path = Path(db_path)
+        self.negative_ttl = negative_ttl
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def get_many(self, md5s: Iterable[str]) -> Tuple[Dict[str, int], Set[str]]:
+        """
+        :return: (已找到的 {md5: 帖子 id}, 仍在有效期内的未找到 md5)
+        """
+        found, missing = {}, set()
+        expires = time.time() - self.negative_ttl
+        with self._lock:
+            for md5 in md5s:
+                row = self.conn.execute(
+                    "SELECT post_id, checked FROM md5_posts WHERE md5 = ?", (md5,)
+                ).fetchone()
+                if row is None:
+                    continue
+                if row[0] is not None:
+                    found[md5] = row[0]
+                elif row[1] >= expires:
+                    missing.add(md5)
+        return found, missing
+
+    def store(self, found: Dict[str, int], missing: Iterable[str] = ()) -> None:
+        now = time.time()
+        rows = [(md5, post_id, now) for md5, post_id in found.items()]
+        rows += [(md5, None, now) for md5 in missing]
+        if not rows:
+            return
+        with self._lock, self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO md5_posts VALUES (?, ?, ?)", rows)
+
+
+class Md5Resolver:
+    """
+    批量按 md5 查找 Danbooru 帖子
+    - 一次搜索请求查询多个 md5(md5:a,b,c)，每批不超过单页上限，一页即可返回全部结果
+    - 各批并发提交，速率与 429 重试由客户端上的共享访问层控制
+    - 结果写入 Md5LookupCache，未找到的结果带有效期
+    用法:
+        resolver = Md5Resolver(client, Md5LookupCache("danbooru_md5_lookups.db"))
+        post_ids = resolver.resolve(md5s)  # {md5: 帖子 id}，未找到的不出现
+    """
+
+    def __init__(
+        self,
+        client,
+        cache: Optional[Md5LookupCache] = None,
+        batch_size: int = 100,
+        workers: int = 4,
+    ):
+        """
+        :param client: pybooru.Danbooru(通常来自 get_client，已挂载共享访问层)
+        :param cache: 查询结果缓存，None 表示不缓存
+        :param batch_size: 每个搜索请求的 md5 数(Danbooru 每页最多 200 条)
+        :param workers: 同时在途的批次数
+        """
+        self.client = client
+        self.cache = cache
+        self.batch_size = min(batch_size, 200)
+        self.workers = workers
+        self._lock = threading.Lock()
+        self.stats = {"md5s": 0, "cache_hits": 0, "requests": 0, "found": 0, "not_found": 0, "failed": 0}
+
+    def _lookup_batch(self, md5s: List[str]) -> Optional[Dict[str, int]]:
+        try:
+            posts = self.client.post_list(
+                tags="md5:" + ",".join(md5s), limit=len(md5s), only="id,md5"
+            )
+        except Exception as e:
+            print(f"[Md5Lookup] Batch of {len(md5s)} md5s failed: {e}")
+            with self._lock:
+                self.stats["requests"] += 1
+                self.stats["failed"] += len(md5s)
+            return None
+        wanted = set(md5s)
+        found = {post["md5"]: post["id"] for post in posts if post.get("md5") in wanted}
+        if self.cache:
+            self.cache.store(found, wanted - set(found))
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["found"] += len(found)
+            self.stats["not_found"] += len(wanted) - len(found)
+        return found
+
+    def resolve(self, md5s: Iterable[str]) -> Dict[str, int]:
+        """
+        :return: {md5: 帖子 id}；未找到或查询失败的 md5 不出现(失败的不写缓存，下次重试)
+        """
+        md5s = sorted({md5.lower() for md5 in md5s})
+        self.stats["md5s"] += len(md5s)
+        result, missing = self.cache.get_many(md5s) if self.cache else ({}, set())
+        self.stats["cache_hits"] += len(result) + len(missing)
+        pending = [md5 for md5 in md5s if md5 not in result and md5 not in missing]
+        batches = [pending[i : i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+        if batches:
+            print(f"[Md5Lookup] {len(pending)} md5s to look up in {len(batches)} requests")
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="md5-lookup") as pool:
+            for found in pool.map(self._lookup_batch, batches):
+                if found:
+                    result.update(found)
+        return result
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
@@ -0,0 +1,149 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class PageFetchError(RuntimeError):
+    """分页请求失败，结果不完整"""
+
+    pass
+
+
+def iter_paged(
+    fetch_page: Callable[[int], Optional[List[Dict]]],
+    page_size: int,
+    prefetch: bool = True,
+) -> Iterator[Dict]:
+    """
+    逐页拉取并逐条产出结果
+    - 调用方处理当前页时，下一页已在后台线程中请求
+    - 某页为空或不足 page_size 条时结束
+    - 某页请求失败(返回 None)时抛出 PageFetchError，不会静默截断
+    :param fetch_page: 按页序号(从 0 开始)返回该页数据的函数
+    :param page_size: 每页条数
+    :param prefetch: 是否后台预取下一页
+    """
+    executor = None
+    if prefetch:
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="page-prefetch")
+
+    def submit(offset: int):
+        if executor is None:
+            return offset
+        return executor.submit(fetch_page, offset)
+
+    def result(pending, offset: int) -> List[Dict]:
+        page = fetch_page(pending) if executor is None else pending.result()
+        if page is None:
+            raise PageFetchError(f"Fetching page {offset} failed.")
+        return page
+
+    try:
+        offset = 0
+        pending = submit(offset)
+        while True:
+            page = result(pending, offset)
+            has_more = len(page) >= page_size
+            if has_more:
+                pending = submit(offset + 1)
+            yield from page
+            if not has_more:
+                return
+            offset += 1
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_pages_concurrent(
+    fetch_page: Callable[[int], Optional[List[Dict]]],
+    start_page: int = 1,
+    max_pages: Optional[int] = None,
+    concurrency: int = 4,
+) -> Iterator[Tuple[int, List[Dict]]]:
+    """
+    多个页面请求同时在途，按页序逐页产出 (页码, 该页数据)
+    - 最多 concurrency 个请求同时在途
+    - 遇到空页后不再提交新请求，之后在途的页面全部丢弃
+    - 最多请求 max_pages 页；调用方提前退出时取消尚未开始的请求
+    - 某页请求失败(返回 None)时抛出 PageFetchError
+    :param fetch_page: 按页码返回该页数据的函数
+    :param start_page: 起始页码
+    :param max_pages: 最多请求的页数，None 表示直到空页
+    :param concurrency: 同时在途的请求数
+    """
+    end_page = None if max_pages is None else start_page + max_pages
+    executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="page-fetch")
+    pending = deque()
+    next_page = start_page
+
+    def submit() -> None:
+        nonlocal next_page
+        if end_page is not None and next_page >= end_page:
+            return
+        pending.append((next_page, executor.submit(fetch_page, next_page)))
+        next_page += 1
+
+    try:
+        for _ in range(concurrency):
+            submit()
+        while pending:
+            page_no, future = pending.popleft()
+            page = future.result()
+            if page is None:
+                raise PageFetchError(f"Fetching page {page_no} failed.")
+            if not page:
+                return
+            submit()
+            yield page_no, page
+    finally:
+        for _, future in pending:
+            future.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_pages_keyset(
+    fetch_page: Callable[[Optional[str]], Optional[List[Dict]]],
+    direction: str = "b",
+    cursor: Optional[str] = None,
+    page_size: Optional[int] = None,
+    key: str = "id",
+) -> Iterator[Tuple[Optional[str], List[Dict]]]:
+    """
+    游标(keyset)分页，逐页产出 (本页使用的游标, 该页数据)
+    以上一页的边界 id 作为下一页游标，每页代价与翻页深度无关，新增数据也不会造成跳页或重复
+    - direction="b": 向更旧的方向翻页，下一页游标为 b<本页最小 id>
+    - direction="a": 向更新的方向翻页，下一页游标为 a<本页最大 id>
+    - 收到一页后立即在后台请求下一页
+    - 某页为空或不足 page_size 条时结束；请求失败(返回 None)时抛出 PageFetchError
+    :param fetch_page: 按游标返回该页数据的函数，游标为 None 表示第一页
+    :param direction: "b" 或 "a"
+    :param cursor: 起始游标，如 "b12345"；None 表示从最新(b)或最旧(a0)开始
+    :param page_size: 每页条数，用于提前识别最后一页
+    :param key: 游标使用的字段
+    """
+    if direction not in ("a", "b"):
+        raise ValueError(f"Unknown keyset direction: {direction!r}")
+    if cursor is None and direction == "a":
+        cursor = "a0"
+    boundary = min if direction == "b" else max
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="keyset-prefetch")
+
+    try:
+        pending = executor.submit(fetch_page, cursor)
+        while True:
+            page = pending.result()
+            if page is None:
+                raise PageFetchError(f"Fetching page {cursor} failed.")
+            if not page:
+                return
+            has_more = page_size is None or len(page) >= page_size
+            if has_more:
+                next_cursor = f"{direction}{boundary(item[key] for item in page)}"
+                pending = executor.submit(fetch_page, next_cursor)
+            yield cursor, page
+            if not has_more:
+                return
+            cursor = next_cursor
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
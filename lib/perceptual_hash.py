@@ -0,0 +1,77 @@
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+import numpy as np
+from PIL import Image
+
+# 64 位感知哈希: hash_size=8
+HASH_SIZE = 8
+METHODS = ("dhash", "phash")
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def dhash(image: Image.Image, hash_size: int = HASH_SIZE) -> int:
+    """
+    差值哈希: 缩成 (hash_size+1) x hash_size 灰度图，比较每行相邻像素的明暗
+    对缩放、重新编码、轻微调色稳定，计算最快
+    """
+    pixels = np.asarray(
+        image.convert("L").resize((hash_size + 1, hash_size), Image.Resampling.LANCZOS),
+        dtype=np.int16,
+    )
+    return _bits_to_int(pixels[:, 1:] > pixels[:, :-1])
+
+
+_dct_matrices = {}
+
+
+def _dct_matrix(n: int) -> np.ndarray:
+    """n 点 DCT-II 变换矩阵(未归一化，只用于比较中位数)"""
+    matrix = _dct_matrices.get(n)
+    if matrix is None:
+        k = np.arange(n)[:, None]
+        matrix = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n))
+        _dct_matrices[n] = matrix
+    return matrix
+
+
+def phash(image: Image.Image, hash_size: int = HASH_SIZE, highfreq_factor: int = 4) -> int:
+    """
+    DCT 感知哈希: 缩成 32x32 灰度图做二维 DCT，取左上角低频系数与其中位数比较
+    对缩放、压缩稳定，对裁剪比 dHash 敏感(2% 的裁剪即可改变 10 位左右)，计算稍慢
+    """
+    size = hash_size * highfreq_factor
+    pixels = np.asarray(
+        image.convert("L").resize((size, size), Image.Resampling.LANCZOS), dtype=np.float64
+    )
+    matrix = _dct_matrix(size)
+    low = (matrix @ pixels @ matrix.T)[:hash_size, :hash_size]
+    return _bits_to_int(low > np.median(low))
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def hash_image_file(path: Union[str, Path], method: str = "dhash") -> Optional[int]:
+    """
+    读取图片并计算感知哈希；JPEG 通过 draft 在解码时直接缩小，不解出全尺寸像素
+    :return: 64 位哈希，无法解码时返回 None
+    """
+    func = {"dhash": dhash, "phash": phash}[method]
+    try:
+        with Image.open(path) as image:
+            image.draft("L", (HASH_SIZE * 8, HASH_SIZE * 8))
+            return func(image)
+    except Exception as e:  # PIL 对损坏文件可能抛出各种异常
+        print(f"[PHash] Cannot hash {path}: {e}")
+        return None
+
+
+def hash_entry(entry: Tuple[str, str, str]) -> Tuple[str, Optional[int]]:
+    """进程池任务: (键, 路径, 算法) -> (键, 哈希)"""
+    key, path, method = entry
+    return key, hash_image_file(path, method)
@@ -0,0 +1,366 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from lib.perceptual_hash import METHODS, hash_entry
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS phashes (
+    key TEXT PRIMARY KEY,
+    path TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    method TEXT NOT NULL,
+    hash INTEGER
+);
+CREATE TABLE IF NOT EXISTS skipped (
+    key TEXT PRIMARY KEY,
+    duplicate_of TEXT NOT NULL,
+    distance INTEGER NOT NULL,
+    added REAL NOT NULL
+);
+"""
+
+# 以本次运行导入、尚无项目 ID 的帖子(post:<id>)为原图的跳过记录保留的秒数
+POST_SKIP_TTL = 7 * 24 * 3600
+
+
+def _to_signed(value: int) -> int:
+    """64 位无符号哈希 -> SQLite INTEGER(有符号)"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class MultiIndexHash:
+    """
+    汉明空间近邻索引(multi-index hashing)
+    把 64 位哈希切成 max_distance+1 段，每段一张 段值 -> 键 的表；
+    由抽屉原理，距离不超过 max_distance 的两个哈希至少有一段完全相同，
+    查询只需比较与它某段相同的候选，而不是全部条目。
+    max_distance 越大每段越短、候选越多: 20 万张图时 4 以内每次查询只比较几百个候选
+    """
+
+    def __init__(self, max_distance: int = 4, bits: int = 64):
+        """
+        :param max_distance: 支持查询的最大汉明距离
+        :param bits: 哈希位数
+        """
+        self.max_distance = max_distance
+        n_blocks = max_distance + 1
+        width, extra = divmod(bits, n_blocks)
+        self._blocks = []
+        shift = 0
+        for i in range(n_blocks):
+            block_width = width + (1 if i < extra else 0)
+            self._blocks.append((shift, (1 << block_width) - 1))
+            shift += block_width
+        self._tables = [defaultdict(list) for _ in self._blocks]
+        self.hashes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.hashes
+
+    def add(self, key: str, value: int) -> None:
+        if key in self.hashes:
+            self.remove(key)
+        self.hashes[key] = value
+        for table, (shift, mask) in zip(self._tables, self._blocks):
+            table[(value >> shift) & mask].append(key)
+
+    def remove(self, key: str) -> None:
+        value = self.hashes.pop(key, None)
+        if value is None:
+            return
+        for table, (shift, mask) in zip(self._tables, self._blocks):
+            bucket = table[(value >> shift) & mask]
+            bucket.remove(key)
+            if not bucket:
+                del table[(value >> shift) & mask]
+
+    def query(self, value: int, max_distance: Optional[int] = None) -> List[Tuple[int, str]]:
+        """
+        距离不超过 max_distance 的全部条目
+        :return: [(距离, 键)]，按距离升序
+        """
+        k = self.max_distance if max_distance is None else max_distance
+        if k > self.max_distance:
+            raise ValueError(f"max_distance {k} exceeds index limit {self.max_distance}")
+        candidates = set()
+        for table, (shift, mask) in zip(self._tables, self._blocks):
+            bucket = table.get((value >> shift) & mask)
+            if bucket:
+                candidates.update(bucket)
+        hashes = self.hashes
+        found = []
+        for key in candidates:
+            distance = (value ^ hashes[key]).bit_count()
+            if distance <= k:
+                found.append((distance, key))
+        found.sort()
+        return found
+
+    def pairs(
+        self, max_distance: Optional[int] = None, chunk: int = 1024
+    ) -> Iterator[Tuple[str, str, int]]:
+        """
+        所有距离不超过 max_distance 的条目对 (键a, 键b, 距离)，每对只产出一次
+        近邻必然同处某张表的某个桶，逐桶用 numpy 两两异或计数，不必逐条查询
+        :param chunk: 大桶(如大量纯色图)按行分块比较，限制临时矩阵大小
+        """
+        k = self.max_distance if max_distance is None else max_distance
+        if k > self.max_distance:
+            raise ValueError(f"max_distance {k} exceeds index limit {self.max_distance}")
+        seen = set()
+        for table in self._tables:
+            for bucket in table.values():
+                if len(bucket) < 2:
+                    continue
+                values = np.fromiter((self.hashes[key] for key in bucket), dtype=np.uint64, count=len(bucket))
+                for start in range(0, len(bucket), chunk):
+                    rows = values[start : start + chunk]
+                    distances = np.bitwise_count(rows[:, None] ^ values[None, :])
+                    for i, j in zip(*np.nonzero(distances <= k)):
+                        a, b = bucket[start + i], bucket[j]
+                        if start + i >= j:
+                            continue
+                        pair = (a, b) if a < b else (b, a)
+                        if pair not in seen:
+                            seen.add(pair)
+                            yield pair[0], pair[1], int(distances[i, j])
+
+
+class PerceptualIndex:
+    """
+    资料库图片的感知哈希索引
+    - 哈希持久化在 SQLite 中，按 (大小, mtime_ns) 判断文件是否变化，未变化的不再解码
+    - 需要计算的图片在进程池中解码(JPEG 解码时直接缩小)，绕开 GIL
+    - 载入后在内存中建 MultiIndexHash，近邻查询与聚类都是亚二次的
+    - 因近似重复而跳过的导入记在 skipped 表中，下次运行不必重新下载、计算；
+      对应的原图从资料库删除(prune)后该记录随之清除；原图是当时刚导入的帖子(post:<id>)时无法对应到项目，
+      记录超过 post_ttl 后由 prune 清除，被跳过的帖子下次重新与索引比较
+    用法:
+        index = PerceptualIndex("perceptual_index.db", max_distance=4)
+        index.update((item["id"], path) for ...)
+        for cluster in index.clusters():
+            ...
+        index.near(hash_image_file(new_file))
+    """
+
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        method: str = "dhash",
+        max_distance: int = 4,
+    ):
+        """
+        :param db_path: SQLite 文件路径
+        :param method: "dhash" 或 "phash"；与库中记录的算法不同的条目视为过期
+        :param max_distance: 近邻查询的最大汉明距离(64 位中)
+        """
+        if method not in METHODS:
+            raise ValueError(f"Unsupported method: {method}")
+        self.db_path = Path(db_path)
+        self.method = method
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self.index = MultiIndexHash(max_distance)
+        for key, value in self.conn.execute(
+            "SELECT key, hash FROM phashes WHERE method = ? AND hash IS NOT NULL", (method,)
+        ):
+            self.index.add(key, _to_unsigned(value))
+        self.skipped: Set[str] = {key for (key,) in self.conn.execute("SELECT key FROM skipped")}
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index
+
+    def get_hash(self, key: str) -> Optional[int]:
+        return self.index.hashes.get(key)
+
+    def update(
+        self,
+        entries: Iterable[Tuple[str, str]],
+        workers: Optional[int] = None,
+        chunksize: int = 16,
+        batch_size: int = 500,
+    ) -> Dict[str, int]:
+        """
+        为新增或变化的图片计算哈希并写入索引
+        :param entries: (键, 图片路径)，键通常是 Eagle 项目 ID
+        :param workers: 进程数，默认 CPU 数
+        :param chunksize: 每次派给子进程的图片数
+        :param batch_size: 每计算多少张写一次库
+        :return: {"total", "cached", "hashed", "failed", "missing"}
+        """
+        with self._lock:
+            stored = {
+                key: (size, mtime_ns, method)
+                for key, size, mtime_ns, method in self.conn.execute(
+                    "SELECT key, size, mtime_ns, method FROM phashes"
+                )
+            }
+        report = {"total": 0, "cached": 0, "hashed": 0, "failed": 0, "missing": 0}
+        stats = {}
+        todo = []
+        for key, path in entries:
+            report["total"] += 1
+            try:
+                stat = os.stat(path)
+            except OSError:
+                report["missing"] += 1
+                continue
+            if stored.get(key) == (stat.st_size, stat.st_mtime_ns, self.method):
+                report["cached"] += 1
+                continue
+            stats[key] = (path, stat)
+            todo.append((key, path, self.method))
+
+        if todo:
+            print(f"[PHash] 计算 {len(todo)} 张图片的 {self.method} ...")
+            rows = []
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for key, value in pool.map(hash_entry, todo, chunksize=chunksize):
+                    path, stat = stats[key]
+                    report["hashed" if value is not None else "failed"] += 1
+                    rows.append((key, path, stat.st_size, stat.st_mtime_ns, self.method, value))
+                    if len(rows) >= batch_size:
+                        self._store(rows)
+                        rows = []
+            self._store(rows)
+        print(f"[PHash] 索引更新: {report}，共 {len(self.index)} 张")
+        return report
+
+    def _store(self, rows: List[Tuple]) -> None:
+        if not rows:
+            return
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO phashes VALUES (?, ?, ?, ?, ?, ?)",
+                [row[:5] + (None if row[5] is None else _to_signed(row[5]),) for row in rows],
+            )
+            for key, *_, value in rows:
+                if value is None:
+                    self.index.remove(key)
+                else:
+                    self.index.add(key, value)
+
+    def prune(self, keys: Set[str], post_ttl: float = POST_SKIP_TTL) -> int:
+        """
+        删除不在 keys 中的条目(资料库中已删除的项目)及以它们为原图的跳过记录，
+        以及以 post:<id> 为原图、超过 post_ttl 秒的跳过记录
+        :return: 删除的条目数
+        """
+        expired_before = time.time() - post_ttl
+        with self._lock, self.conn:
+            stale = [
+                (key,) for (key,) in self.conn.execute("SELECT key FROM phashes") if key not in keys
+            ]
+            self.conn.executemany("DELETE FROM phashes WHERE key = ?", stale)
+            for (key,) in stale:
+                self.index.remove(key)
+            stale_keys = {key for (key,) in stale}
+            released = [
+                (key,)
+                for key, duplicate_of, added in self.conn.execute("SELECT key, duplicate_of, added FROM skipped")
+                if duplicate_of in stale_keys or (duplicate_of.startswith("post:") and added < expired_before)
+            ]
+            self.conn.executemany("DELETE FROM skipped WHERE key = ?", released)
+            for (key,) in released:
+                self.skipped.discard(key)
+        return len(stale)
+
+    def add(self, key: str, value: int) -> None:
+        """只加入内存索引(如本次运行刚导入、尚无项目 ID 的图片)，不写库"""
+        with self._lock:
+            self.index.add(key, value)
+
+    def near(self, value: int, max_distance: Optional[int] = None) -> List[Tuple[int, str]]:
+        """距离不超过 max_distance 的条目 [(距离, 键)]"""
+        with self._lock:
+            return self.index.query(value, max_distance)
+
+    def check_and_add(self, key: str, value: int, max_distance: Optional[int] = None) -> List[Tuple[int, str]]:
+        """
+        查询近邻，没有近邻时把该图片加入内存索引(预留)；两步在同一把锁内完成，
+        并发导入两张互为近似的新图片时只有一张通过
+        预留的图片最终没有导入时应调用 release()，否则后续相似图片会被误判为重复
+        :return: 已有的近邻 [(距离, 键)]，为空表示已加入
+        """
+        with self._lock:
+            found = self.index.query(value, max_distance)
+            if not found:
+                self.index.add(key, value)
+        return found
+
+    def release(self, key: str) -> None:
+        """撤销 check_and_add() 的预留，并清除以它为原图的跳过记录(这些图片下次重新判断)"""
+        with self._lock, self.conn:
+            self.index.remove(key)
+            released = [
+                row[0]
+                for row in self.conn.execute("SELECT key FROM skipped WHERE duplicate_of = ?", (key,))
+            ]
+            self.conn.execute("DELETE FROM skipped WHERE duplicate_of = ?", (key,))
+            self.skipped.difference_update(released)
+
+    def skip(self, key: str, duplicate_of: str, distance: int) -> None:
+        """记录因近似重复而跳过的图片"""
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO skipped VALUES (?, ?, ?, ?)",
+                (key, duplicate_of, distance, time.time()),
+            )
+            self.skipped.add(key)
+
+    def is_skipped(self, key: str) -> bool:
+        return key in self.skipped
+
+    def clusters(self, max_distance: Optional[int] = None) -> List[List[str]]:
+        """
+        近似重复的图片簇(单链接: 距离不超过 max_distance 的两张图属于同一簇)
+        :return: 每簇的键列表(至少两个)，按簇大小降序
+        """
+        parent: Dict[str, str] = {}
+
+        def find(key: str) -> str:
+            root = key
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while key != root:
+                parent[key], key = root, parent.get(key, key)
+            return root
+
+        with self._lock:
+            for a, b, _ in self.index.pairs(max_distance):
+                root_a, root_b = find(a), find(b)
+                if root_a != root_b:
+                    parent[root_b] = root_a
+        groups = defaultdict(list)
+        for key in parent:
+            groups[find(key)].append(key)
+        for root in list(groups):
+            if root not in groups[root]:
+                groups[root].append(root)
+        return sorted((sorted(g) for g in groups.values() if len(g) > 1), key=len, reverse=True)
@@ -0,0 +1,188 @@
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional
+
+_DONE = object()
+
+
+class _Stage:
+    def __init__(self, name: str, func: Callable, workers: int, queue_size: int):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.inbox: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.running = workers
+        self.items = 0
+        self.outputs = 0
+        self.errors = 0
+        self.busy = 0.0
+        self.blocked = 0.0
+        self.depth_samples = 0
+        self.depth_total = 0
+        self.depth_max = 0
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def put(self, item) -> None:
+        """放入输入队列(队列满时阻塞)，同时采样队列深度"""
+        self.inbox.put(item)
+        depth = self.inbox.qsize()
+        with self.lock:
+            self.depth_samples += 1
+            self.depth_total += depth
+            self.depth_max = max(self.depth_max, depth)
+
+    def stats(self) -> Dict:
+        wall = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+        return {
+            "items": self.items,
+            "outputs": self.outputs,
+            "errors": self.errors,
+            "workers": self.workers,
+            "busy_s": round(self.busy, 3),
+            "blocked_s": round(self.blocked, 3),
+            "items_per_s": round(self.items / wall, 1) if wall > 0 else None,
+            "queue_max": self.depth_max,
+            "queue_avg": round(self.depth_total / self.depth_samples, 1) if self.depth_samples else 0,
+        }
+
+
+class Pipeline:
+    """
+    线程 + 有界队列的流水线
+    - 每个阶段有自己的输入队列与若干工作线程，队列满时上游阻塞，内存占用由队列长度决定
+    - 阶段函数接收一个输入，返回可迭代的输出(可以为空，也可以展开为多个)，依次交给下一阶段
+    - 单个输入处理出错时记录并继续，不中断整条流水线
+    - run() 结束后返回每个阶段的吞吐与队列深度统计；
+      busy_s 为处理耗时，blocked_s 为等待下游队列腾出空间的时间(下游是瓶颈)
+    用法:
+        pipeline = Pipeline(queue_size=8)
+        pipeline.add_stage("filter", lambda page: [p for p in page if keep(p)])
+        pipeline.add_stage("upload", upload_one, workers=4)
+        report = pipeline.run(pages)
+    """
+
+    def __init__(self, queue_size: int = 8):
+        """
+        :param queue_size: 各阶段输入队列的默认长度
+        """
+        self.queue_size = queue_size
+        self.stages: List[_Stage] = []
+        self.source_stats: Dict = {}
+
+    def add_stage(
+        self,
+        name: str,
+        func: Callable[[object], Optional[Iterable]],
+        workers: int = 1,
+        queue_size: Optional[int] = None,
+    ) -> "Pipeline":
+        """
+        添加阶段
+        :param func: 处理函数，返回下一阶段的输入序列；最后一个阶段的返回值被忽略
+        :param workers: 工作线程数
+        :param queue_size: 输入队列长度，默认使用 Pipeline 的 queue_size
+        """
+        self.stages.append(_Stage(name, func, workers, queue_size or self.queue_size))
+        return self
+
+    def _run_worker(self, index: int) -> None:
+        stage = self.stages[index]
+        downstream = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            item = stage.inbox.get()
+            if item is _DONE:
+                break
+            start = time.perf_counter()
+            produced = 0
+            blocked = 0.0
+            try:
+                for output in stage.func(item) or ():
+                    produced += 1
+                    if downstream is not None:
+                        put_start = time.perf_counter()
+                        downstream.put(output)
+                        blocked += time.perf_counter() - put_start
+            except Exception as e:
+                print(f"[Pipeline] Stage '{stage.name}' failed: {e}")
+                with stage.lock:
+                    stage.errors += 1
+            with stage.lock:
+                stage.items += 1
+                stage.outputs += produced
+                stage.busy += time.perf_counter() - start - blocked
+                stage.blocked += blocked
+
+        with stage.lock:
+            stage.running -= 1
+            last = stage.running == 0
+        if last:
+            stage.finished = time.perf_counter()
+            if downstream is not None:
+                for _ in range(downstream.workers):
+                    downstream.inbox.put(_DONE)
+
+    def run(self, source: Iterable) -> Dict[str, Dict]:
+        """
+        运行流水线直到 source 耗尽且所有阶段处理完毕
+        :param source: 第一阶段的输入，逐个读取(可以是生成器)
+        :return: {"source": {...}, 阶段名: {...}}
+        """
+        if not self.stages:
+            raise ValueError("Pipeline has no stages.")
+
+        threads = []
+        started = time.perf_counter()
+        for index, stage in enumerate(self.stages):
+            stage.started = started
+            for n in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._run_worker,
+                    args=(index,),
+                    name=f"pipeline-{stage.name}-{n}",
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+
+        first = self.stages[0]
+        produced = 0
+        try:
+            for item in source:
+                first.put(item)
+                produced += 1
+        finally:
+            self.source_stats = {
+                "items": produced,
+                "wall_s": round(time.perf_counter() - started, 3),
+            }
+            for _ in range(first.workers):
+                first.inbox.put(_DONE)
+            for thread in threads:
+                thread.join()
+        return self.report()
+
+    def report(self) -> Dict[str, Dict]:
+        return {"source": self.source_stats, **{s.name: s.stats() for s in self.stages}}
+
+    @staticmethod
+    def format_report(report: Dict[str, Dict]) -> str:
+        """把 report() 的结果格式化为表格"""
+        lines = [
+            f"{'stage':<10} {'items':>7} {'out':>7} {'err':>4} {'items/s':>9} "
+            f"{'busy(s)':>8} {'blocked(s)':>10} {'q max':>6} {'q avg':>6}"
+        ]
+        for name, stats in report.items():
+            if name == "source":
+                lines.append(
+                    f"{'source':<10} {stats.get('items', 0):>7}   (exhausted after {stats.get('wall_s', 0)}s)"
+                )
+                continue
+            lines.append(
+                f"{name:<10} {stats['items']:>7} {stats['outputs']:>7} {stats['errors']:>4} "
+                f"{stats['items_per_s'] or 0:>9} {stats['busy_s']:>8} {stats['blocked_s']:>10} "
+                f"{stats['queue_max']:>6} {stats['queue_avg']:>6}"
+            )
+        return "\n".join(lines)
@@ -0,0 +1,116 @@
+import itertools
+import math
+from typing import Dict, List
+
+from lib.tag_filter import is_local_only
+
+
+# Danbooru 元标签名(第一个冒号之前的部分)；其他含冒号的是普通标签，如 :d、re:zero_kara_hajimeru_isekai_seikatsu
+METATAGS = frozenset(
+    {
+        "order", "rating", "id", "score", "date", "age", "user", "fav", "ordfav", "favgroup",
+        "ordfavgroup", "pool", "ordpool", "status", "md5", "width", "height", "mpixels", "ratio",
+        "filesize", "filetype", "favcount", "upvotes", "downvotes", "tagcount", "gentags", "arttags",
+        "chartags", "copytags", "metatags", "source", "parent", "child", "approver", "commenter",
+        "comm", "noter", "noteupdater", "artcomm", "commentaryupdater", "flagger", "appealer",
+        "upvote", "downvote", "disapproved", "note", "comment", "commentary", "search", "embedded",
+        "pixiv_id", "pixiv", "unaligned", "exif", "duration", "is", "has", "limit", "random",
+    }
+)
+
+
+def is_metatag(tag: str) -> bool:
+    """搜索条件是否为元标签(order:/rating: 等，只能由服务端处理)"""
+    name, colon, _ = tag.lstrip("-").partition(":")
+    return bool(colon) and name.lower() in METATAGS
+
+
+def _fraction(term: str, counts: Dict[str, int], total: int) -> float:
+    """单个搜索条件命中的帖子比例(负向条件为 1 - 正向比例)；未知标签按 1 处理"""
+    name = term.lstrip("-")
+    if is_metatag(term) or name not in counts or not total:
+        return 1.0
+    share = min(counts[name] / total, 1.0)
+    return 1.0 - share if term.startswith("-") else share
+
+
+def estimate_results(terms: List[str], counts: Dict[str, int], total: int) -> int:
+    """按标签相互独立估算同时满足 terms 的帖子数"""
+    estimate = float(total)
+    for term in terms:
+        estimate *= _fraction(term, counts, total)
+    return int(round(estimate))
+
+
+def plan_tags(
+    include_tags: List[str],
+    exclude_tags: List[str],
+    counts: Dict[str, int],
+    total: int,
+    max_server_tags: int = 2,
+    page_size: int = 100,
+) -> Dict:
+    """
+    在服务端标签数上限内选择最有选择性的搜索条件，其余条件在本地过滤
+    - 元标签(order:/rating: 等)只能由服务端处理，总是优先占用名额
+    - 普通标签与反选标签(-tag)都可作为服务端条件，按估计结果数最小的组合选择
+    - OR 组(~tag)与通配标签(*_hair)总是留在本地，由 TagFilter 求值
+    - 同时给出朴素方案(前 max_server_tags 个包含标签)的估计，便于对比
+    :param include_tags: 包含标签(可含元标签)
+    :param exclude_tags: 反选标签(不带 "-")
+    :param counts: 标签帖子数
+    :param total: 全站帖子总数
+    :return: {"server_tags", "local_include", "local_exclude",
+              "estimated_results", "estimated_pages", "naive": {...}}
+    """
+    negated = [f"-{tag}" for tag in exclude_tags]
+    forced = [t for t in include_tags if is_metatag(t)] + [t for t in negated if is_metatag(t)]
+    candidates = [t for t in include_tags if not is_metatag(t)] + [
+        t for t in negated if not is_metatag(t)
+    ]
+    local_only = [t for t in candidates if is_local_only(t)]
+    candidates = [t for t in candidates if t not in local_only]
+    if len(forced) > max_server_tags:
+        print(f"[Planner] {len(forced)} metatags exceed the {max_server_tags}-tag limit: {forced}")
+
+    slots = max(max_server_tags - len(forced), 0)
+    best = min(
+        itertools.combinations(candidates, min(slots, len(candidates))),
+        # 估计结果数最少；相同时优先包含标签、保持原顺序
+        key=lambda combo: (
+            estimate_results(list(combo), counts, total),
+            sum(t.startswith("-") for t in combo),
+        ),
+    )
+    server_tags = forced[:max_server_tags] + list(best)
+    local = [t for t in forced[max_server_tags:] + candidates + local_only if t not in server_tags]
+
+    def summary(tags: List[str]) -> Dict:
+        estimated = estimate_results(tags, counts, total)
+        return {
+            "server_tags": tags,
+            "estimated_results": estimated,
+            "estimated_pages": math.ceil(estimated / page_size) if page_size else None,
+        }
+
+    plan = summary(server_tags)
+    plan["local_include"] = [t for t in local if not t.startswith("-")]
+    plan["local_exclude"] = [t[1:] for t in local if t.startswith("-")]
+    plan["estimated_matches"] = estimate_results(include_tags + negated, counts, total)
+    plan["naive"] = summary([t for t in include_tags if not is_local_only(t)][:max_server_tags])
+    return plan
+
+
+def explain(plan: Dict) -> str:
+    """一行说明: 服务端/本地条件与相对朴素方案的预计页数"""
+    naive = plan["naive"]
+    saved = ""
+    if naive["estimated_pages"] and plan["estimated_pages"] is not None:
+        saved = f" (x{naive['estimated_pages'] / max(plan['estimated_pages'], 1):.1f} fewer pages)"
+    return (
+        f"server {plan['server_tags']} + local {plan['local_include']}"
+        f" - {plan['local_exclude']}: ~{plan['estimated_results']:,} posts"
+        f" / {plan['estimated_pages']:,} pages, ~{plan['estimated_matches']:,} matches"
+        f" | naive {naive['server_tags']}: ~{naive['estimated_results']:,} posts"
+        f" / {naive['estimated_pages']:,} pages{saved}"
+    )
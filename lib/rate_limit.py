@@ -0,0 +1,131 @@
+import threading
+import time
+from typing import Optional
+
+
+class TokenBucket:
+    """
+    线程安全的令牌桶
+    - 以 rate 个/秒的速度补充令牌，最多积攒 burst 个；acquire() 取一个令牌，不足时阻塞
+    - 空闲一段时间后允许短时突发(与 Danbooru 按账户限速的方式一致)，长期速率不超过 rate
+    - pause() 让所有调用方暂停到指定时间之后(服务端不可用 / Retry-After)
+    - throttled() 在被限流(429)时暂停并把速率减半，succeeded() 逐步恢复到配置的速率，
+      配置的速率高于账户实际额度时会收敛到不再被限流的速率
+    多个线程(翻页、md5 查询等)共享同一个实例即共享同一份额度
+    """
+
+    def __init__(self, rate: Optional[float], burst: Optional[float] = None):
+        """
+        :param rate: 每秒补充的令牌数(上限)，None 或 0 表示不限速(pause 仍然生效)
+        :param burst: 桶容量，默认等于 rate(至少 1)
+        """
+        self.max_rate = self.rate = rate or 0.0
+        self.burst = max(burst or self.rate, 1.0)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """取一个令牌(可以透支)，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self._paused_until - now, 0.0)
+            if not self.rate:
+                return wait
+            # 暂停期间不补充令牌: _updated 可能在暂停结束的未来时刻
+            self._tokens = min(self.burst, self._tokens + max(now - self._updated, 0.0) * self.rate)
+            self._updated = max(self._updated, now)
+            self._tokens -= 1
+            if self._tokens < 0:
+                wait = max(wait, self._updated - now - self._tokens / self.rate)
+            return wait
+
+    def acquire(self) -> None:
+        """阻塞到取得一个令牌"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """至少 seconds 秒内不再放行，并清空积攒的令牌，恢复后不会立即突发"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = max(self._updated, self._paused_until)
+
+    def throttled(self, seconds: float) -> None:
+        """被限流: 暂停 seconds 秒，速率减半(不低于上限的 1/10)"""
+        with self._lock:
+            if self.max_rate:
+                self.rate = max(self.rate / 2, self.max_rate / 10)
+        self.pause(seconds)
+
+    def succeeded(self) -> None:
+        """请求成功: 速率每次恢复上限的 2%"""
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate * 0.02)
+
+
+class AdaptiveConcurrency:
+    """
+    按观测结果自适应调整的并发上限(AIMD)
+    - 每完成 limit 个正常请求上限加 1，直到 max_limit
+    - 请求被限流(429)时上限减半；延迟超过基线(EWMA 最小值)的 latency_factor 倍时减 1
+    acquire()/release() 包住每个请求即可
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 16,
+        latency_factor: float = 3.0,
+    ):
+        """
+        :param initial: 初始并发上限
+        :param min_limit: 最小并发上限
+        :param max_limit: 最大并发上限
+        :param latency_factor: 延迟超过基线多少倍视为过载
+        """
+        self.limit = max(min_limit, min(initial, max_limit))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_factor = latency_factor
+        self.baseline: Optional[float] = None
+        self.in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    def release(self, latency: Optional[float] = None, throttled: bool = False) -> None:
+        """
+        :param latency: 本次请求耗时(秒)，请求出错时为 None
+        :param throttled: 是否被服务端限流
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(self.min_limit, self.limit // 2)
+                self._successes = 0
+            elif latency is not None:
+                if self.baseline is None or latency < self.baseline:
+                    self.baseline = latency
+                else:
+                    # 基线缓慢上移，适应服务端整体变慢
+                    self.baseline += (latency - self.baseline) * 0.01
+                if latency > self.baseline * self.latency_factor and latency > 0.05:
+                    self.limit = max(self.min_limit, self.limit - 1)
+                    self._successes = 0
+                else:
+                    self._successes += 1
+                    if self._successes >= self.limit:
+                        self.limit = min(self.max_limit, self.limit + 1)
+                        self._successes = 0
+            self._cond.notify_all()
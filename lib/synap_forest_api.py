@@ -1,19 +1,48 @@
 import requests
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, Iterator, List, Optional, Any
+
+from lib.folder_index import FolderIndex
+from lib.http_pool import PooledSession
+from lib.paging import PageFetchError, iter_paged
 
 
 class SynapForestAPI:
     root_folder_id = "00000000-0000-0000-0000-000000000000"
 
-    def __init__(self):
+    def __init__(
+        self,
+        pool_size: int = 10,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        base_url: str = "http://127.0.0.1:42595",
+    ):
         """
         初始化 SynapForest API 客户端
+        :param pool_size: 连接池大小
+        :param max_retries: 连接错误或 5xx 时的最大重试次数
+        :param backoff_factor: 重试退避基数(秒)
+        :param base_url: 服务地址(可指向本地替身服务)
         """
-        self.base_url = "http://127.0.0.1:42595"
+        self.base_url = base_url
         self.headers = {
             "Content-Type": "application/json",
             "Authorization": "TEST123123",
         }
+        self.session = PooledSession(
+            self.base_url,
+            headers=self.headers,
+            pool_size=pool_size,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+        )
+
+    def get_connection_stats(self) -> Dict[str, Dict[str, int]]:
+        """获取连接统计(新建/复用连接数、重试次数等)"""
+        return {self.base_url: self.session.get_stats()}
+
+    def close(self) -> None:
+        """关闭连接池"""
+        self.session.close()
 
     def _make_request(
         self,
@@ -26,19 +55,17 @@ class SynapForestAPI:
         内部请求方法
         :param method: HTTP 方法 ('get' 或 'post')
         :param endpoint: API 端点
-        :param is_item_api: 是否使用项目API端口(41695)
         :param data: 请求数据
         :param params: 查询参数
         :return: 响应数据字典或 None
         """
-        base_url = self.base_url
-        url = f"{base_url}{endpoint}"
+        url = f"{self.base_url}{endpoint}"
 
         try:
             if method.lower() == "get":
-                response = requests.get(url, params=params, headers=self.headers, proxies={'http': None, 'https': None})
+                response = self.session.request("get", endpoint, params=params)
             else:
-                response = requests.post(url, json=data, headers=self.headers, proxies={'http': None, 'https': None})
+                response = self.session.request("post", endpoint, json=data)
 
             if response.status_code == 200:
                 return response.json()
@@ -91,6 +118,34 @@ class SynapForestAPI:
             return True
         return False
 
+    def add_from_urls(
+        self,
+        items: List[Dict],
+        folderIds: Optional[List[str]] = None,
+        headers: Optional[Dict] = None,
+    ) -> bool:
+        """
+        一次请求从多个 URL 添加项目
+        :param items: 每项包含 url、name，可选 website / tags / annotation / modificationTime
+        :param folderIds: 所有项目共同加入的文件夹
+        :param headers: 下载时使用的请求头
+        """
+        data = {
+            "items": [
+                {k: v for k, v in item.items() if v is not None} for item in items
+            ],
+            "tag_mode": "name",
+            "folderIds": folderIds,
+            "headers": headers,
+        }
+        data = {k: v for k, v in data.items() if v is not None}
+
+        result = self._make_request("post", "/api/item/addFromUrls", data=data)
+        if result and result.get("status") == "success":
+            print(f"addFromUrls successfully ({len(items)} items).")
+            return True
+        return False
+
     def create_folder(
         self, folder_name: str, parent: Optional[str] = None
     ) -> Optional[str]:
@@ -133,74 +188,101 @@ class SynapForestAPI:
             "star": star,
             "name": name,
             "folders": folders,
-            "tag_mode": name,
+            "tag_mode": "name" if tags is not None else None,
         }
         data = {k: v for k, v in data.items() if v is not None}
 
-        result = self._make_request(
-            "post", "/api/item/update", is_item_api=True, data=data
-        )
+        result = self._make_request("post", "/api/item/update", data=data)
         if result and result.get("status") == "success":
             print(f"Item {item_id} updated successfully.")
             return True
         return False
 
     def get_items(
-        self, limit: int = 100000, orderBy: str = "NAME", ext: str = ""
+        self,
+        limit: Optional[int] = None,
+        orderBy: str = "NAME",
+        ext: str = "",
+        folders: Optional[List[str]] = None,
+        tags: Optional[List[str]] = None,
     ) -> Optional[List[Dict]]:
         """
         获取项目列表
+        内部按页拉取，资料库再大也不会被截断
+        :param limit: 最多返回的条数，None 表示全部
+        :return: 项目列表；任一页请求失败时返回 None
         """
-        params = {"limit": limit, "orderBy": orderBy, "exts": [ext]}
-        result = self._make_request("post", "/api/item/list", params=params)
+        items = []
+        try:
+            for item in self.iter_items(
+                orderBy=orderBy, ext=ext, folders=folders, tags=tags
+            ):
+                items.append(item)
+                if limit is not None and len(items) >= limit:
+                    break
+        except PageFetchError as e:
+            print(f"Listing items failed: {e}")
+            return None
+        return items
+
+    def get_items_page(
+        self,
+        offset: int = 0,
+        page_size: int = 1000,
+        orderBy: str = "NAME",
+        ext: str = "",
+        folders: Optional[List[str]] = None,
+        tags: Optional[List[str]] = None,
+    ) -> Optional[List[Dict]]:
+        """
+        获取单页项目
+        :param offset: 页序号，从 0 开始
+        :param page_size: 每页条数
+        :param folders: 服务端按文件夹ID过滤
+        :param tags: 服务端按标签过滤
+        """
+        data = {"limit": page_size, "offset": offset, "orderBy": orderBy}
+        if ext:
+            data["exts"] = [ext]
+        if folders:
+            data["folders"] = folders
+        if tags:
+            data["tags"] = tags
+        result = self._make_request("post", "/api/item/list", data=data)
         if result and result.get("status") == "success":
             return result.get("data")
         return None
 
-    def get_folder_list_recursive(
+    def iter_items(
         self,
-    ) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
+        page_size: int = 1000,
+        orderBy: str = "NAME",
+        ext: str = "",
+        folders: Optional[List[str]] = None,
+        tags: Optional[List[str]] = None,
+        prefetch: bool = True,
+    ) -> Iterator[Dict]:
+        """
+        分页流式遍历项目
+        处理当前页时后台预取下一页，内存占用只与 page_size 有关
+        某页请求失败时抛出 PageFetchError
+        """
+        return iter_paged(
+            lambda offset: self.get_items_page(
+                offset, page_size, orderBy, ext, folders, tags
+            ),
+            page_size,
+            prefetch=prefetch,
+        )
+
+    def get_folder_list_recursive(self) -> FolderIndex:
         """
         获取文件夹结构
-        返回: (folder_id_to_name, folder_name_to_id, folder_to_root)
+        返回: FolderIndex，可按旧接口解包为 (folder_id_to_name, folder_name_to_id, folder_to_root)
         """
         data = {}
         result = self._make_request("post", "/api/folder/list", data=data)
         if not result or result.get("status") != "success":
-            return {}, {}, {}
-
-        folders = result.get("data", []) or []
-        folder_id_to_name = {}
-        folder_name_to_id = {}
-        folder_to_root = {}
-
-        stack = [(folder, None) for folder in folders]  # (folder, root_id)
-
-        while stack:
-            folder, root_id = stack.pop()
-            folder_id = folder.get("id")
-            folder_name = folder.get("name")
-
-            folder_id_to_name[folder_id] = folder_name
-            folder_name_to_id[folder_name] = folder_id
-
-            current_root = root_id if root_id else folder_id
-            folder_to_root[folder_id] = current_root
-
-            children = folder.get("children", [])
-            for child in children:
-                stack.append((child, current_root))
-
-        return folder_id_to_name, folder_name_to_id, folder_to_root
-
-    def get_folders_by_root_id(
-        self, root_id: str, folder_to_root: Dict[str, str]
-    ) -> List[str]:
-        """获取指定根文件夹下的所有文件夹ID"""
-        return [fid for fid, rid in folder_to_root.items() if rid == root_id]
+            return FolderIndex()
 
-    def get_folder_name_by_id(
-        self, folder_id: str, folder_id_to_name: Dict[str, str]
-    ) -> str:
-        """获取文件夹名称"""
-        return folder_id_to_name.get(folder_id, "Folder not found")
+        return FolderIndex.from_tree(result.get("data", []) or [])
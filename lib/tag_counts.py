@@ -0,0 +1,86 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tag_counts (
+    name TEXT PRIMARY KEY,
+    post_count INTEGER NOT NULL,
+    fetched REAL NOT NULL
+);
+"""
+
+TOTAL_KEY = "*"  # 全站帖子总数使用的键
+
+
+class TagCountCache:
+    """
+    标签帖子数的本地缓存(SQLite，带过期时间)
+    - get_many() 只对缺失或过期的标签调用 fetch，一次批量取回
+    - 服务端不存在的标签记为 0，同样缓存
+    用法:
+        cache = TagCountCache("danbooru_tag_counts.db", ttl=86400)
+        counts = cache.get_many(["1girl", "solo"], fetch_counts)
+    """
+
+    def __init__(self, db_path: Union[str, Path], ttl: float = 86400):
+        """
+        :param db_path: SQLite 文件路径
+        :param ttl: 缓存有效期(秒)
+        """
+        self.db_path = Path(db_path)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def _fresh(self, names: Iterable[str]) -> Dict[str, int]:
+        names = list(names)
+        if not names:
+            return {}
+        placeholders = ",".join("?" * len(names))
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT name, post_count FROM tag_counts "
+                f"WHERE name IN ({placeholders}) AND fetched >= ?",
+                (*names, time.time() - self.ttl),
+            ).fetchall()
+        return dict(rows)
+
+    def put_many(self, counts: Dict[str, int]) -> None:
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO tag_counts (name, post_count, fetched) VALUES (?, ?, ?)",
+                [(name, int(count), now) for name, count in counts.items()],
+            )
+
+    def get_many(
+        self,
+        names: Iterable[str],
+        fetch: Callable[[list], Optional[Dict[str, int]]],
+    ) -> Dict[str, int]:
+        """
+        读取多个标签的帖子数
+        :param fetch: 批量查询函数，参数为缺失的标签列表，返回 {标签: 帖子数}；失败返回 None
+        :return: {标签: 帖子数}，查询失败的标签不在其中
+        """
+        names = list(dict.fromkeys(names))
+        counts = self._fresh(names)
+        missing = [name for name in names if name not in counts]
+        self.hits += len(counts)
+        self.misses += len(missing)
+        if missing:
+            fetched = fetch(missing)
+            if fetched is not None:
+                fetched = {name: fetched.get(name, 0) for name in missing}
+                self.put_many(fetched)
+                counts.update(fetched)
+        return counts
@@ -0,0 +1,147 @@
+import fnmatch
+import re
+from typing import Dict, Iterable, Iterator, List, Sequence, Tuple
+
+# 帖子中参与筛选的标签字段
+TAG_FIELDS = (
+    "tag_string_general",
+    "tag_string_character",
+    "tag_string_copyright",
+    "tag_string_artist",
+    "tag_string_meta",
+)
+
+
+def is_local_only(term: str) -> bool:
+    """OR 组成员(~tag)与通配标签(*_hair)只在本地求值"""
+    return term.lstrip("-").startswith("~") or "*" in term
+
+
+class TagFilter:
+    """
+    编译后的本地标签筛选器，每个查询构建一次，对大量帖子重复求值
+    - 包含标签(AND)、反选标签(NOT)、OR 组(Danbooru 语法 ~a ~b，同一查询中的 ~ 标签构成一组)
+    - 通配标签(*_hair / long_*)，包含与反选均可
+    每个条件分配一个位，帖子求值时把它的标签映射为位掩码再与各条件比较:
+    精确标签在拼接后的标签串中做子串查找(" tag ")，不拆分、不建集合；
+    只有存在通配条件时才拆分标签，且按标签字符串缓存匹配结果，同一标签在后续帖子中只需一次字典查找
+    用法:
+        tag_filter = TagFilter(["long_hair", "~cat_ears", "~dog_ears"], ["comic", "*_censor*"])
+        kept = tag_filter.filter(posts)
+    """
+
+    def __init__(
+        self,
+        include_tags: Sequence[str] = (),
+        exclude_tags: Sequence[str] = (),
+        fields: Sequence[str] = TAG_FIELDS,
+    ):
+        """
+        :param include_tags: 包含条件，"~tag" 为 OR 组成员，可含通配符 *
+        :param exclude_tags: 反选条件(不带 "-")，可含通配符 *
+        :param fields: 读取标签的帖子字段
+        """
+        self.include_tags = list(include_tags)
+        self.exclude_tags = list(exclude_tags)
+        self.fields = tuple(fields)
+
+        self._bits: Dict[str, int] = {}  # 精确标签 -> 位
+        self._patterns: List[Tuple[re.Pattern, int]] = []  # 通配标签 -> 位
+        self._wildcard_cache: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+
+        self._required: List[int] = []  # 每个元素是一个必须命中的位组(AND 条件一位，OR 组多位)
+        self._excluded = 0
+        or_group = 0
+        for term in self.include_tags:
+            if term.startswith("~"):
+                or_group |= self._assign(term[1:])
+            else:
+                self._required.append(self._assign(term))
+        if or_group:
+            self._required.append(or_group)
+        for term in self.exclude_tags:
+            self._excluded |= self._assign(term)
+        self._needles = [(f" {tag} ", bit) for tag, bit in self._bits.items()]
+
+    @classmethod
+    def from_query(cls, query: str, **kwargs) -> "TagFilter":
+        """由搜索字符串构建，如 "long_hair ~cat_ears ~dog_ears -comic" """
+        terms = query.split()
+        include = [t for t in terms if not t.startswith("-")]
+        exclude = [t[1:] for t in terms if t.startswith("-") and len(t) > 1]
+        return cls(include, exclude, **kwargs)
+
+    def _assign(self, tag: str) -> int:
+        tag = tag.lower()
+        if tag in self._bits:  # 重复出现的精确标签共享一位
+            return self._bits[tag]
+        bit = 1 << len(self._names)
+        self._names[bit] = tag
+        if "*" in tag:
+            self._patterns.append((re.compile(fnmatch.translate(tag)), bit))
+        else:
+            self._bits[tag] = bit
+        return bit
+
+    def __bool__(self) -> bool:
+        return bool(self._required or self._excluded)
+
+    def _mask(self, post: Dict) -> int:
+        text = " %s " % " ".join([post.get(field) or "" for field in self.fields]).lower()
+        mask = 0
+        for needle, bit in self._needles:
+            if needle in text:
+                mask |= bit
+        if self._patterns:
+            cache = self._wildcard_cache
+            for tag in text.split():
+                bits = cache.get(tag)
+                if bits is None:
+                    bits = 0
+                    for pattern, bit in self._patterns:
+                        if pattern.match(tag):
+                            bits |= bit
+                    cache[tag] = bits
+                mask |= bits
+        return mask
+
+    def matches(self, post: Dict) -> bool:
+        if not self:
+            return True
+        mask = self._mask(post)
+        if mask & self._excluded:
+            return False
+        for group in self._required:
+            if not mask & group:
+                return False
+        return True
+
+    def iter_filter(self, posts: Iterable[Dict]) -> Iterator[Dict]:
+        """逐个产出通过筛选的帖子(适用于流式输入)"""
+        if not self:
+            yield from posts
+            return
+        for post in posts:
+            if self.matches(post):
+                yield post
+
+    def filter(self, posts: Iterable[Dict]) -> List[Dict]:
+        return list(self.iter_filter(posts))
+
+    def explain(self, post: Dict) -> Tuple[List[str], List[str]]:
+        """
+        说明帖子未通过的原因(仅用于调试输出)
+        :return: (未满足的包含条件, 命中的反选条件)
+        """
+        mask = self._mask(post)
+        missing = [
+            " | ".join(self._names[bit] for bit in self._names if bit & group)
+            for group in self._required
+            if not mask & group
+        ]
+        blocked = [self._names[bit] for bit in self._names if bit & self._excluded & mask]
+        return missing, blocked
+
+    def __repr__(self) -> str:
+        return f"TagFilter(include={self.include_tags}, exclude={self.exclude_tags})"
@@ -0,0 +1,183 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# update_item 参数名 -> 项目字典中的字段名
+UPDATE_FIELDS = {
+    "tags": "tags",
+    "annotation": "annotation",
+    "new_url": "url",
+    "star": "star",
+    "name": "name",
+    "folders": "folders",
+}
+# 顺序无关的列表字段
+SET_FIELDS = {"tags", "folders"}
+
+
+def diff_item(current: Optional[Dict], fields: Dict) -> Dict[str, Dict]:
+    """
+    计算待更新字段与当前状态的差异，相同的字段不出现在结果中
+    :param current: 项目当前状态(get_items 返回的字典)，未知时为 None
+    :param fields: update_item 的关键字参数
+    :return: {参数名: {"old": 旧值, "new": 新值}}，列表字段额外给出 add/remove
+    """
+    diff = {}
+    for param, value in fields.items():
+        if value is None:
+            continue
+        old = (current or {}).get(UPDATE_FIELDS[param])
+        if param in SET_FIELDS:
+            old_set, new_set = set(old or []), set(value)
+            if current is not None and old_set == new_set:
+                continue
+            diff[param] = {
+                "old": old,
+                "new": value,
+                "add": sorted(new_set - old_set),
+                "remove": sorted(old_set - new_set),
+            }
+        else:
+            if current is not None and old == value:
+                continue
+            diff[param] = {"old": old, "new": value}
+    return diff
+
+
+class UpdateQueue:
+    """
+    项目更新的写后队列(write-behind)
+    - 同一项目的多次修改在发送前合并为一次
+    - 与已知当前状态相同的修改直接丢弃，不发请求
+    - 攒满 batch_size 后交给线程池并发发送，调用方不等待
+    - close() 做最后一次刷新并返回报告 {"sent", "skipped", "failed", "coalesced", "would_send"}
+    - dry_run=True 时只打印差异，不发送，差异计入 "would_send" 而非 "sent"
+    用法:
+        with UpdateQueue(eagle) as queue:
+            queue.put(item["id"], current=item, tags=new_tags)
+        print(queue.report)
+    """
+
+    def __init__(
+        self,
+        backend,
+        batch_size: int = 100,
+        max_workers: int = 8,
+        dry_run: bool = False,
+        on_success: Optional[Callable[[str, Dict], None]] = None,
+    ):
+        """
+        :param backend: EagleAPI 或 SynapForestAPI
+        :param batch_size: 攒够多少个项目触发一次后台刷新
+        :param max_workers: 并发发送的线程数
+        :param dry_run: 只输出差异，不发送
+        :param on_success: 每个项目更新成功后的回调 (item_id, 已发送字段)
+        """
+        self.backend = backend
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.on_success = on_success
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="update-queue"
+        )
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Dict] = {}
+        self._current: Dict[str, Optional[Dict]] = {}
+        self._futures: List[Future] = []
+        self.failed_ids: List[str] = []
+        self.diffs: Dict[str, Dict] = {}
+        self.report = {"sent": 0, "skipped": 0, "failed": 0, "coalesced": 0, "would_send": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def put(self, item_id: str, current: Optional[Dict] = None, **fields) -> None:
+        """
+        加入一次修改
+        :param item_id: 项目ID
+        :param current: 项目当前状态，用于丢弃无变化的修改
+        :param fields: update_item 的关键字参数(tags / folders / new_url ...)
+        """
+        unknown = set(fields) - set(UPDATE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown update fields: {sorted(unknown)}")
+
+        with self._lock:
+            if item_id in self._pending:
+                self.report["coalesced"] += 1
+                self._pending[item_id].update(fields)
+            else:
+                self._pending[item_id] = dict(fields)
+            if current is not None and self._current.get(item_id) is None:
+                self._current[item_id] = current
+            full = len(self._pending) >= self.batch_size
+
+        if full:
+            self.flush(wait=False)
+
+    def _take_batch(self) -> Dict[str, Dict]:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+            current = {item_id: self._current.pop(item_id, None) for item_id in batch}
+        return {item_id: (fields, current[item_id]) for item_id, fields in batch.items()}
+
+    def _send(self, item_id: str, fields: Dict, current: Optional[Dict]) -> None:
+        diff = diff_item(current, fields)
+        if not diff:
+            with self._lock:
+                self.report["skipped"] += 1
+            return
+
+        changed = {param: fields[param] for param in diff}
+        if self.dry_run:
+            with self._lock:
+                self.diffs[item_id] = diff
+                self.report["would_send"] += 1
+            print(f"[DryRun] {item_id}: {diff}")
+            return
+
+        try:
+            ok = self.backend.update_item(item_id, **changed)
+        except Exception as e:
+            print(f"[UpdateQueue] Updating {item_id} failed: {e}")
+            ok = False
+
+        with self._lock:
+            if ok:
+                self.report["sent"] += 1
+            else:
+                self.report["failed"] += 1
+                self.failed_ids.append(item_id)
+        if ok and self.on_success:
+            self.on_success(item_id, changed)
+
+    def flush(self, wait: bool = True) -> Dict[str, int]:
+        """
+        发送当前所有待处理修改
+        :param wait: 是否等待所有已提交的发送完成
+        :return: 当前的累计报告
+        """
+        batch = self._take_batch()
+        futures = [
+            self._executor.submit(self._send, item_id, fields, current)
+            for item_id, (fields, current) in batch.items()
+        ]
+        with self._lock:
+            self._futures.extend(futures)
+            self._futures = [f for f in self._futures if not f.done()]
+            in_flight = list(self._futures)
+
+        if wait:
+            for future in in_flight:
+                future.result()
+        return dict(self.report)
+
+    def close(self) -> Dict[str, int]:
+        """最后一次刷新，等待全部发送完成后返回报告"""
+        report = self.flush(wait=True)
+        self._executor.shutdown(wait=True)
+        print(f"[UpdateQueue] {'Dry run' if self.dry_run else 'Flush'} report: {report}")
+        return report
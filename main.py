@@ -1,37 +1,64 @@
 import os
 import re
 import shutil
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional
 from pathlib import Path
 
 from PIL import Image
 from lib.eagle_api import EagleAPI
+from lib.folder_index import FolderIndex
+from lib.library_index import LibraryIndex
+from lib.library_reader import EagleLibraryReader
+from lib.update_queue import UpdateQueue
 import wd_tagger
 
 EXPORT_FOLDER_NAME = "export_20251025"
+LIBRARY_INDEX_PATH = "library_index.db"  # 本地资料库镜像
+INDEX_MAX_AGE = 600  # 镜像超过该秒数未同步时才与服务端增量同步(可读取资料库目录时改为磁盘增量扫描)
 
 
 class ImageTrainer:
-    def __init__(self):
-        self.eagle = EagleAPI()
-        self.destination_folder = Path("/mnt/d/train/20251027/")
-        self.eagle_folder = Path("/mnt/d/AI Image.library/images/")
+    def __init__(
+        self,
+        dry_run: bool = False,
+        eagle: Optional[EagleAPI] = None,
+        library_path: str = "/mnt/d/AI Image.library",
+        destination_folder: str = "/mnt/d/train/20251027/",
+        index_path: str = LIBRARY_INDEX_PATH,
+    ):
+        """
+        :param dry_run: 自动标签只输出将要提交的差异，不实际更新，也不创建文件夹
+        :param eagle: Eagle 客户端，默认连接本机 Eagle
+        :param library_path: Eagle 资料库根目录
+        :param destination_folder: 训练集输出目录
+        :param index_path: 本地镜像数据库路径
+        """
+        self.dry_run = dry_run
+        self.eagle = eagle or EagleAPI()
+        self.library_index = LibraryIndex(index_path, self.eagle)
+        self.destination_folder = Path(destination_folder)
+        self.eagle_folder = Path(library_path) / "images"
+        self.library_reader = EagleLibraryReader(self.eagle_folder.parent)
         self.artist_prefix = ""
 
         # 确保目标文件夹存在
         self.destination_folder.mkdir(parents=True, exist_ok=True)
 
-    def _get_folder_mappings(
-        self,
-    ) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, str]]:
-        """获取文件夹映射关系"""
+    def _get_folder_mappings(self) -> FolderIndex:
+        """获取文件夹索引"""
         return self.eagle.get_folder_list_recursive()
 
+    def _create_folder(self, folder_name: str, parent: Optional[str] = None) -> Optional[str]:
+        """创建文件夹；dry_run 时不创建，返回占位ID(如 "<Rating>")"""
+        if self.dry_run:
+            print(f"[DryRun] Would create folder {folder_name!r} under {parent}")
+            return f"<{folder_name}>"
+        return self.eagle.create_folder(folder_name, parent)
+
     def _process_folders(
         self,
         folder_ids: List[str],
-        folder_id_to_name: Dict[str, str],
-        folder_to_root: Dict[str, str],
+        folders: FolderIndex,
     ) -> Dict[str, List[str]]:
         """
         处理文件夹分类
@@ -56,14 +83,10 @@ class ImageTrainer:
         result = {v: [] for v in categories.values()}
 
         for folder_id in folder_ids:
-            root_folder_name = self.eagle.get_folder_name_by_id(
-                folder_to_root[folder_id], folder_id_to_name
-            )
+            root_folder_name = folders.name(folders.root_of(folder_id))
 
             if root_folder_name in categories:
-                folder_name = self.eagle.get_folder_name_by_id(
-                    folder_id, folder_id_to_name
-                )
+                folder_name = folders.name(folder_id)
                 if root_folder_name == "Artist":
                     folder_name = self.artist_prefix + folder_name
                 result[categories[root_folder_name]].append(folder_name)
@@ -102,21 +125,17 @@ class ImageTrainer:
 
     def train_tag_generate(self) -> None:
         """生成训练标签"""
-        items_data = self.eagle.get_items()
-        if not items_data:
-            print("No items data found!")
-            return
-
-        folder_id_to_name, folder_name_to_id, folder_to_root = (
-            self._get_folder_mappings()
-        )
-        print(f"Total items: {len(items_data)}")
+        folders = self._get_folder_mappings()
 
-        export_folder_id = folder_name_to_id.get(EXPORT_FOLDER_NAME)
+        export_folder_id = folders.get_id(EXPORT_FOLDER_NAME)
         if not export_folder_id:
             print(f"'{EXPORT_FOLDER_NAME}' folder not found!")
             return
 
+        # 从本地镜像查询导出文件夹中的项目
+        self.library_index.ensure_fresh(INDEX_MAX_AGE, reader=self.library_reader)
+        items_data = self.library_index.items_in_folder(export_folder_id)
+
         i = 1
         for item in items_data:
             item_id = item.get("id", [])
@@ -129,9 +148,7 @@ class ImageTrainer:
                 continue
 
             # 处理文件夹分类
-            folder_data = self._process_folders(
-                folder_ids, folder_id_to_name, folder_to_root
-            )
+            folder_data = self._process_folders(folder_ids, folders)
 
             # 准备标签组合
             tags_export1 = [
@@ -167,15 +184,8 @@ class ImageTrainer:
 
     def auto_tagger(self) -> None:
         """自动标签处理（包含文件夹分类）"""
-        items_data = self.eagle.get_items()
-        if not items_data:
-            print("No items data found!")
-            return
-
-        folder_id_to_name, folder_name_to_id, folder_to_root = (
-            self._get_folder_mappings()
-        )
-        wd_tagger_folder_id = folder_name_to_id.get("OvO")
+        folders = self._get_folder_mappings()
+        wd_tagger_folder_id = folders.get_id("OvO")
 
         if not wd_tagger_folder_id:
             print("'wd-tagger' folder not found!")
@@ -190,16 +200,28 @@ class ImageTrainer:
         # 获取或创建根分类文件夹ID
         root_category_ids = {}
         for category, folder_name in category_folders.items():
-            if folder_name not in folder_name_to_id:
-                created_id = self.eagle.create_folder(folder_name)
-                if created_id:
-                    folder_name_to_id[folder_name] = created_id
-                    folder_id_to_name[created_id] = folder_name
-            root_category_ids[category] = folder_name_to_id.get(folder_name)
+            if folders.find(folder_name) is None:
+                created_id = self._create_folder(folder_name)
+                folders.add(created_id, folder_name)
+            root_category_ids[category] = folders.find(folder_name)
 
         predictor = wd_tagger.Predictor()
         model_repo = "SmilingWolf/wd-vit-tagger-v3"
 
+        # 待处理文件夹中项目的最新数据: 会读-改-写标签与文件夹，不能用可能过期的镜像
+        items_data = self.library_index.live_items_in_folder(
+            wd_tagger_folder_id, reader=self.library_reader
+        )
+
+        # 写后队列: 合并修改、丢弃无变化的更新、后台并发提交
+        update_queue = UpdateQueue(
+            self.eagle,
+            dry_run=self.dry_run,
+            on_success=lambda item_id, fields: self.library_index.record_update(
+                item_id, **fields
+            ),
+        )
+
         for item in items_data:
             item_id = item.get("id")
             name = item.get("name")
@@ -243,14 +265,16 @@ class ImageTrainer:
 
                 # 1. 处理评分文件夹
                 if root_category_ids["rating"]:
-                    rating_folder_id = folder_name_to_id.get(rating_folder_name)
+                    rating_folder_id = folders.find(
+                        rating_folder_name, root_category_ids["rating"]
+                    )
                     if not rating_folder_id:
-                        rating_folder_id = self.eagle.create_folder(
+                        rating_folder_id = self._create_folder(
                             rating_folder_name, root_category_ids["rating"]
                         )
-                        if rating_folder_id:
-                            folder_name_to_id[rating_folder_name] = rating_folder_id
-                            folder_id_to_name[rating_folder_id] = rating_folder_name
+                        folders.add(
+                            rating_folder_id, rating_folder_name, root_category_ids["rating"]
+                        )
 
                     if rating_folder_id and rating_folder_id not in new_folders:
                         new_folders.append(rating_folder_id)
@@ -258,15 +282,17 @@ class ImageTrainer:
                 # 2. 处理角色文件夹
                 if root_category_ids["character"]:
                     for character in characters:
-                        if character not in folder_name_to_id:
-                            char_folder_id = self.eagle.create_folder(
+                        char_folder_id = folders.find(
+                            character, root_category_ids["character"]
+                        )
+                        if not char_folder_id:
+                            char_folder_id = self._create_folder(
                                 character, root_category_ids["character"]
                             )
-                            if char_folder_id:
-                                folder_name_to_id[character] = char_folder_id
-                                folder_id_to_name[char_folder_id] = character
+                            folders.add(
+                                char_folder_id, character, root_category_ids["character"]
+                            )
 
-                        char_folder_id = folder_name_to_id.get(character)
                         if char_folder_id and char_folder_id not in new_folders:
                             new_folders.append(char_folder_id)
 
@@ -275,22 +301,21 @@ class ImageTrainer:
                 # 移除空标签
                 new_tags = [tag for tag in new_tags if tag]
 
-                # 更新项目（标签和文件夹）
-                self.eagle.update_item(
-                    item_id,
-                    tags=new_tags,
-                    folders=list(set(new_folders)),  # 确保文件夹ID唯一
-                )
+                # 更新项目（标签和文件夹），无变化时队列会直接跳过
+                new_folders = list(set(new_folders))  # 确保文件夹ID唯一
+                update_queue.put(item_id, current=item, tags=new_tags, folders=new_folders)
 
-                print(f"Updated item {item_id}:")
+                print(f"Queued item {item_id}:")
                 print(f" - Tags: {new_tags}")
                 print(
-                    f" - Folders: {[folder_id_to_name.get(fid, 'Unknown') for fid in new_folders]}"
+                    f" - Folders: {[folders.name(fid, 'Unknown') for fid in new_folders]}"
                 )
 
             except Exception as e:
                 print(f"Error processing {image_path}: {str(e)}")
 
+        update_queue.close()
+
 
 if __name__ == "__main__":
     trainer = ImageTrainer()
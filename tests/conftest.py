@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+from benchmarks.mock_server import MockServer
+
+
+@pytest.fixture(autouse=True)
+def _no_proxy(monkeypatch):
+    """替身服务监听本机，避免请求被环境代理转走"""
+    monkeypatch.setenv("NO_PROXY", "127.0.0.1,localhost")
+    monkeypatch.setenv("no_proxy", "127.0.0.1,localhost")
+
+
+@pytest.fixture
+def eagle_server():
+    """Eagle 替身(项目端口与文件夹端口)，通过 server.library 放入项目与文件夹"""
+    with MockServer("eagle") as server:
+        yield server
+
+
+@pytest.fixture
+def files_server():
+    """图片 CDN 替身(支持 Range)，通过 server.library.files 放入文件"""
+    with MockServer("files") as server:
+        yield server
+
+
+@pytest.fixture
+def danbooru(tmp_path, monkeypatch):
+    """
+    在临时目录中导入 danbooru_api，客户端指向 Danbooru 替身服务(帖子放入 server.library.posts)
+    本地存储在首次使用时建在临时目录中
+    :return: (danbooru_api 模块, 替身服务)
+    """
+    from pybooru import Danbooru
+
+    from lib.danbooru_access import throttle_client
+    from lib.rate_limit import AdaptiveConcurrency, TokenBucket
+
+    monkeypatch.chdir(tmp_path)
+    config = {"danbooru": {"username": "test", "api_key": "test"}}
+    (tmp_path / "danbooru_config.json").write_text(json.dumps(config), encoding="utf-8")
+    import danbooru_api
+
+    with MockServer("danbooru") as server:
+        client = throttle_client(
+            Danbooru(site_url=server.danbooru_url(), username="test", api_key="test"),
+            TokenBucket(None),
+            AdaptiveConcurrency(max_limit=4),
+        )
+        monkeypatch.setattr(danbooru_api, "client", client)
+        for name in ("library_index", "known_posts", "tag_count_cache", "downloader"):
+            monkeypatch.setattr(danbooru_api, name, None)
+        yield danbooru_api, server
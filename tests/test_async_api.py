@@ -0,0 +1,120 @@
+"""AsyncEagleAPI / AsyncSynapForestAPI 对替身服务的读写、分页、并发上限与失败处理"""
+
+import asyncio
+import socket
+import time
+
+import pytest
+
+from benchmarks.mock_server import MockServer
+from lib.async_api import AsyncEagleAPI, AsyncSynapForestAPI
+
+
+@pytest.fixture
+def synap_server():
+    with MockServer("synap") as server:
+        yield server
+
+
+def closed_port_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+def test_eagle_folders_and_items(eagle_server):
+    library = eagle_server.library
+    for i in range(7):
+        library.add_item(name=f"img{i}", tags=["old"])
+
+    async def run():
+        async with AsyncEagleAPI(concurrency=4, **eagle_server.eagle_urls()) as eagle:
+            folder_id = await eagle.create_folder("Rating")
+            child_id = await eagle.create_folder("general", folder_id)
+            assert await eagle.add_from_url("http://cdn/x.png", "x", website="w", folderIds=[child_id])
+            items = [item async for item in eagle.iter_items(page_size=3)]
+            results = await eagle.update_items(
+                [{"item_id": item["id"], "tags": ["new"], "folders": [child_id]} for item in items]
+            )
+            folders = await eagle.get_folder_list_recursive()
+        return folder_id, child_id, items, results, folders
+
+    folder_id, child_id, items, results, folders = asyncio.run(run())
+    assert len(items) == 8 and all(results)
+    assert all(item["tags"] == ["new"] and item["folders"] == [child_id] for item in library.items.values())
+    assert folders.find("general", folder_id) == child_id
+    # 8 项、每页 3 项: 3 页
+    assert library.request_counts["/api/item/list"] == 3
+
+
+def test_synap_bulk_add_and_update(synap_server):
+    library = synap_server.library
+
+    async def run():
+        async with AsyncSynapForestAPI(**synap_server.synap_urls()) as synap:
+            folder_id = await synap.create_folder("FromDanbooru")
+            ok = await synap.add_from_urls(
+                [{"url": f"http://cdn/{i}.png", "name": str(i), "website": f"w{i}"} for i in range(5)],
+                folderIds=[folder_id],
+            )
+            items = await synap.get_items()
+            updated = await synap.update_item(items[0]["id"], tags=["a", "b"], name="renamed")
+            folders = await synap.get_folder_list_recursive()
+        return folder_id, ok, items, updated, folders
+
+    folder_id, ok, items, updated, folders = asyncio.run(run())
+    assert ok and updated and len(items) == 5
+    assert library.request_counts["/api/item/addFromUrls"] == 1
+    first = library.items[items[0]["id"]]
+    assert (first["tags"], first["name"], first["folders"]) == (["a", "b"], "renamed", [folder_id])
+    assert folders.get_id("FromDanbooru") == folder_id
+
+
+def test_synap_update_sends_tag_mode_not_name(monkeypatch):
+    sent = []
+
+    async def capture(self, method, endpoint, data=None, params=None):
+        sent.append(data)
+        return {"status": "success"}
+
+    monkeypatch.setattr(AsyncSynapForestAPI, "_make_request", capture)
+
+    async def run():
+        synap = AsyncSynapForestAPI()
+        await synap.update_item("ID", tags=["a"], name="renamed")
+        await synap.update_item("ID", name="renamed")
+
+    asyncio.run(run())
+    assert sent[0]["tag_mode"] == "name" and sent[0]["name"] == "renamed"
+    assert "tag_mode" not in sent[1]
+
+
+def test_concurrency_is_bounded():
+    with MockServer("eagle", latency=0.05) as server:
+        items = [server.library.add_item() for _ in range(8)]
+
+        async def run(concurrency):
+            async with AsyncEagleAPI(concurrency=concurrency, **server.eagle_urls()) as eagle:
+                start = time.perf_counter()
+                results = await eagle.update_items([{"item_id": i["id"], "tags": ["t"]} for i in items])
+                return time.perf_counter() - start, results
+
+        elapsed, results = asyncio.run(run(2))
+    assert all(results)
+    # 同时最多 2 个在途: 8 个请求至少 4 轮 x 50 ms
+    assert elapsed >= 0.18
+
+
+def test_connection_errors_retry_then_fail():
+    url = closed_port_url()
+
+    async def run():
+        async with AsyncEagleAPI(max_retries=2, backoff_factor=0.01, base_url_item=url, base_url_folder=url) as eagle:
+            return await eagle.update_item("ID", tags=["t"]), await eagle.get_items()
+
+    start = time.perf_counter()
+    updated, items = asyncio.run(run())
+    assert updated is False
+    assert items is None
+    assert time.perf_counter() - start < 5
@@ -0,0 +1,210 @@
+"""danbooru_api.crawl_query 对 Danbooru 替身服务的分页抓取，与 CheckpointTracker 的检查点推进"""
+
+import sqlite3
+
+import pytest
+
+from benchmarks.synthetic import generate_posts
+from lib.crawl_checkpoint import CheckpointTracker, CrawlCheckpoints
+from lib.eagle_api import EagleAPI
+from lib.folder_index import FolderIndex
+
+
+def test_numbered_pages_count_known_posts_toward_max_limit(danbooru):
+    api, server = danbooru
+    server.library.posts = generate_posts(200, tags_per_post=2)
+    known = {post["id"] for post in server.library.posts[:150]}
+
+    pages = list(api.crawl_query("order:rank", limit_per_page=10, max_limit=30, known_ids=known))
+
+    # 页码分页不跳过已导入的帖子计数，达到 max_limit 即停，不会翻到结果末尾
+    assert server.library.request_counts["/posts.json"] == 3
+    assert sum(len(posts) for _, posts in pages) == 30
+
+
+def test_keyset_pages_skip_known_posts_in_max_limit(danbooru):
+    api, server = danbooru
+    server.library.posts = generate_posts(200, tags_per_post=2)
+    known = {post["id"] for post in server.library.posts[:150]}
+
+    pages = list(api.crawl_query("", limit_per_page=10, max_limit=30, known_ids=known))
+
+    # 游标分页(id 降序)中已导入的帖子不计入 max_limit，直到取得 30 个新帖子
+    ids = [post["id"] for _, posts in pages for post in posts]
+    assert len([i for i in ids if i not in known]) == 30
+    assert len(ids) == 180
+
+
+def crawl(api, store, query="", pages=None, **kwargs):
+    """
+    抓取并在每页处理后保存产出的检查点(与 main 提交检查点的顺序一致)
+    :param pages: 处理这么多页后中断，None 表示抓完
+    :return: 处理过的帖子 id
+    """
+    ids = []
+    crawler = api.crawl_query(query, limit_per_page=10, checkpoint=store.get(query), local_filter=False, **kwargs)
+    for count, (state, posts) in enumerate(crawler):
+        if pages is not None and count >= pages:
+            crawler.close()
+            break
+        ids.extend(post["id"] for post in posts)
+        store.save(query, state)
+    return ids
+
+
+def test_interrupted_backfill_resumes_from_cursor(danbooru, store):
+    api, server = danbooru
+    server.library.posts = generate_posts(95, tags_per_post=2)
+
+    first = crawl(api, store, pages=3, max_limit=1000)
+    assert first == list(range(95, 65, -1))
+    assert store.get("")["cursor"] == "b66"
+
+    second = crawl(api, store, max_limit=1000)
+    assert second == list(range(65, 0, -1))
+    state = store.get("")
+    assert (state["newest_id"], state["cursor"], state["complete"]) == (95, None, True)
+
+    # 回填完成且没有新帖子: 只请求第一页，不再产出帖子
+    requests_before = server.library.request_counts["/posts.json"]
+    assert crawl(api, store, max_limit=1000) == []
+    assert server.library.request_counts["/posts.json"] - requests_before == 1
+
+
+def test_interrupted_head_pass_resumes_before_newer_posts(danbooru, store):
+    api, server = danbooru
+    old = generate_posts(30, tags_per_post=2)
+    server.library.posts = old
+    assert len(crawl(api, store, max_limit=1000)) == 30
+
+    # 上次之后新增 45 个帖子，头部抓取两页后中断
+    middle = generate_posts(45, start_id=31, tags_per_post=2)
+    server.library.posts = middle + old
+    first = crawl(api, store, pages=2, max_limit=1000)
+    assert first == list(range(75, 55, -1))
+    state = store.get("")
+    assert (state["newest_id"], state["head_cursor"], state["pending_newest_id"]) == (30, "b56", 75)
+
+    # 中断期间又新增 5 个: 先从 head_cursor 抓完上一段再提升高水位，然后抓最新的
+    newest = generate_posts(5, start_id=76, tags_per_post=2)
+    server.library.posts = newest + middle + old
+    second = crawl(api, store, max_limit=1000)
+    assert sorted(first + second) == list(range(31, 81))
+    state = store.get("")
+    assert (state["newest_id"], state["head_cursor"], state["pending_newest_id"]) == (80, None, None)
+
+
+def test_head_pass_stopped_by_max_limit_closes_the_gap_over_runs(danbooru, store):
+    api, server = danbooru
+    old = generate_posts(20, tags_per_post=2)
+    server.library.posts = old
+    crawl(api, store, max_limit=1000)
+
+    server.library.posts = generate_posts(60, start_id=21, tags_per_post=2) + old
+    fetched = []
+    for _ in range(3):
+        fetched += crawl(api, store, max_limit=20)
+    assert sorted(fetched) == list(range(21, 81))
+    # 第三次正好停在缺口底部: 下次运行碰到旧的高水位后提升，不再产出帖子
+    assert store.get("")["head_cursor"] == "b21"
+    assert crawl(api, store, max_limit=20) == []
+    state = store.get("")
+    assert (state["newest_id"], state["head_cursor"]) == (80, None)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CrawlCheckpoints(tmp_path / "checkpoints.db")
+    yield store
+    store.close()
+
+
+def test_tracker_commits_pages_in_order_when_posts_finish_out_of_order(store):
+    tracker = CheckpointTracker(store, save_every=1)
+    tracker.add_page("q", {"cursor": "b90"}, ["p1", "p2"])
+    tracker.add_page("q", {"cursor": "b80"}, ["p3"])
+
+    tracker.done("p3")  # 第二页先完成，第一页未完成前不提交
+    assert store.get("q") == {}
+    tracker.done("p1")
+    tracker.done("p2")
+    assert store.get("q")["cursor"] == "b80"
+
+
+def test_tracker_holds_checkpoint_before_failed_import(store):
+    tracker = CheckpointTracker(store, save_every=1)
+    tracker.add_page("q", {"cursor": "b90"}, ["p1"])
+    tracker.add_page("q", {"cursor": "b80"}, ["p2"])
+    tracker.add_page("q", {"cursor": "b70"}, ["p3"])
+    tracker.add_page("other", {"cursor": "b50"}, ["o1"])
+
+    tracker.done("p1")
+    tracker.failed("p2")
+    tracker.done("p3")
+    tracker.done("o1")
+    assert tracker.close() == {"q": {"cursor": "b90"}, "other": {"cursor": "b50"}}
+    assert store.get("q")["cursor"] == "b90"
+
+
+def test_tracker_page_that_failed_before_registration_blocks_later_pages(store):
+    tracker = CheckpointTracker(store, save_every=1)
+    tracker.add_page("q", {"cursor": "b90"}, [])
+    tracker.add_page("q", {"cursor": "b80"}, [], failed=True)
+    tracker.add_page("q", {"cursor": "b70"}, [])
+    assert tracker.close() == {"q": {"cursor": "b90"}}
+
+
+def test_main_holds_checkpoint_when_filtering_a_page_fails(danbooru, eagle_server, monkeypatch):
+    api, server = danbooru
+    server.library.posts = generate_posts(150, tags_per_post=2)
+    monkeypatch.setattr(api, "backend", EagleAPI(**eagle_server.eagle_urls()))
+    monkeypatch.setattr(api, "folder_index", FolderIndex())
+    for name, value in {
+        "SEARCH_QUERYS": ["order:id_desc"],
+        "MAX_LIMIT": 1000,
+        "CHECKPOINT_EVERY_PAGES": 1,
+        "DOWNLOAD_LOCALLY": False,
+        "SKIP_NEAR_DUPLICATES": False,
+    }.items():
+        monkeypatch.setattr(api.Config, name, value)
+
+    filter_local_posts = api.filter_local_posts
+    calls = []
+
+    def failing_second_page(posts, tag_filter, *args, **kwargs):
+        calls.append(len(posts))
+        if len(calls) == 2:
+            raise ValueError("malformed page")
+        return filter_local_posts(posts, tag_filter, *args, **kwargs)
+
+    monkeypatch.setattr(api, "filter_local_posts", failing_second_page)
+    api.main()
+
+    # 第二页筛选失败: 检查点停在第一页，之后的页面不能越过它
+    store = CrawlCheckpoints("danbooru_checkpoints.db")
+    assert store.get("order:id_desc")["cursor"] == "b101"
+    store.close()
+
+    # 下次运行从第一页之后继续，补上第二页，每个帖子只导入一次
+    monkeypatch.setattr(api, "filter_local_posts", filter_local_posts)
+    api.main()
+    urls = [item["url"] for item in eagle_server.library.items.values()]
+    assert len(urls) == len(set(urls)) == 150
+
+
+def test_checkpoints_migrate_old_schema(tmp_path):
+    path = tmp_path / "checkpoints.db"
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        "CREATE TABLE checkpoints (query TEXT PRIMARY KEY, newest_id INTEGER, cursor TEXT, "
+        "complete INTEGER NOT NULL DEFAULT 0, updated REAL)"
+    )
+    conn.execute("INSERT INTO checkpoints VALUES ('q', 50, 'b10', 0, 0)")
+    conn.commit()
+    conn.close()
+
+    store = CrawlCheckpoints(path)
+    assert store.get("q") == {
+        "newest_id": 50, "cursor": "b10", "complete": False, "head_cursor": None, "pending_newest_id": None
+    }
+    store.close()
@@ -0,0 +1,145 @@
+"""lib.rate_limit 的令牌桶与自适应并发，以及 ThrottledAdapter 对 Danbooru 替身服务 429/Retry-After 的处理"""
+
+import email.utils
+import time
+
+import pytest
+import requests
+from pybooru import Danbooru
+
+from benchmarks.mock_server import MockServer
+from benchmarks.synthetic import generate_posts
+from lib import rate_limit
+from lib.danbooru_access import RateLimitExceeded, retry_after, throttle_client
+from lib.rate_limit import AdaptiveConcurrency, TokenBucket
+
+
+class FakeClock:
+    """替换 lib.rate_limit 中的 time: sleep 只推进时间"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+def test_bucket_allows_burst_then_limits_to_rate(clock):
+    bucket = TokenBucket(10, burst=5)
+    for _ in range(5):
+        bucket.acquire()
+    assert clock.now == 1000.0
+    for _ in range(20):
+        bucket.acquire()
+    assert clock.now == pytest.approx(1002.0)
+
+
+def test_bucket_without_rate_only_honours_pause(clock):
+    bucket = TokenBucket(None)
+    for _ in range(100):
+        bucket.acquire()
+    assert clock.now == 1000.0
+    bucket.pause(3)
+    bucket.acquire()
+    assert clock.now == pytest.approx(1003.0)
+
+
+def test_throttling_halves_rate_and_success_recovers(clock):
+    bucket = TokenBucket(10)
+    for _ in range(5):
+        bucket.throttled(0)
+    assert bucket.rate == 1.0  # 不低于上限的 1/10
+    for _ in range(100):
+        bucket.succeeded()
+    assert bucket.rate == 10
+
+
+def test_pause_drops_saved_tokens(clock):
+    bucket = TokenBucket(10, burst=10)
+    bucket.pause(1)
+    bucket.acquire()
+    # 暂停期间不补充令牌，恢复后按速率放行而不是突发
+    assert clock.now == pytest.approx(1001.1)
+    bucket.acquire()
+    assert clock.now == pytest.approx(1001.2)
+
+
+def test_adaptive_concurrency_is_aimd():
+    concurrency = AdaptiveConcurrency(initial=4, max_limit=6)
+    for _ in range(4):
+        concurrency.acquire()
+        concurrency.release(0.01)
+    assert concurrency.limit == 5
+    concurrency.acquire()
+    concurrency.release(None, throttled=True)
+    assert concurrency.limit == 2
+    concurrency.acquire()
+    concurrency.release(1.0)  # 延迟远高于基线
+    assert concurrency.limit == 1
+
+
+def test_retry_after_parses_seconds_and_dates():
+    response = requests.Response()
+    assert retry_after(response) is None
+    response.headers["Retry-After"] = "2.5"
+    assert retry_after(response) == 2.5
+    response.headers["Retry-After"] = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 < retry_after(response) <= 30
+    response.headers["Retry-After"] = "soon"
+    assert retry_after(response) is None
+
+
+def rate_limited_client(server, bucket, **kwargs):
+    client = Danbooru(site_url=server.danbooru_url(), username="test", api_key="test")
+    return throttle_client(client, bucket, AdaptiveConcurrency(initial=2, max_limit=4), **kwargs)
+
+
+class RecordingBucket(TokenBucket):
+    """记录每次被限流后的速率"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.throttled_rates = []
+
+    def throttled(self, seconds):
+        super().throttled(seconds)
+        self.throttled_rates.append(self.rate)
+
+
+def test_adapter_waits_out_429_and_every_call_succeeds():
+    with MockServer("danbooru", rate_limit=20) as server:
+        server.library.posts = generate_posts(10, tags_per_post=2)
+        bucket = RecordingBucket(100)
+        client = rate_limited_client(server, bucket)
+
+        for _ in range(40):
+            assert len(client.post_list(limit=5)) == 5
+
+        stats = client.throttle.get_stats()
+        rejected = server.library.request_counts.get("429", 0)
+    assert rejected > 0
+    assert stats["throttled"] == stats["retried"] == rejected
+    assert stats["requests"] == 40 + rejected
+    assert client.throttle.stats["waited_s"] > 0
+    # 每次 429 都暂停令牌桶并把速率减半
+    assert len(bucket.throttled_rates) == rejected
+    assert bucket.throttled_rates[0] == 50
+
+
+def test_adapter_raises_when_retries_are_exhausted():
+    with MockServer("danbooru", rate_limit=0.5) as server:
+        client = rate_limited_client(server, TokenBucket(None), retries=0)
+        with pytest.raises(RateLimitExceeded) as error:
+            client.post_list(limit=1)
+    assert error.value.response.status_code == 429
+    assert client.throttle.stats["throttled"] == 1
@@ -0,0 +1,119 @@
+"""lib.download_cache.DownloadCache 的 LRU 淘汰、外部删除、目录补建索引与多实例共用"""
+
+import hashlib
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from lib import download_cache
+from lib.download_cache import DownloadCache
+
+
+@pytest.fixture(autouse=True)
+def clock(monkeypatch):
+    """每次取时间前进 1 秒，最近使用顺序与调用顺序一致"""
+    now = [1000.0]
+
+    def tick():
+        now[0] += 1
+        return now[0]
+
+    monkeypatch.setattr(download_cache, "time", SimpleNamespace(time=tick))
+
+
+def md5_of(name):
+    return hashlib.md5(name.encode()).hexdigest()
+
+
+def put(cache, tmp_path, name, size=100):
+    src = tmp_path / f"{name}.part"
+    src.write_bytes(b"x" * size)
+    return cache.put(src, md5_of(name), "jpg")
+
+
+def test_put_and_get(tmp_path):
+    cache = DownloadCache(tmp_path / "cache")
+    path = put(cache, tmp_path, "a")
+    assert path == cache.path_for(md5_of("a"), "jpg") and path.read_bytes() == b"x" * 100
+    assert not (tmp_path / "a.part").exists()
+    assert cache.get(md5_of("a")) == path and md5_of("a") in cache
+    assert cache.get(md5_of("b")) is None
+    assert cache.stats == {"hits": 1, "misses": 1, "added": 1, "evicted": 0}
+    cache.close()
+
+
+def test_evicts_least_recently_used_first(tmp_path):
+    cache = DownloadCache(tmp_path / "cache", max_bytes=250)
+    for name in "abc":
+        put(cache, tmp_path, name)
+    # 写入 c 后超过上限，淘汰最久未用的 a
+    assert [md5_of(n) in cache for n in "abc"] == [False, True, True]
+
+    cache.get(md5_of("b"))  # b 变为最近使用
+    put(cache, tmp_path, "d")
+    assert [md5_of(n) in cache for n in "bcd"] == [True, False, True]
+    assert cache.total_bytes == 200 and cache.stats["evicted"] == 2
+    assert not cache.path_for(md5_of("c"), "jpg").exists()
+    cache.close()
+
+
+def test_just_written_file_is_kept_even_over_the_limit(tmp_path):
+    cache = DownloadCache(tmp_path / "cache", max_bytes=150)
+    put(cache, tmp_path, "a")
+    put(cache, tmp_path, "big", size=300)
+    assert md5_of("big") in cache and md5_of("a") not in cache
+    cache.close()
+
+
+def test_externally_deleted_file_is_a_miss(tmp_path):
+    cache = DownloadCache(tmp_path / "cache")
+    put(cache, tmp_path, "a").unlink()
+    assert cache.get(md5_of("a")) is None
+    assert len(cache) == 0
+    cache.close()
+
+
+def test_rebuild_indexes_existing_files_and_evicts_over_limit(tmp_path):
+    root = tmp_path / "cache"
+    for index, name in enumerate("abc"):
+        md5 = md5_of(name)
+        path = root / md5[:2] / f"{md5}.png"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"x" * 100)
+        os.utime(path, (index, index))  # a 最旧
+    partial = root / "ab" / f"{md5_of('d')}.png.part"
+    partial.parent.mkdir(parents=True, exist_ok=True)
+    partial.write_bytes(b"x")
+
+    cache = DownloadCache(root, max_bytes=250)
+    assert len(cache) == 2
+    assert md5_of("a") not in cache and cache.get(md5_of("c")).suffix == ".png"
+    cache.close()
+
+
+def test_adopt_links_library_file(tmp_path):
+    cache = DownloadCache(tmp_path / "cache")
+    original = tmp_path / "library.jpg"
+    original.write_bytes(b"image")
+    path = cache.adopt(original, md5_of("lib"), "jpg")
+    assert original.exists() and path.read_bytes() == b"image"
+    assert os.path.samefile(original, path)
+    assert cache.adopt(original, md5_of("lib"), "jpg") == path and len(cache) == 1
+    cache.close()
+
+
+def test_eviction_counts_files_written_by_another_instance(tmp_path):
+    first = DownloadCache(tmp_path / "cache", max_bytes=250)
+    second = DownloadCache(tmp_path / "cache", max_bytes=250)
+    put(first, tmp_path, "a")
+    put(second, tmp_path, "b")
+    assert first.total_bytes == 100
+    put(first, tmp_path, "c")
+    # first 只按自己写入的大小触发淘汰，淘汰时重新求和，计入 second 写入的 b
+    assert first.total_bytes == 200 and len(first) == 3
+    assert first.evict() == 1
+    assert md5_of("a") not in first and md5_of("b") in second
+    assert first.total_bytes == 200
+    first.close()
+    second.close()
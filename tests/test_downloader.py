@@ -0,0 +1,89 @@
+"""Downloader 对替身图片 CDN 的下载、md5 校验、.part 续传与 416 处理"""
+
+import hashlib
+import os
+
+import pytest
+
+from lib.download_cache import DownloadCache
+from lib.downloader import DownloadError, Downloader
+
+BODY = os.urandom(300 * 1024)
+MD5 = hashlib.md5(BODY).hexdigest()
+
+
+@pytest.fixture
+def downloader(tmp_path):
+    downloader = Downloader(DownloadCache(tmp_path / "staging"), chunk_size=64 * 1024)
+    yield downloader
+    downloader.close()
+
+
+def serve(server, path="/img/a.jpg", body=BODY):
+    server.library.files[path] = body
+    return server.files_url() + path
+
+
+def part_path(downloader, md5=MD5, ext="jpg"):
+    path = downloader.path_for(md5, ext)
+    return path.with_name(path.name + ".part")
+
+
+def test_fetch_verifies_and_caches(files_server, downloader):
+    url = serve(files_server)
+    path = downloader.fetch(url, MD5, "jpg")
+    assert path.read_bytes() == BODY
+    assert not part_path(downloader).exists()
+
+    # 再次取得直接命中缓存，不发请求
+    assert downloader.fetch(url, MD5, "jpg") == path
+    assert files_server.library.request_counts["/img/a.jpg"] == 1
+    stats = downloader.get_stats()
+    assert (stats["files"], stats["cached"], stats["failed"]) == (1, 1, 0)
+
+
+def test_md5_mismatch_raises_and_discards(files_server, downloader):
+    url = serve(files_server, body=BODY[:-1] + b"\0")
+    with pytest.raises(DownloadError, match="md5 mismatch"):
+        downloader.fetch(url, MD5, "jpg")
+    assert not part_path(downloader).exists()
+    assert downloader.cache.get(MD5) is None
+    assert downloader.get_stats()["failed"] == 1
+
+
+def test_resumes_partial_download_with_range(files_server, downloader):
+    url = serve(files_server)
+    part = part_path(downloader)
+    part.parent.mkdir(parents=True, exist_ok=True)
+    part.write_bytes(BODY[:100 * 1024])
+
+    path = downloader.fetch(url, MD5, "jpg")
+    assert path.read_bytes() == BODY
+    stats = downloader.get_stats()
+    assert stats["resumed"] == 1
+    assert stats["mb"] == round((len(BODY) - 100 * 1024) / 1e6, 2)
+
+
+def test_complete_part_file_is_accepted_on_416(files_server, downloader):
+    url = serve(files_server)
+    part = part_path(downloader)
+    part.parent.mkdir(parents=True, exist_ok=True)
+    part.write_bytes(BODY)
+
+    path = downloader.fetch(url, MD5, "jpg")
+    assert path.read_bytes() == BODY
+    assert downloader.get_stats()["mb"] == 0
+
+
+def test_missing_file_raises(files_server, downloader):
+    with pytest.raises(DownloadError, match="HTTP 404"):
+        downloader.fetch(files_server.files_url() + "/img/missing.jpg", MD5, "jpg")
+    assert downloader.cache.get(MD5) is None
+
+
+def test_without_md5_addresses_by_url(files_server, downloader):
+    url = serve(files_server, "/sample/b.jpg")
+    path = downloader.fetch(url)
+    assert path.read_bytes() == BODY
+    assert downloader.fetch(url) == path
+    assert files_server.library.request_counts["/sample/b.jpg"] == 1
@@ -0,0 +1,86 @@
+"""lib.file_hasher 的摘要计算，以及 HashCache 按 (大小, mtime_ns) 失效"""
+
+import hashlib
+import os
+
+import pytest
+
+from lib.file_hasher import FileHasher, hash_file
+
+
+def write(path, data):
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.mark.parametrize("mmap_threshold", [1, 10**9])
+def test_hash_file_matches_hashlib(tmp_path, mmap_threshold):
+    data = os.urandom(300_000)
+    path = write(tmp_path / "f.bin", data)
+    digests = hash_file(path, ("md5", "sha256"), buffer_size=4096, mmap_threshold=mmap_threshold)
+    assert digests == {"md5": hashlib.md5(data).hexdigest(), "sha256": hashlib.sha256(data).hexdigest()}
+    assert hash_file(write(tmp_path / "empty", b""))["md5"] == hashlib.md5(b"").hexdigest()
+
+
+def test_unchanged_files_are_served_from_cache(tmp_path):
+    db = tmp_path / "hashes.db"
+    paths = [write(tmp_path / f"{n}.bin", bytes([n]) * 1000) for n in range(5)]
+    hasher = FileHasher(db, workers=2)
+    first = dict(hasher.hash_files(paths))
+    assert (hasher.stats["hashed"], hasher.stats["cached"]) == (5, 0)
+    hasher.close()
+
+    hasher = FileHasher(db, workers=2)
+    assert dict(hasher.hash_files(paths)) == first
+    assert (hasher.stats["hashed"], hasher.stats["cached"]) == (0, 5)
+    hasher.close()
+
+
+def test_cache_invalidated_when_size_or_mtime_changes(tmp_path):
+    hasher = FileHasher(tmp_path / "hashes.db")
+    resized = write(tmp_path / "resized.bin", b"a" * 100)
+    touched = write(tmp_path / "touched.bin", b"b" * 100)
+    list(hasher.hash_files([resized, touched]))
+    stat = os.stat(touched)
+
+    write(tmp_path / "resized.bin", b"c" * 101)
+    # 同样大小的新内容，只有 mtime 不同
+    write(tmp_path / "touched.bin", b"d" * 100)
+    os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert hasher.hash_file(resized)["md5"] == hashlib.md5(b"c" * 101).hexdigest()
+    assert hasher.hash_file(touched)["md5"] == hashlib.md5(b"d" * 100).hexdigest()
+    assert hasher.stats["cached"] == 0 and hasher.stats["hashed"] == 4
+    hasher.close()
+
+
+def test_cache_keeps_other_algorithms_for_unchanged_files(tmp_path):
+    db = tmp_path / "hashes.db"
+    path = write(tmp_path / "f.bin", b"data")
+    first = FileHasher(db, algorithms=("md5",))
+    first.hash_file(path)
+    first.close()
+    both = FileHasher(db, algorithms=("md5", "sha256"))
+    both.hash_file(path)  # 缓存中缺 sha256，需要重新计算
+    assert both.stats["hashed"] == 1
+
+    # 补算 sha256 时保留了已有的 md5，之后单独查询任一算法都命中缓存
+    md5_only = FileHasher(db, algorithms=("md5",))
+    md5_only.hash_file(path)
+    sha_only = FileHasher(db, algorithms=("sha256",))
+    assert sha_only.hash_file(path)["sha256"] == hashlib.sha256(b"data").hexdigest()
+    assert (md5_only.stats["cached"], sha_only.stats["cached"]) == (1, 1)
+    for hasher in (both, md5_only, sha_only):
+        hasher.close()
+
+
+def test_unreadable_files_are_skipped(tmp_path):
+    hasher = FileHasher()
+    good = write(tmp_path / "good.bin", b"ok")
+    results = dict(hasher.hash_files([good, tmp_path / "missing.bin"]))
+    assert list(results) == [good]
+    assert hasher.stats["failed"] == 1
+    with pytest.raises(OSError):
+        hasher.hash_file(tmp_path / "missing.bin")
+    with pytest.raises(ValueError):
+        FileHasher(algorithms=("crc32",))
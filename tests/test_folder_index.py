@@ -0,0 +1,78 @@
+"""lib.folder_index.FolderIndex 由 Eagle 替身服务的文件夹树构建后的各种查找"""
+
+import pytest
+
+from lib.eagle_api import EagleAPI
+from lib.folder_index import FolderIndex
+
+
+@pytest.fixture
+def tree(eagle_server):
+    """CopyrightNew/genshin_impact/furina，CharacterNew/furina(同名文件夹在另一棵树下)，Artist"""
+    library = eagle_server.library
+    copyright_root = library.add_folder("CopyrightNew")
+    genshin = library.add_folder("genshin_impact", copyright_root["id"])
+    furina = library.add_folder("furina", genshin["id"])
+    character_root = library.add_folder("CharacterNew")
+    other_furina = library.add_folder("furina", character_root["id"])
+    artist = library.add_folder("Artist")
+    index = EagleAPI(**eagle_server.eagle_urls()).get_folder_list_recursive()
+    ids = {
+        "copyright": copyright_root["id"],
+        "genshin": genshin["id"],
+        "furina": furina["id"],
+        "character": character_root["id"],
+        "other_furina": other_furina["id"],
+        "artist": artist["id"],
+    }
+    return index, ids
+
+
+def test_lookup_by_id_name_and_parent(tree):
+    index, ids = tree
+    assert len(index) == 6 and ids["furina"] in index
+    assert index.name(ids["genshin"]) == "genshin_impact"
+    assert index.name("missing") == "Folder not found"
+    # 同名文件夹: get_id 返回先插入的一个(按层广度优先，较浅的先出现)，find 按父文件夹区分
+    assert index.get_id("furina") == ids["other_furina"]
+    assert index.find("furina", ids["character"]) == ids["other_furina"]
+    assert index.find("furina") is None
+    assert index.find("Artist") == ids["artist"]
+    assert sorted(index.ids_by_name("furina")) == sorted([ids["furina"], ids["other_furina"]])
+
+
+def test_roots_children_and_paths(tree):
+    index, ids = tree
+    assert index.root_of(ids["furina"]) == ids["copyright"]
+    assert index.root_of(ids["other_furina"]) == ids["character"]
+    assert sorted(index.folders_by_root(ids["copyright"])) == sorted(
+        [ids["copyright"], ids["genshin"], ids["furina"]]
+    )
+    assert index.child_ids(None) == [ids["copyright"], ids["character"], ids["artist"]]
+    assert index.path(ids["furina"]) == "CopyrightNew/genshin_impact/furina"
+    assert index.resolve_path("CopyrightNew/genshin_impact/furina") == ids["furina"]
+    assert index.resolve_path("/CharacterNew/furina/") == ids["other_furina"]
+    assert index.resolve_path("CopyrightNew/furina") is None
+
+
+def test_add_inserts_in_place_after_create_folder(tree, eagle_server):
+    index, ids = tree
+    eagle = EagleAPI(**eagle_server.eagle_urls())
+    new_id = eagle.create_folder("nahida", ids["genshin"])
+    index.add(new_id, "nahida", ids["genshin"])
+    index.add(new_id, "renamed", None)  # 已存在的 ID 不会重复插入
+
+    assert index.path(new_id) == "CopyrightNew/genshin_impact/nahida"
+    assert index.root_of(new_id) == ids["copyright"]
+    assert index.child_ids(ids["genshin"]) == [ids["furina"], new_id]
+    # 与重新拉取整棵树的结果一致
+    fresh = eagle.get_folder_list_recursive()
+    assert fresh.path(new_id) == index.path(new_id) and len(fresh) == len(index)
+
+
+def test_unpacks_as_legacy_dicts():
+    index = FolderIndex.from_tree([{"id": "R", "name": "root", "children": [{"id": "C", "name": "child"}]}])
+    id_to_name, name_to_id, to_root = index
+    assert id_to_name == {"R": "root", "C": "child"}
+    assert name_to_id == {"root": "R", "child": "C"}
+    assert to_root == {"R": "R", "C": "R"}
@@ -0,0 +1,56 @@
+"""PooledSession 只对可以安全重发的请求重试"""
+
+import socket
+
+import pytest
+import requests
+
+from benchmarks.mock_server import MockServer
+from lib.http_pool import PooledSession
+
+
+def closed_port_url() -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+@pytest.fixture
+def slow_server():
+    """每个请求都比客户端超时慢，服务端仍会处理完"""
+    with MockServer("eagle", latency=0.3) as server:
+        yield server
+
+
+def session_for(url: str) -> PooledSession:
+    return PooledSession(url, max_retries=2, backoff_factor=0.01, timeout=0.05)
+
+
+def test_get_is_retried_after_read_timeout(slow_server):
+    session = session_for(slow_server.urls[0])
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        session.request("get", "/api/item/list")
+    assert slow_server.library.request_counts["/api/item/list"] == 3
+    assert session.get_stats()["retries"] == 2
+    session.close()
+
+
+def test_post_is_not_resent_after_read_timeout(slow_server):
+    session = session_for(slow_server.urls[1])
+    with pytest.raises(requests.exceptions.ReadTimeout):
+        session.request("post", "/api/folder/create", json={"folderName": "Rating"})
+    # 服务端已处理: 重发会建出第二个同名文件夹
+    assert slow_server.library.request_counts["/api/folder/create"] == 1
+    stats = session.get_stats()
+    assert (stats["retries"], stats["failures"]) == (0, 1)
+    session.close()
+
+
+def test_post_is_retried_when_connection_is_refused():
+    session = session_for(closed_port_url())
+    with pytest.raises(requests.exceptions.ConnectionError):
+        session.request("post", "/api/folder/create", json={"folderName": "Rating"})
+    stats = session.get_stats()
+    assert (stats["retries"], stats["failures"]) == (2, 1)
+    session.close()
@@ -0,0 +1,79 @@
+"""lib.known_posts 的帖子 id 位图，以及 KnownPosts 的持久化与对账"""
+
+import random
+import time
+
+import pytest
+
+from lib.known_posts import KnownPosts, PostIdBitmap
+
+
+def test_bitmap_matches_set_semantics():
+    rng = random.Random(0)
+    ids = [rng.randrange(1, 200_000) for _ in range(5000)]
+    bitmap = PostIdBitmap(ids)
+    expected = set(ids)
+    for post_id in ids[:1000]:
+        bitmap.discard(post_id)
+        expected.discard(post_id)
+    bitmap.discard(10**9)  # 超出范围的 id 直接忽略
+
+    assert len(bitmap) == len(expected)
+    assert all(post_id in bitmap for post_id in expected)
+    assert not any(post_id in bitmap for post_id in ids[:1000] if post_id not in expected)
+    assert bitmap.nbytes <= 200_000 // 8 * 2
+
+
+@pytest.mark.parametrize("value", [-1, "12", 1.0, None, 10**12])
+def test_bitmap_rejects_values_that_are_not_known_ids(value):
+    assert value not in PostIdBitmap([1, 12])
+
+
+def test_bitmap_add_is_idempotent():
+    bitmap = PostIdBitmap()
+    bitmap.add(0)
+    bitmap.add(0)
+    bitmap.add(7)
+    bitmap.add(8)
+    assert len(bitmap) == 3 and 0 in bitmap and 8 in bitmap and 9 not in bitmap
+
+
+@pytest.fixture
+def db(tmp_path):
+    return tmp_path / "known_posts.db"
+
+
+def test_known_posts_persist_ids_and_md5(db):
+    known = KnownPosts(db)
+    known.add(5)
+    known.add_many([(5, "abc"), (6, None)])
+    known.add(6)  # 已有的 md5 不会被 None 覆盖
+    assert 5 in known and 6 in known and len(known) == 2
+    assert known.has_md5("abc") and not known.has_md5("def")
+    known.close()
+
+    reopened = KnownPosts(db)
+    assert len(reopened) == 2 and reopened.has_md5("abc")
+    reopened.close()
+
+
+def test_reconcile_adds_missing_and_removes_deleted_outside_grace(db):
+    known = KnownPosts(db)
+    assert known.needs_reconcile(86400)
+    known.add_many([(1, "a"), (2, "b"), (3, "c")])
+    # 1 与 2 是很早写入的记录，3 刚刚写入
+    known.conn.execute("UPDATE posts SET added = ? WHERE post_id IN (1, 2)", (time.time() - 7200,))
+    known.conn.commit()
+
+    report = known.reconcile([2, 4, 5], grace=3600)
+
+    # 1 已从资料库删除；3 虽然库里还没有，但在 grace 内(Eagle 可能仍在下载)，保留
+    assert report == {"total": 4, "added": 2, "removed": 1}
+    assert [post_id in known for post_id in (1, 2, 3, 4, 5)] == [False, True, True, True, True]
+    assert not known.needs_reconcile(86400)
+    known.close()
+
+    reopened = KnownPosts(db)
+    assert sorted(p for p in range(6) if p in reopened) == [2, 3, 4, 5]
+    assert reopened.last_reconcile > 0
+    reopened.close()
@@ -0,0 +1,23 @@
+"""LibraryIndex 读-改-写路径取得的项目数据不受镜像过期影响"""
+
+from lib.eagle_api import EagleAPI
+from lib.library_index import LibraryIndex
+
+
+def test_live_items_in_folder_bypasses_stale_mirror(eagle_server, tmp_path):
+    library = eagle_server.library
+    folder = library.add_folder("OvO")
+    item = library.add_item(name="a", tags=["old"], folders=[folder["id"]])
+    index = LibraryIndex(tmp_path / "index.db", EagleAPI(**eagle_server.eagle_urls()))
+    index.sync()
+
+    # 同步之后在 Eagle 中修改: 镜像在 max_age 内仍是旧数据
+    library.update_item({"id": item["id"], "tags": ["old", "edited"]})
+    assert index.ensure_fresh(600) is None
+    assert index.items_in_folder(folder["id"])[0]["tags"] == ["old"]
+
+    live = index.live_items_in_folder(folder["id"])
+    assert [i["tags"] for i in live] == [["old", "edited"]]
+    # 取得的最新数据同时写回镜像
+    assert index.get_item(item["id"])["tags"] == ["old", "edited"]
+    index.close()
@@ -0,0 +1,70 @@
+"""lib.md5_lookup 对 Danbooru 替身服务的批量 md5 查询与结果缓存"""
+
+import hashlib
+
+import pytest
+
+from benchmarks.synthetic import generate_posts
+from lib.md5_lookup import Md5LookupCache, Md5Resolver
+
+
+def md5_of(post_id):
+    return hashlib.md5(str(post_id).encode()).hexdigest()
+
+
+@pytest.fixture
+def posts(danbooru):
+    api, server = danbooru
+    server.library.posts = generate_posts(150, tags_per_post=2)
+    return api.client, server
+
+
+def test_resolves_in_batches_and_caches_both_outcomes(posts, tmp_path):
+    client, server = posts
+    known = [md5_of(post_id) for post_id in range(1, 151)]
+    unknown = [hashlib.md5(f"missing-{n}".encode()).hexdigest() for n in range(100)]
+    cache = Md5LookupCache(tmp_path / "lookups.db")
+    resolver = Md5Resolver(client, cache, batch_size=100, workers=2)
+
+    result = resolver.resolve([md5.upper() for md5 in known[:10]] + known[10:] + unknown)
+
+    assert result == {md5_of(post_id): post_id for post_id in range(1, 151)}
+    assert server.library.request_counts["/posts.json"] == 3
+    assert resolver.get_stats() == {
+        "md5s": 250, "cache_hits": 0, "requests": 3, "found": 150, "not_found": 100, "failed": 0
+    }
+
+    # 找到的与未找到的都已缓存: 再次查询不发请求
+    again = Md5Resolver(client, cache, batch_size=100)
+    assert again.resolve(known + unknown) == result
+    assert again.stats["cache_hits"] == 250
+    assert server.library.request_counts["/posts.json"] == 3
+    cache.close()
+
+
+def test_expired_negative_results_are_looked_up_again(posts, tmp_path):
+    client, server = posts
+    missing = hashlib.md5(b"uploaded later").hexdigest()
+    cache = Md5LookupCache(tmp_path / "lookups.db", negative_ttl=0)
+    resolver = Md5Resolver(client, cache)
+    assert resolver.resolve([md5_of(1), missing]) == {md5_of(1): 1}
+
+    # 未找到的结果已过期，只重新查询它；找到的结果永久有效
+    assert resolver.resolve([md5_of(1), missing]) == {md5_of(1): 1}
+    assert resolver.stats["requests"] == 2 and resolver.stats["cache_hits"] == 1
+    assert cache.get_many([md5_of(1), missing]) == ({md5_of(1): 1}, set())
+    cache.close()
+
+
+class BrokenClient:
+    def post_list(self, **params):
+        raise ConnectionError("offline")
+
+
+def test_failed_batches_are_not_cached(tmp_path):
+    cache = Md5LookupCache(tmp_path / "lookups.db")
+    resolver = Md5Resolver(BrokenClient(), cache, batch_size=2)
+    assert resolver.resolve([md5_of(n) for n in range(3)]) == {}
+    assert (resolver.stats["requests"], resolver.stats["failed"]) == (2, 3)
+    assert cache.get_many([md5_of(n) for n in range(3)]) == ({}, set())
+    cache.close()
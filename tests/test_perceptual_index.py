@@ -0,0 +1,170 @@
+"""lib.perceptual_index 的多索引哈希近邻/聚类(与暴力比较结果一致)，以及哈希库与跳过记录的维护"""
+
+import itertools
+import random
+import time
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from lib.perceptual_index import POST_SKIP_TTL, MultiIndexHash, PerceptualIndex
+
+
+def random_hashes(n, near_every=3, max_flips=6, seed=0):
+    """随机 64 位哈希，每 near_every 个中有一个由前一个翻转若干位得到(制造近邻)"""
+    rng = random.Random(seed)
+    hashes = {}
+    previous = 0
+    for i in range(n):
+        if i % near_every and i:
+            value = previous
+            for bit in rng.sample(range(64), rng.randint(0, max_flips)):
+                value ^= 1 << bit
+        else:
+            value = rng.getrandbits(64)
+        hashes[f"k{i}"] = previous = value
+    return hashes
+
+
+def brute_force_pairs(hashes, k):
+    return {
+        (a, b) if a < b else (b, a)
+        for a, b in itertools.combinations(hashes, 2)
+        if (hashes[a] ^ hashes[b]).bit_count() <= k
+    }
+
+
+@pytest.mark.parametrize("max_distance", [2, 4, 6])
+def test_pairs_match_brute_force(max_distance):
+    hashes = random_hashes(400)
+    index = MultiIndexHash(max_distance)
+    for key, value in hashes.items():
+        index.add(key, value)
+
+    found = list(index.pairs(chunk=7))
+    assert len(found) == len({(a, b) for a, b, _ in found})  # 每对只产出一次
+    assert {(a, b) for a, b, _ in found} == brute_force_pairs(hashes, max_distance)
+    assert all(d == (hashes[a] ^ hashes[b]).bit_count() for a, b, d in found)
+    # 较小的距离只是结果的子集
+    assert {(a, b) for a, b, _ in index.pairs(1)} == brute_force_pairs(hashes, 1)
+
+
+def test_query_matches_brute_force_and_respects_removal():
+    hashes = random_hashes(300, seed=1)
+    index = MultiIndexHash(4)
+    for key, value in hashes.items():
+        index.add(key, value)
+    index.remove("k1")
+
+    probe = hashes["k1"]
+    expected = sorted(
+        ((value ^ probe).bit_count(), key)
+        for key, value in hashes.items()
+        if key != "k1" and (value ^ probe).bit_count() <= 4
+    )
+    assert index.query(probe) == expected
+    with pytest.raises(ValueError):
+        list(index.pairs(5))
+
+
+def test_clusters_are_single_link_components(tmp_path):
+    index = PerceptualIndex(tmp_path / "phash.db", max_distance=4)
+    # a-b、b-c 各差 3 位，a-c 差 6 位: 单链接下同属一簇
+    index.add("a", 0)
+    index.add("b", 0b111)
+    index.add("c", 0b111111)
+    index.add("d", 0xFF << 40)
+    index.add("e", (0xFF << 40) | 1 << 60)
+    index.add("lonely", 0xFFFF_0000_FFFF_0000)
+
+    assert index.clusters() == [["a", "b", "c"], ["d", "e"]]
+    assert index.clusters(max_distance=1) == [["d", "e"]]
+    index.close()
+
+
+def test_clusters_match_brute_force_components(tmp_path):
+    hashes = random_hashes(300, near_every=2, seed=2)
+    index = PerceptualIndex(tmp_path / "phash.db", max_distance=4)
+    for key, value in hashes.items():
+        index.add(key, value)
+
+    graph = {key: set() for key in hashes}
+    for a, b in brute_force_pairs(hashes, 4):
+        graph[a].add(b)
+        graph[b].add(a)
+    expected, seen = [], set()
+    for key in hashes:
+        if key in seen or not graph[key]:
+            continue
+        component, stack = set(), [key]
+        while stack:
+            node = stack.pop()
+            if node not in component:
+                component.add(node)
+                stack.extend(graph[node])
+        seen |= component
+        expected.append(sorted(component))
+
+    assert sorted(index.clusters()) == sorted(expected)
+    index.close()
+
+
+def write_image(path, seed):
+    pixels = np.random.default_rng(seed).integers(0, 256, (32, 32, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(path)
+    return str(path)
+
+
+def test_prune_removes_deleted_items_and_their_skip_records(tmp_path):
+    db = tmp_path / "phash.db"
+    index = PerceptualIndex(db)
+    entries = [("item1", write_image(tmp_path / "1.png", 1)), ("item2", write_image(tmp_path / "2.png", 2))]
+    assert index.update(entries, workers=1)["hashed"] == 2
+    assert index.update(entries, workers=1)["cached"] == 2
+    index.skip("post:10", "item1", 2)
+    index.skip("post:11", "item2", 1)
+
+    assert index.prune({"item2"}) == 1
+    assert "item1" not in index and "item2" in index
+    assert not index.is_skipped("post:10")
+    assert index.is_skipped("post:11")
+    index.close()
+
+    reopened = PerceptualIndex(db)
+    assert len(reopened) == 1 and not reopened.is_skipped("post:10")
+    reopened.close()
+
+
+def test_prune_expires_skip_records_of_posts_imported_in_a_run(tmp_path):
+    db = tmp_path / "phash.db"
+    index = PerceptualIndex(db)
+    index.skip("post:2", "post:1", 1)
+    index.skip("post:4", "post:3", 1)
+    old = time.time() - POST_SKIP_TTL - 60
+    index.conn.execute("UPDATE skipped SET added = ? WHERE key = 'post:2'", (old,))
+    index.conn.commit()
+
+    index.prune(set())
+    # post:1 没有项目 ID，无法按资料库判断是否还在: 过期后清除，post:2 下次重新与索引比较
+    assert not index.is_skipped("post:2")
+    assert index.is_skipped("post:4")
+    index.prune(set(), post_ttl=0)
+    assert not index.is_skipped("post:4")
+    index.close()
+
+    reopened = PerceptualIndex(db)
+    assert not reopened.skipped
+    reopened.close()
+
+
+def test_release_clears_reservation_and_dependent_skips(tmp_path):
+    index = PerceptualIndex(tmp_path / "phash.db", max_distance=4)
+    assert index.check_and_add("post:1", 0b1010) == []
+    assert index.check_and_add("post:2", 0b1011) == [(1, "post:1")]
+    index.skip("post:2", "post:1", 1)
+
+    index.release("post:1")
+    assert "post:1" not in index and not index.is_skipped("post:2")
+    assert index.check_and_add("post:2", 0b1011) == []
+    index.close()
@@ -0,0 +1,79 @@
+"""lib.query_planner 的服务端条件选择，与 danbooru_api.plan_search 对 Danbooru 替身服务的标签数查询"""
+
+import pytest
+
+from benchmarks.synthetic import generate_posts
+from lib.query_planner import estimate_results, is_metatag, plan_tags
+
+COUNTS = {"long_hair": 500, "smile": 800, "solo": 990, ":o": 950, "rare": 10}
+TOTAL = 1000
+
+
+@pytest.mark.parametrize("tag", ["order:rank", "rating:g", "-rating:e", "ID:100..200", "status:any", "md5:abc"])
+def test_metatags_are_recognized_by_name(tag):
+    assert is_metatag(tag)
+
+
+@pytest.mark.parametrize("tag", [":d", ":o", "-:o", "re:zero_kara_hajimeru_isekai_seikatsu", "long_hair", "^_^"])
+def test_tags_containing_a_colon_are_not_metatags(tag):
+    assert not is_metatag(tag)
+
+
+def test_estimate_multiplies_independent_fractions():
+    assert estimate_results(["long_hair", "smile"], COUNTS, TOTAL) == 400
+    assert estimate_results(["long_hair", "-solo"], COUNTS, TOTAL) == 5
+    # 元标签与未知标签不缩小估计
+    assert estimate_results(["order:rank", "unknown_tag"], COUNTS, TOTAL) == TOTAL
+
+
+def test_plan_picks_most_selective_server_tags():
+    plan = plan_tags(["smile", "long_hair", "rare"], [], COUNTS, TOTAL, max_server_tags=2, page_size=100)
+    assert plan["server_tags"] == ["long_hair", "rare"]
+    assert plan["local_include"] == ["smile"]
+    assert plan["estimated_results"] == 5
+    assert plan["naive"]["server_tags"] == ["smile", "long_hair"]
+    assert plan["naive"]["estimated_pages"] == 4
+
+
+def test_plan_can_send_negated_tags_to_server():
+    plan = plan_tags(["long_hair", "smile"], ["solo"], COUNTS, TOTAL, max_server_tags=2)
+    assert plan["server_tags"] == ["long_hair", "-solo"]
+    assert (plan["local_include"], plan["local_exclude"]) == (["smile"], [])
+
+
+def test_plan_reserves_slots_for_metatags_and_keeps_local_only_terms_local():
+    plan = plan_tags(
+        ["order:rank", "~cat_ears", "~dog_ears", "smile", "long_hair", "*_eyes"], [], COUNTS, TOTAL, max_server_tags=2
+    )
+    assert plan["server_tags"] == ["order:rank", "long_hair"]
+    assert plan["local_include"] == ["smile", "~cat_ears", "~dog_ears", "*_eyes"]
+
+
+def test_metatags_over_the_limit_are_filtered_locally():
+    plan = plan_tags(["order:rank", "rating:g", "score:>10", "smile"], [], COUNTS, TOTAL, max_server_tags=2)
+    assert plan["server_tags"] == ["order:rank", "rating:g"]
+    assert plan["local_include"] == ["score:>10", "smile"]
+
+
+def test_tags_with_colons_are_counted_and_reordered():
+    plan = plan_tags([":o", "smile", "long_hair"], [], COUNTS, TOTAL, max_server_tags=2)
+    # :o 是普通标签: 按帖子数参与选择，而不是当作元标签占用名额
+    assert plan["server_tags"] == ["smile", "long_hair"]
+    assert plan["local_include"] == [":o"]
+
+
+def test_plan_search_counts_tags_with_colons(danbooru):
+    api, server = danbooru
+    posts = generate_posts(100, tags_per_post=2)
+    for post in posts:
+        tags = [":o"] if post["id"] > 5 else []
+        tags += ["smile"] if post["id"] > 20 else []
+        tags += ["long_hair"] if post["id"] <= 10 else []
+        post["tag_string"] = " ".join(tags)
+    server.library.posts = posts
+
+    plan = api.plan_search(":o smile long_hair")
+
+    assert plan["server_tags"] == ["smile", "long_hair"]
+    assert plan["local_include"] == [":o"]
+    assert server.library.request_counts["/tags.json"] == 1
@@ -0,0 +1,103 @@
+"""lib.tag_filter.TagFilter 的 AND / NOT / OR 组 / 通配条件，与逐帖建集合的朴素实现结果一致"""
+
+import fnmatch
+import random
+
+import pytest
+
+from lib.tag_filter import TagFilter, is_local_only
+
+
+def post(general="", character="", copyright="", artist="", meta=""):
+    return {
+        "tag_string_general": general,
+        "tag_string_character": character,
+        "tag_string_copyright": copyright,
+        "tag_string_artist": artist,
+        "tag_string_meta": meta,
+    }
+
+
+def test_include_and_exclude_across_tag_fields():
+    tag_filter = TagFilter(["long_hair", "hatsune_miku"], ["comic"])
+    assert tag_filter.matches(post("long_hair smile", character="hatsune_miku"))
+    assert not tag_filter.matches(post("long_hair", character="kagamine_rin"))
+    assert not tag_filter.matches(post("long_hair", character="hatsune_miku", meta="comic"))
+
+
+def test_exact_tags_do_not_match_substrings():
+    tag_filter = TagFilter(["hair"], ["solo"])
+    assert not tag_filter.matches(post("long_hair"))
+    assert tag_filter.matches(post("hair solo_focus"))
+
+
+def test_or_group_needs_any_member():
+    tag_filter = TagFilter(["smile", "~cat_ears", "~dog_ears"])
+    assert tag_filter.matches(post("smile dog_ears"))
+    assert tag_filter.matches(post("cat_ears smile dog_ears"))
+    assert not tag_filter.matches(post("smile fox_ears"))
+    assert not tag_filter.matches(post("cat_ears"))
+
+
+def test_wildcards_in_include_and_exclude():
+    tag_filter = TagFilter(["*_hair"], ["*censor*"])
+    assert tag_filter.matches(post("blue_hair"))
+    assert not tag_filter.matches(post("blue_eyes"))
+    assert not tag_filter.matches(post("blue_hair mosaic_censoring"))
+
+
+def test_matching_is_case_insensitive():
+    assert TagFilter(["Long_Hair"]).matches(post("long_hair"))
+    assert not TagFilter([], ["COMIC"]).matches(post("comic"))
+
+
+def test_empty_filter_keeps_everything():
+    tag_filter = TagFilter()
+    posts = [post("a"), post()]
+    assert not tag_filter
+    assert tag_filter.filter(posts) == posts
+
+
+def test_from_query_and_explain():
+    tag_filter = TagFilter.from_query("long_hair ~cat_ears ~dog_ears -comic -")
+    assert (tag_filter.include_tags, tag_filter.exclude_tags) == (["long_hair", "~cat_ears", "~dog_ears"], ["comic"])
+    missing, blocked = tag_filter.explain(post("comic smile"))
+    assert missing == ["long_hair", "cat_ears | dog_ears"]
+    assert blocked == ["comic"]
+
+
+@pytest.mark.parametrize("term, local", [("~cat_ears", True), ("-~cat_ears", True), ("*_hair", True), ("smile", False)])
+def test_is_local_only(term, local):
+    assert is_local_only(term) is local
+
+
+def naive_matches(include, exclude, p):
+    tags = set(" ".join(p.values()).lower().split())
+
+    def hit(term):
+        return any(fnmatch.fnmatchcase(tag, term) for tag in tags) if "*" in term else term in tags
+
+    or_group = [t[1:] for t in include if t.startswith("~")]
+    return (
+        all(hit(t) for t in include if not t.startswith("~"))
+        and (not or_group or any(hit(t) for t in or_group))
+        and not any(hit(t) for t in exclude)
+    )
+
+
+def test_filter_agrees_with_naive_sets_on_random_posts():
+    rng = random.Random(0)
+    vocabulary = [f"tag_{i}" for i in range(30)] + ["long_hair", "short_hair", "cat_ears", "dog_ears"]
+    posts = [
+        post(" ".join(rng.sample(vocabulary, 6)), character=rng.choice(["miku", "rin", ""]))
+        for _ in range(500)
+    ]
+    queries = [
+        (["tag_1"], ["tag_2"]),
+        (["*_hair", "~cat_ears", "~dog_ears"], ["tag_3"]),
+        (["~tag_4", "~tag_5", "~miku"], ["*_ears"]),
+        ([], ["tag_1", "long_*"]),
+    ]
+    for include, exclude in queries:
+        expected = [p for p in posts if naive_matches(include, exclude, p)]
+        assert TagFilter(include, exclude).filter(posts) == expected
@@ -0,0 +1,68 @@
+"""lib.update_queue 的差异计算与写后队列(合并、丢弃无变化修改、失败记录、dry run)，发送到 Eagle 替身服务"""
+
+import pytest
+
+from lib.eagle_api import EagleAPI
+from lib.update_queue import UpdateQueue, diff_item
+
+
+def test_diff_item_ignores_unchanged_fields_and_list_order():
+    current = {"tags": ["a", "b"], "folders": ["F1"], "annotation": "x", "url": "u"}
+    assert diff_item(current, {"tags": ["b", "a"], "annotation": "x", "new_url": None}) == {}
+    assert diff_item(current, {"tags": ["b", "c"], "new_url": "v"}) == {
+        "tags": {"old": ["a", "b"], "new": ["b", "c"], "add": ["c"], "remove": ["a"]},
+        "new_url": {"old": "u", "new": "v"},
+    }
+    # 当前状态未知时全部视为变化
+    assert set(diff_item(None, {"tags": [], "star": 3})) == {"tags", "star"}
+
+
+@pytest.fixture
+def eagle(eagle_server):
+    return EagleAPI(**eagle_server.eagle_urls())
+
+
+def test_queue_coalesces_and_skips_unchanged_updates(eagle_server, eagle):
+    library = eagle_server.library
+    items = [library.add_item(name=f"i{n}", tags=["old"]) for n in range(5)]
+    sent = []
+
+    with UpdateQueue(eagle, batch_size=2, max_workers=2, on_success=lambda i, f: sent.append((i, f))) as queue:
+        queue.put(items[0]["id"], current=items[0], tags=["old", "a"])
+        queue.put(items[0]["id"], current=items[0], annotation="note")  # 与上一次合并为一个请求
+        queue.put(items[1]["id"], current=items[1], tags=["old"])  # 无变化，不发送
+        for item in items[2:]:
+            queue.put(item["id"], current=item, tags=["new"])
+
+    assert queue.report == {"sent": 4, "skipped": 1, "failed": 0, "coalesced": 1, "would_send": 0}
+    assert library.request_counts["/api/item/update"] == 4
+    assert library.items[items[0]["id"]]["tags"] == ["old", "a"]
+    assert library.items[items[0]["id"]]["annotation"] == "note"
+    assert all(library.items[item["id"]]["tags"] == ["new"] for item in items[2:])
+    # 回调只带实际发送的字段
+    assert dict(sent)[items[0]["id"]] == {"tags": ["old", "a"], "annotation": "note"}
+
+
+def test_queue_records_failed_updates(eagle_server, eagle):
+    item = eagle_server.library.add_item(tags=[])
+    with UpdateQueue(eagle) as queue:
+        queue.put(item["id"], current=item, tags=["a"])
+        queue.put("MISSING", tags=["a"])
+    assert (queue.report["sent"], queue.report["failed"]) == (1, 1)
+    assert queue.failed_ids == ["MISSING"]
+
+
+def test_dry_run_only_reports_diffs(eagle_server, eagle):
+    item = eagle_server.library.add_item(tags=["a"])
+    with UpdateQueue(eagle, dry_run=True) as queue:
+        queue.put(item["id"], current=item, tags=["a", "b"])
+    assert queue.report["would_send"] == 1 and queue.report["sent"] == 0
+    assert queue.diffs[item["id"]]["tags"]["add"] == ["b"]
+    assert "/api/item/update" not in eagle_server.library.request_counts
+    assert eagle_server.library.items[item["id"]]["tags"] == ["a"]
+
+
+def test_unknown_fields_are_rejected(eagle):
+    with UpdateQueue(eagle) as queue:
+        with pytest.raises(ValueError):
+            queue.put("ID", color="red")